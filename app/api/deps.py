@@ -1,11 +1,16 @@
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from ..core.security import decode_token
 from ..db.session import get_db
+from ..db.async_session import get_async_db
 from ..models.user import User
-from ..core.redis_client import get_redis
+from ..core.redis_client import get_redis, get_async_redis
+from ..core.auth_cache import auth_cache
 from typing import Optional
+import time
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
@@ -14,6 +19,13 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=Fals
 def get_current_user(db: Session = Depends(get_db), token: Optional[str] = Depends(oauth2_scheme)) -> User:
     if not token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="No token provided")
+
+    # 进程内缓存命中时跳过 Redis 与数据库
+    cached = auth_cache.get(token)
+    if cached is not None:
+        return auth_cache.attach(db, cached)
+
+    started = time.perf_counter()
     try:
         payload = decode_token(token)
         username: str = payload.get("sub")
@@ -34,6 +46,7 @@ def get_current_user(db: Session = Depends(get_db), token: Optional[str] = Depen
     if user.status != 1:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Account disabled")
     
+    auth_cache.put(token, user, payload.get("exp"), time.perf_counter() - started)
     return user
 
 
@@ -42,6 +55,11 @@ def get_current_user_optional(db: Session = Depends(get_db), token: Optional[str
     if not token:
         return None
     
+    cached = auth_cache.get(token)
+    if cached is not None:
+        return auth_cache.attach(db, cached)
+
+    started = time.perf_counter()
     try:
         payload = decode_token(token)
         username: str = payload.get("sub")
@@ -61,6 +79,67 @@ def get_current_user_optional(db: Session = Depends(get_db), token: Optional[str
         user = db.query(User).filter(User.username == username).first()
         if not user or user.status != 1:
             return None
+        auth_cache.put(token, user, payload.get("exp"), time.perf_counter() - started)
+        return user
+    except Exception:
+        return None
+
+
+async def get_current_user_async(db: AsyncSession = Depends(get_async_db), token: Optional[str] = Depends(oauth2_scheme)) -> User:
+    """get_current_user 的异步版本，用于 async def 路由"""
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="No token provided")
+
+    cached = auth_cache.get(token)
+    if cached is not None:
+        return await auth_cache.attach_async(db, cached)
+
+    started = time.perf_counter()
+    try:
+        payload = decode_token(token)
+        username: str = payload.get("sub")
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+
+    cache_token = await get_async_redis().get(f"auth:token:{username}")
+    if not cache_token or cache_token != token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired or revoked")
+
+    user = (await db.execute(select(User).where(User.username == username))).scalar_one_or_none()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    
+    if user.status != 1:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Account disabled")
+    
+    auth_cache.put(token, user, payload.get("exp"), time.perf_counter() - started)
+    return user
+
+
+async def get_current_user_optional_async(db: AsyncSession = Depends(get_async_db), token: Optional[str] = Depends(oauth2_scheme)) -> Optional[User]:
+    """get_current_user_optional 的异步版本"""
+    if not token:
+        return None
+    
+    cached = auth_cache.get(token)
+    if cached is not None:
+        return await auth_cache.attach_async(db, cached)
+
+    started = time.perf_counter()
+    try:
+        payload = decode_token(token)
+        username: str = payload.get("sub")
+    except Exception:
+        return None
+
+    try:
+        cache_token = await get_async_redis().get(f"auth:token:{username}")
+        if not cache_token or cache_token != token:
+            return None
+        user = (await db.execute(select(User).where(User.username == username))).scalar_one_or_none()
+        if not user or user.status != 1:
+            return None
+        auth_cache.put(token, user, payload.get("exp"), time.perf_counter() - started)
         return user
     except Exception:
         return None
@@ -1,64 +1,124 @@
 from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
 from typing import List, Optional
 from datetime import datetime, timedelta
 from ..db.session import get_db
 from ..models.user import User
 from ..models.oplog import OpLog
-from ..models.footprint import Footprint
-from ..models.comment import Comment
 from ..models.footprint_type import FootprintType
 from ..schemas.user import UserOut
 from .deps import get_current_admin
 from ..utils.response import ok, fail
+from ..core.audit_log import audit_log_writer
+from ..core.auth_cache import auth_cache
+from ..core.config import load_settings
+from ..services import stats, oplog_query, user_search
+from ..utils.pagination import encode_id_cursor, id_before
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 
 @router.get("/users")
-def list_users(db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
+def list_users(
+    status: Optional[int] = Query(None, description="用户状态筛选"),
+    cursor: Optional[str] = Query(None, description="游标分页：首页传空字符串，之后传上次返回的 next_cursor"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_current_admin)
+):
+    """
+    用户列表（按 id 倒序）
+
+    传入 cursor 时按 limit 分页；不传时为旧客户端返回全部用户的列表，
+    旧客户端无法翻页，不能截断。
+    """
     try:
-        users = db.query(User).order_by(User.id.desc()).all()
-        data = [
-            {
-                "id": u.id,
-                "username": u.username,
-                "nickname": u.nickname,
-                "email": u.email,
-                "is_admin": u.id == 1,  # 管理员判断基于ID=1
-                "is_active": u.status == 1,  # 激活状态基于status字段
-                "status": u.status,
-                "bio": u.bio,
-                "last_login": u.last_login.isoformat() if u.last_login else None,
-                "created_at": u.created_at.isoformat() if u.created_at else None,
-                "updated_at": u.updated_at.isoformat() if u.updated_at else None,
-            }
-            for u in users
-        ]
-        return ok(data)
+        query = db.query(User)
+        if status is not None:
+            query = query.filter(User.status == status)
+        query = query.order_by(User.id.desc())
+        if cursor is None:
+            # 旧客户端：保持列表结构，不分页
+            return ok([_user_to_dict(u) for u in query.all()])
+        if cursor:
+            query = query.filter(id_before(User.id, cursor))
+        users = query.limit(limit).all()
+        data = [_user_to_dict(u) for u in users]
+        return ok({
+            "users": data,
+            "next_cursor": encode_id_cursor(users[-1].id) if len(users) == limit else None
+        })
     except Exception as e:
         return fail(str(e))
 
 
 @router.get("/logs")
-def list_logs(db: Session = Depends(get_db), admin: User = Depends(get_current_admin)):
+def list_logs(
+    start: Optional[datetime] = Query(None, description="起始时间（UTC），默认最近 browse_window_days 天"),
+    end: Optional[datetime] = Query(None, description="结束时间（UTC，不含）"),
+    user_id: Optional[int] = Query(None, description="按用户筛选"),
+    path: Optional[str] = Query(None, description="按请求路径前缀筛选"),
+    method: Optional[str] = Query(None, description="按请求方法筛选"),
+    action: Optional[str] = Query(None, description="按动作筛选"),
+    cursor: Optional[str] = Query(None, description="游标分页：首页传空字符串，之后传上次返回的 next_cursor"),
+    limit: int = Query(1000, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_current_admin)
+):
+    """浏览操作日志（始终带时间范围条件，只扫描相关的月分区）"""
     try:
-        logs = db.query(OpLog).order_by(OpLog.id.desc()).limit(1000).all()
-        data = [
-            {
-                "id": l.id,
-                "user_id": l.user_id,
-                "action": l.action,
-                "path": l.path,
-                "method": l.method,
-                "detail": l.detail,
-                "created_at": l.created_at.isoformat() if l.created_at else None,
-            }
-            for l in logs
-        ]
-        return ok(data)
+        conditions = oplog_query.log_filters(start, end, user_id, path, method, action)
+        page = oplog_query.fetch_page(db, conditions, cursor, limit)
+        if cursor is None:
+            # 旧客户端：保持列表结构
+            return ok(page["logs"])
+        return ok(page)
+    except Exception as e:
+        return fail(str(e))
+
+
+@router.get("/logs/export")
+def export_logs(
+    start: Optional[datetime] = Query(None, description="起始时间（UTC），默认最近 browse_window_days 天"),
+    end: Optional[datetime] = Query(None, description="结束时间（UTC，不含）"),
+    user_id: Optional[int] = Query(None, description="按用户筛选"),
+    path: Optional[str] = Query(None, description="按请求路径前缀筛选"),
+    method: Optional[str] = Query(None, description="按请求方法筛选"),
+    action: Optional[str] = Query(None, description="按动作筛选"),
+    admin: User = Depends(get_current_admin)
+):
+    """
+    按条件流式导出操作日志（NDJSON，每行一条，按 id 倒序）
+
+    导出中途失败时最后一行为 {"error": ...}，表示结果不完整。
+    """
+    try:
+        conditions = oplog_query.log_filters(start, end, user_id, path, method, action)
+        return StreamingResponse(
+            oplog_query.iter_ndjson(conditions),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": 'attachment; filename="op_logs.ndjson"'}
+        )
+    except Exception as e:
+        return fail(str(e))
+
+
+@router.get("/logs/writer")
+def get_log_writer_stats(admin: User = Depends(get_current_admin)):
+    """操作日志写入器状态（入队/落库/丢弃计数）"""
+    try:
+        return ok(audit_log_writer.stats())
+    except Exception as e:
+        return fail(str(e))
+
+
+@router.get("/auth-cache")
+def get_auth_cache_stats(admin: User = Depends(get_current_admin)):
+    """认证用户缓存状态（命中率与节省的延迟）"""
+    try:
+        return ok(auth_cache.stats())
     except Exception as e:
         return fail(str(e))
 
@@ -79,12 +139,14 @@ def update_user_status(
         if user_id == 1:
             return fail("不能修改管理员账户状态")
         
-        user = db.query(User).filter(User.id == user_id).first()
+        user = db.query(User).filter(User.id == user_id).with_for_update().first()
         if not user:
             return fail("用户不存在")
         
+        stats.on_user_change(db, user.status, request.status)
         user.status = request.status
         db.commit()
+        auth_cache.invalidate(user.username)
         
         return ok({"id": user.id, "status": user.status}, "用户状态更新成功")
     except Exception as e:
@@ -94,93 +156,76 @@ def update_user_status(
 
 @router.get("/stats")
 def get_system_stats(
-    days: int = Query(30, description="统计天数"),
+    days: int = Query(30, ge=1, le=366, description="统计天数"),
     db: Session = Depends(get_db), 
     admin: User = Depends(get_current_admin)
 ):
-    """获取系统统计信息"""
+    """获取系统统计信息（读取增量维护的计数器与日分桶）"""
     try:
-        # 计算时间范围
-        now = datetime.utcnow()
-        start_date = now - timedelta(days=days)
-        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        # 基础统计
-        total_users = db.query(func.count(User.id)).scalar()
-        total_footprints = db.query(func.count(Footprint.id)).scalar()
-        total_comments = db.query(func.count(Comment.id)).filter(Comment.is_deleted == 0).scalar()
-        total_types = db.query(func.count(FootprintType.id)).scalar()
-        
-        # 活跃用户（最近7天有登录）
-        week_ago = now - timedelta(days=7)
-        active_users = db.query(func.count(User.id)).filter(
-            User.last_login >= week_ago
-        ).scalar()
-        
-        # 今日新增
-        today_new_users = db.query(func.count(User.id)).filter(
-            User.created_at >= today_start
-        ).scalar()
-        
-        today_new_footprints = db.query(func.count(Footprint.id)).filter(
-            Footprint.created_at >= today_start
-        ).scalar()
-        
-        today_new_comments = db.query(func.count(Comment.id)).filter(
-            and_(Comment.created_at >= today_start, Comment.is_deleted == 0)
-        ).scalar()
-        
-        # 公开/私有足迹统计
-        public_footprints = db.query(func.count(Footprint.id)).filter(
-            Footprint.is_public == 1
-        ).scalar()
-        
-        private_footprints = db.query(func.count(Footprint.id)).filter(
-            Footprint.is_public == 0
-        ).scalar()
+        # 计算时间范围（按 UTC 日期分桶，含今天）
+        today = datetime.utcnow().date()
+        start_day = today - timedelta(days=days - 1)
         
-        # 用户状态统计
-        active_users_count = db.query(func.count(User.id)).filter(
-            User.status == 1
-        ).scalar()
-        
-        inactive_users_count = db.query(func.count(User.id)).filter(
-            User.status == 0
-        ).scalar()
+        counters = stats.read_counters(db)
+        daily = stats.read_daily(db, start_day, today)
+        types = db.query(FootprintType.id, FootprintType.name).all()
         
         # 按类型统计足迹
-        footprints_by_type = db.query(
-            FootprintType.name,
-            func.count(Footprint.id).label('count')
-        ).join(Footprint, FootprintType.id == Footprint.type_id)\
-         .group_by(FootprintType.id, FootprintType.name)\
-         .order_by(func.count(Footprint.id).desc())\
-         .all()
+        footprints_by_type = sorted(
+            (
+                {"name": name, "count": counters.get(stats.type_counter(type_id), 0)}
+                for type_id, name in types
+            ),
+            key=lambda row: row["count"],
+            reverse=True
+        )
+        
+        # 按日新增序列
+        series = []
+        period = {"new_users": 0, "new_footprints": 0, "new_comments": 0}
+        for i in range(days):
+            day = start_day + timedelta(days=i)
+            bucket = daily.get(day, {})
+            point = {
+                "date": day.isoformat(),
+                "new_users": bucket.get(stats.USERS_NEW, 0),
+                "new_footprints": bucket.get(stats.FOOTPRINTS_NEW, 0),
+                "new_comments": bucket.get(stats.COMMENTS_NEW, 0)
+            }
+            for key in period:
+                period[key] += point[key]
+            series.append(point)
         
         # 最近操作日志
-        recent_logs = db.query(OpLog).order_by(OpLog.id.desc()).limit(10).all()
+        log_start = datetime.utcnow() - timedelta(days=load_settings().audit_log.browse_window_days)
+        recent_logs = (
+            db.query(OpLog)
+            .filter(OpLog.created_at >= log_start)
+            .order_by(OpLog.created_at.desc(), OpLog.id.desc())
+            .limit(10)
+            .all()
+        )
         
         data = {
             "overview": {
-                "total_users": total_users or 0,
-                "total_footprints": total_footprints or 0,
-                "total_comments": total_comments or 0,
-                "total_types": total_types or 0,
-                "active_users": active_users or 0,
-                "active_users_count": active_users_count or 0,
-                "inactive_users_count": inactive_users_count or 0,
-                "public_footprints": public_footprints or 0,
-                "private_footprints": private_footprints or 0
+                "total_users": counters.get("users.total", 0),
+                "total_footprints": counters.get("footprints.total", 0),
+                "total_comments": counters.get("comments.total", 0),
+                "total_types": len(types),
+                "active_users": stats.active_users(),
+                "active_users_count": counters.get("users.active", 0),
+                "inactive_users_count": counters.get("users.disabled", 0),
+                "public_footprints": counters.get("footprints.public", 0),
+                "private_footprints": counters.get("footprints.private", 0)
             },
             "today": {
-                "new_users": today_new_users or 0,
-                "new_footprints": today_new_footprints or 0,
-                "new_comments": today_new_comments or 0
+                "new_users": series[-1]["new_users"],
+                "new_footprints": series[-1]["new_footprints"],
+                "new_comments": series[-1]["new_comments"]
             },
-            "footprints_by_type": [
-                {"name": row[0], "count": row[1]} 
-                for row in footprints_by_type
-            ],
+            "period": dict(days=days, **period),
+            "daily": series,
+            "footprints_by_type": [row for row in footprints_by_type if row["count"] > 0],
             "recent_logs": [
                 {
                     "id": log.id,
@@ -202,59 +247,68 @@ def get_system_stats(
 
 @router.get("/users/search")
 def search_users(
-    q: Optional[str] = Query(None, description="搜索用户名或邮箱"),
+    q: Optional[str] = Query(None, description="搜索用户名、昵称或邮箱"),
     status: Optional[int] = Query(None, description="用户状态筛选"),
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="游标分页：传入时忽略 skip"),
+    exact_total: bool = Query(False, description="是否精确计算总数"),
     db: Session = Depends(get_db), 
     admin: User = Depends(get_current_admin)
 ):
-    """搜索用户"""
+    """搜索用户（前缀 + bigram 索引匹配，总数默认为近似值）"""
     try:
+        q = q.strip() if q else None
         query = db.query(User)
         
         # 搜索条件
         if q:
-            # 使用COALESCE处理NULL值
-            search_filter = (
-                User.username.like(f"%{q}%") |
-                (User.nickname.isnot(None) & User.nickname.like(f"%{q}%")) |
-                (User.email.isnot(None) & User.email.like(f"%{q}%"))
-            )
-            query = query.filter(search_filter)
+            query = query.filter(user_search.search_condition(q))
         
         # 状态筛选
         if status is not None:
             query = query.filter(User.status == status)
         
-        # 总数
-        total = query.count()
-        
         # 分页
-        users = query.order_by(User.id.desc()).offset(skip).limit(limit).all()
+        query = query.order_by(User.id.desc())
+        if cursor is not None:
+            if cursor:
+                query = query.filter(id_before(User.id, cursor))
+        else:
+            query = query.offset(skip)
+        users = query.limit(limit).all()
+        
+        # 总数
+        total, total_exact = user_search.count_users(db, q, status, exact=exact_total)
         
         data = {
             "total": total,
-            "users": [
-                {
-                    "id": u.id,
-                    "username": u.username,
-                    "nickname": u.nickname,
-                    "email": u.email,
-                    "is_admin": u.id == 1,
-                    "is_active": u.status == 1,
-                    "status": u.status,
-                    "bio": u.bio,
-                    "avatar": u.avatar,
-                    "gender": u.gender,
-                    "last_login": u.last_login.isoformat() if u.last_login else None,
-                    "created_at": u.created_at.isoformat() if u.created_at else None,
-                    "updated_at": u.updated_at.isoformat() if u.updated_at else None,
-                }
-                for u in users
-            ]
+            "total_exact": total_exact,
+            "users": [_user_to_dict(u, detail=True) for u in users],
+            "next_cursor": encode_id_cursor(users[-1].id) if len(users) == limit else None
         }
         
         return ok(data)
     except Exception as e:
         return fail(str(e))
+
+
+def _user_to_dict(u: User, detail: bool = False) -> dict:
+    """用户列表项，detail 为 True 时包含头像与性别"""
+    result = {
+        "id": u.id,
+        "username": u.username,
+        "nickname": u.nickname,
+        "email": u.email,
+        "is_admin": u.id == 1,  # 管理员判断基于ID=1
+        "is_active": u.status == 1,  # 激活状态基于status字段
+        "status": u.status,
+        "bio": u.bio,
+        "last_login": u.last_login.isoformat() if u.last_login else None,
+        "created_at": u.created_at.isoformat() if u.created_at else None,
+        "updated_at": u.updated_at.isoformat() if u.updated_at else None,
+    }
+    if detail:
+        result["avatar"] = u.avatar
+        result["gender"] = u.gender
+    return result
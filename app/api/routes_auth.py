@@ -5,8 +5,10 @@ from ..models.user import User
 from ..schemas.auth import Token, LoginRequest, RegisterRequest, ChangePasswordRequest
 from ..schemas.user import UserOut, UserUpdate, UserAvatarUpdate
 from ..core.security import verify_password, hash_password, create_access_token
-from .deps import get_current_user
+from .deps import get_current_user, get_current_user_async
 from ..core.redis_client import get_redis
+from ..core.auth_cache import auth_cache
+from ..services import feed_cache, stats, user_search
 from ..core.config import load_settings
 from ..utils.response import ok, fail
 from ..utils.avatar_utils import convert_avatar_url
@@ -55,6 +57,9 @@ def register(data: RegisterRequest, db: Session = Depends(get_db)):
             password_hash=hash_password(data.password)
         )
         db.add(user)
+        db.flush()
+        stats.on_user_change(db, None, user.status, user.created_at)
+        user_search.index_user(db, user)
         db.commit()
         db.refresh(user)
         
@@ -92,11 +97,14 @@ def login(username: str = Form(...), password: str = Form(...), db: Session = De
     settings = load_settings()
     ttl = int(settings.jwt.access_token_expires_minutes) * 60
     r.setex(f"auth:token:{user.username}", ttl, token)
+    stats.record_login(user.id, user.last_login)
+    # 旧 token 已被替换，通知各进程失效缓存
+    auth_cache.invalidate(user.username)
     return ok({"access_token": token, "token_type": "bearer"})
 
 
 @router.get("/me")
-def me(current: User = Depends(get_current_user)):
+async def me(current: User = Depends(get_current_user_async)):
     try:
         return ok({
             "id": current.id,
@@ -136,7 +144,11 @@ def update_profile(data: UserUpdate, current: User = Depends(get_current_user),
         if data.password:
             current.password_hash = hash_password(data.password)
         
+        user_search.index_user(db, current)
         db.commit()
+        auth_cache.invalidate(current.username)
+        # 公开列表中包含作者昵称与头像
+        feed_cache.invalidate_authors()
         db.refresh(current)
         
         return ok({
@@ -160,6 +172,9 @@ def update_avatar(data: UserAvatarUpdate, current: User = Depends(get_current_us
     try:
         current.avatar = data.avatar
         db.commit()
+        auth_cache.invalidate(current.username)
+        # 公开列表中包含作者昵称与头像
+        feed_cache.invalidate_authors()
         db.refresh(current)
         
         return ok({
@@ -181,6 +196,7 @@ def change_password(data: ChangePasswordRequest, current: User = Depends(get_cur
         
         current.password_hash = hash_password(data.new_password)
         db.commit()
+        auth_cache.invalidate(current.username)
         
         return ok(None, "密码修改成功")
     except Exception as e:
@@ -1,61 +1,65 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_
-from typing import List, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, select
+from typing import List, Optional, Dict
 from ..db.session import get_db
+from ..db.async_session import get_async_db
+from ..db.loaders import comment_options
 from ..models import Comment, CommentImage, Footprint, User
 from ..schemas.comment import CommentCreate, CommentOut, CommentUpdate
-from .deps import get_current_user
+from .deps import get_current_user, get_current_user_async
 from ..utils.response import ok, fail
 from ..utils.avatar_utils import convert_avatar_url
 from ..utils.media_utils import generate_media_url
+from ..utils.pagination import keyset_before, next_cursor
+from ..services import comment_service, stats
+from ..services.comment_service import top_level_comments
 
 router = APIRouter(prefix="/comments", tags=["comments"])
 
 
 @router.get("/footprint/{footprint_id}")
-def list_footprint_comments(
+async def list_footprint_comments(
     footprint_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db),
-    user = Depends(get_current_user)
+    cursor: Optional[str] = Query(None, description="游标分页：首页传空字符串，之后传上次返回的 next_cursor"),
+    max_depth: Optional[int] = Query(None, ge=1, description="回复的最大层数，默认不限"),
+    db: AsyncSession = Depends(get_async_db),
+    user = Depends(get_current_user_async)
 ):
     """获取足迹的评论列表"""
     try:
         # 检查足迹是否存在且有权访问
-        footprint = db.query(Footprint).filter(
-            Footprint.id == footprint_id,
-            or_(
-                Footprint.user_id == user.id,
-                Footprint.is_public == 1
+        exists = (await db.execute(
+            select(Footprint.id).where(
+                Footprint.id == footprint_id,
+                or_(
+                    Footprint.user_id == user.id,
+                    Footprint.is_public == 1
+                )
             )
-        ).first()
+        )).scalar_one_or_none()
         
-        if not footprint:
+        if exists is None:
             return fail("足迹不存在或无权访问")
         
-        # 获取评论（只获取顶级评论，子评论通过关系加载）
-        comments = (
-            db.query(Comment)
-            .options(
-                joinedload(Comment.user),
-                joinedload(Comment.images),
-                joinedload(Comment.children).joinedload(Comment.user),
-                joinedload(Comment.children).joinedload(Comment.images)
-            )
-            .filter(
-                Comment.footprint_id == footprint_id,
-                Comment.parent_id.is_(None),
-                Comment.is_deleted == 0
-            )
-            .order_by(Comment.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        # 获取一页顶级评论
+        query = top_level_comments(footprint_id).options(*comment_options())
+        if cursor is None:
+            query = query.offset(skip)
+        elif cursor:
+            query = query.where(keyset_before(Comment.created_at, Comment.id, cursor))
+        roots = (await db.execute(query.limit(limit))).scalars().all()
         
-        return ok([_comment_to_dict(comment) for comment in comments])
+        # 一次范围查询取出这些评论下的全部回复
+        children = await comment_service.load_children_async(db, roots, max_depth)
+        comments = [_comment_to_dict(comment, children=children) for comment in roots]
+        if cursor is None:
+            # 旧客户端：保持列表结构
+            return ok(comments)
+        return ok({"comments": comments, "next_cursor": next_cursor(roots, limit)})
     except Exception as e:
         return fail(str(e))
 
@@ -90,6 +94,8 @@ def create_comment(
             ).first()
             if not parent_comment:
                 return fail("父评论不存在")
+            if parent_comment.depth >= comment_service.MAX_DEPTH:
+                return fail("回复层级过深")
         
         # 创建评论
         comment = Comment(
@@ -99,8 +105,9 @@ def create_comment(
             content=data.content
         )
         db.add(comment)
-        db.commit()
-        db.refresh(comment)
+        db.flush()
+        comment_service.assign_path(comment, parent_comment if data.parent_id else None)
+        stats.on_comments_changed(db, {comment.created_at.date(): 1})
         
         # 处理图片
         if data.images:
@@ -118,10 +125,7 @@ def create_comment(
         # 重新查询以获取完整数据
         comment = (
             db.query(Comment)
-            .options(
-                joinedload(Comment.user),
-                joinedload(Comment.images)
-            )
+            .options(*comment_options())
             .filter(Comment.id == comment.id)
             .first()
         )
@@ -152,28 +156,11 @@ def delete_comment(
         if not comment:
             return fail("评论不存在或无权删除")
         
-        # 级联软删除逻辑
-        def cascade_delete_comment(comment_id: int, db: Session):
-            """递归软删除评论及其所有子评论"""
-            # 软删除当前评论
-            current_comment = db.query(Comment).filter(Comment.id == comment_id).first()
-            if current_comment:
-                current_comment.is_deleted = 1
-                
-                # 查找所有子评论并递归删除
-                child_comments = db.query(Comment).filter(
-                    Comment.parent_id == comment_id,
-                    Comment.is_deleted == 0
-                ).all()
-                
-                for child in child_comments:
-                    cascade_delete_comment(child.id, db)
-        
-        # 执行级联删除
-        cascade_delete_comment(comment_id, db)
+        # 按路径前缀一次软删除整棵子树
+        deleted = comment_service.soft_delete_subtree(db, comment)
         db.commit()
         
-        return ok(None, "删除成功")
+        return ok({"deleted_count": deleted}, "删除成功")
     except Exception as e:
         db.rollback()
         return fail(str(e))
@@ -190,11 +177,7 @@ def get_my_comments(
     try:
         comments = (
             db.query(Comment)
-            .options(
-                joinedload(Comment.user),
-                joinedload(Comment.images),
-                joinedload(Comment.footprint)
-            )
+            .options(*comment_options(include_footprint=True))
             .filter(
                 Comment.user_id == user.id,
                 Comment.is_deleted == 0
@@ -204,15 +187,28 @@ def get_my_comments(
             .limit(limit)
             .all()
         )
+        children = comment_service.load_children(db, comments)
         
-        return ok([_comment_to_dict(comment, include_footprint=True) for comment in comments])
+        return ok([
+            _comment_to_dict(comment, include_footprint=True, children=children)
+            for comment in comments
+        ])
     except Exception as e:
         return fail(str(e))
 
 
 
-def _comment_to_dict(comment: Comment, include_footprint: bool = False) -> dict:
-    """将评论对象转换为字典"""
+def _comment_to_dict(
+    comment: Comment,
+    include_footprint: bool = False,
+    children: Optional[Dict[int, List[Comment]]] = None
+) -> dict:
+    """
+    将评论对象转换为字典
+
+    children 为 comment_service.load_children 得到的 parent_id -> 回复列表，
+    不传时不展开回复。
+    """
     result = {
         "id": comment.id,
         "footprint_id": comment.footprint_id,
@@ -249,14 +245,10 @@ def _comment_to_dict(comment: Comment, include_footprint: bool = False) -> dict:
         result["images"] = []
     
     # 添加子评论信息
-    if hasattr(comment, 'children') and comment.children:
-        result["children"] = [
-            _comment_to_dict(child_comment) 
-            for child_comment in comment.children 
-            if child_comment.is_deleted == 0
-        ]
-    else:
-        result["children"] = []
+    result["children"] = [
+        _comment_to_dict(child_comment, children=children)
+        for child_comment in (children or {}).get(comment.id, [])
+    ]
     
     # 添加足迹信息（如果需要）
     if include_footprint and comment.footprint:
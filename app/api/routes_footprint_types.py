@@ -6,6 +6,7 @@ from ..models import FootprintType
 from ..schemas.footprint import FootprintTypeCreate, FootprintTypeOut
 from .deps import get_current_user, get_current_admin
 from ..utils.response import ok, fail
+from ..services import feed_cache
 
 router = APIRouter(prefix="/footprint-types", tags=["footprint-types"])
 
@@ -75,6 +76,8 @@ def update_footprint_type(
         footprint_type.sort_order = data.sort_order
         
         db.commit()
+        # 列表缓存中包含类型名称与图标
+        feed_cache.invalidate([type_id])
         db.refresh(footprint_type)
         
         return ok(FootprintTypeOut.model_validate(footprint_type), "更新成功")
@@ -103,6 +106,7 @@ def delete_footprint_type(
         
         db.delete(footprint_type)
         db.commit()
+        feed_cache.invalidate([type_id])
         
         return ok(None, "删除成功")
     except Exception as e:
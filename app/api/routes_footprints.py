@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, select
 from typing import List, Optional
 from datetime import datetime, date
 from ..db.session import get_db
+from ..db.async_session import get_async_db
+from ..db.loaders import footprint_options
 from ..models import (
     Footprint, FootprintType, Tag, FootprintTag, 
     FootprintMedia, User, Comment, CommentImage
@@ -13,10 +16,22 @@ from ..schemas.footprint import (
     FootprintTypeCreate, FootprintTypeOut,
     TagOut, FootprintSummary
 )
-from .deps import get_current_user, get_current_user_optional
+from .deps import (
+    get_current_user, get_current_user_optional,
+    get_current_user_async, get_current_user_optional_async
+)
 from ..utils.response import ok, fail
 from ..utils.avatar_utils import convert_avatar_url
-from ..utils.media_utils import generate_media_url
+from ..utils.media_utils import generate_media_url, generate_thumbnail_urls
+from ..utils.pagination import keyset_before, next_cursor
+from ..services import search_index
+from ..services.geo_index import bbox_condition
+from ..utils.geohash import encode as encode_geohash
+from ..core.config import load_settings
+from ..services.footprint_hooks import (
+    on_footprint_saved, on_footprint_deleted, after_footprint_commit, snapshot
+)
+from ..services import map_clusters, heatmap_tiles, travel_report, feed_cache, comment_service, tag_service, media_store
 
 router = APIRouter(prefix="/footprints", tags=["footprints"])
 
@@ -54,6 +69,8 @@ def get_my_footprints(
     type_id: Optional[int] = Query(None, description="按类型筛选"),
     is_public: Optional[int] = Query(None, description="按公开状态筛选"),
     search: Optional[str] = Query(None, description="搜索地点名称、地址、描述"),
+    tag: Optional[str] = Query(None, description="按标签名称筛选"),
+    cursor: Optional[str] = Query(None, description="游标分页：首页传空字符串，之后传上次返回的 next_cursor"),
     db: Session = Depends(get_db),
     user = Depends(get_current_user)
 ):
@@ -65,25 +82,18 @@ def get_my_footprints(
             query = query.filter(Footprint.type_id == type_id)
         if is_public is not None:
             query = query.filter(Footprint.is_public == is_public)
-        if search:
-            query = query.filter(or_(
-                Footprint.name.contains(search),
-                Footprint.address.contains(search),
-                Footprint.description.contains(search)
+        if tag:
+            query = query.filter(Footprint.id.in_(
+                select(FootprintTag.footprint_id)
+                .join(Tag, Tag.id == FootprintTag.tag_id)
+                .where(Tag.name == tag)
             ))
+        if search:
+            # 游标分页需要稳定的时间顺序，只在偏移分页时按相关度排序
+            query = search_index.apply_search(query, search, rank=cursor is None)
         
-        items = (
-            query.options(
-                joinedload(Footprint.footprint_type),
-                joinedload(Footprint.tags).joinedload(FootprintTag.tag),
-                joinedload(Footprint.medias),
-                joinedload(Footprint.user)
-            )
-            .order_by(Footprint.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        query = query.options(*footprint_options())
+        items = _paginate(query, skip, limit, cursor).all()
         
         # 返回用户信息和足迹列表，与其他接口保持一致的数据结构
         return ok({
@@ -97,49 +107,71 @@ def get_my_footprints(
                 "created_at": user.created_at.isoformat(),
                 "is_admin": user.id == 1  # 简单判断管理员
             },
-            "footprints": [_footprint_to_dict(item) for item in items]
+            "footprints": [_footprint_to_dict(item) for item in items],
+            "next_cursor": next_cursor(items, limit)
         })
     except Exception as e:
         return fail(str(e))
 
 
+@router.get("/mine/report")
+def get_my_travel_report(
+    db: Session = Depends(get_db),
+    user = Depends(get_current_user)
+):
+    """获取当前用户的旅行报告（旅行天数、覆盖城市、总里程）"""
+    try:
+        return ok(travel_report.get_report(db, user.id))
+    except Exception as e:
+        db.rollback()
+        return fail(str(e))
+
+
+@router.get("/mine/heatmap/{z}/{x}/{y}")
+def get_my_heatmap_tile(
+    z: int,
+    x: int,
+    y: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    user = Depends(get_current_user)
+):
+    """获取当前用户的热力图瓦片（含私有足迹）"""
+    return _heatmap_response(request, db, z, x, y, user_id=user.id)
+
+
+@router.get("/heatmap/{z}/{x}/{y}")
+def get_heatmap_tile(
+    z: int,
+    x: int,
+    y: int,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """获取全局公开足迹的热力图瓦片"""
+    return _heatmap_response(request, db, z, x, y)
+
+
 @router.get("/public")
-def list_public_footprints(
+async def list_public_footprints(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     type_id: Optional[int] = Query(None, description="按类型筛选"),
     search: Optional[str] = Query(None, description="搜索地点名称"),
-    db: Session = Depends(get_db)
+    tag: Optional[str] = Query(None, description="按标签名称筛选"),
+    cursor: Optional[str] = Query(None, description="游标分页：首页传空字符串，之后传上次返回的 next_cursor"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取公开的足迹"""
-    try:
-        query = db.query(Footprint).filter(Footprint.is_public == 1)
-        
-        if type_id is not None:
-            query = query.filter(Footprint.type_id == type_id)
-        if search:
-            query = query.filter(or_(
-                Footprint.name.contains(search),
-                Footprint.address.contains(search),
-                Footprint.description.contains(search)
-            ))
-        
-        items = (
-            query.options(
-                joinedload(Footprint.footprint_type),
-                joinedload(Footprint.tags).joinedload(FootprintTag.tag),
-                joinedload(Footprint.medias),
-                joinedload(Footprint.user)
-            )
-            .order_by(Footprint.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
-        
-        return ok([_footprint_to_dict(item) for item in items])
-    except Exception as e:
-        return fail(str(e))
+    """获取公开的足迹（响应缓存在 Redis，足迹变化时按类型失效）"""
+    params = {
+        "skip": skip, "limit": limit, "type_id": type_id,
+        "search": search, "tag": tag, "cursor": cursor,
+    }
+    body = await feed_cache.get_or_compute(
+        type_id, params,
+        lambda: _list_public_footprints(db, skip, limit, type_id, search, tag, cursor)
+    )
+    return Response(content=body, media_type="application/json")
 
 
 @router.get("/user/{username}")
@@ -147,6 +179,7 @@ def get_user_footprints(
     username: str,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="游标分页：首页传空字符串，之后传上次返回的 next_cursor"),
     db: Session = Depends(get_db)
 ):
     """获取指定用户的公开足迹"""
@@ -157,23 +190,15 @@ def get_user_footprints(
             return fail("用户不存在")
         
         # 查询该用户的公开足迹
-        items = (
+        query = (
             db.query(Footprint)
             .filter(
                 Footprint.user_id == user.id,
                 Footprint.is_public == 1
             )
-            .options(
-                joinedload(Footprint.footprint_type),
-                joinedload(Footprint.tags).joinedload(FootprintTag.tag),
-                joinedload(Footprint.medias),
-                joinedload(Footprint.user)
-            )
-            .order_by(Footprint.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
+            .options(*footprint_options())
         )
+        items = _paginate(query, skip, limit, cursor).all()
         
         # 返回用户信息和足迹列表
         return ok({
@@ -187,12 +212,76 @@ def get_user_footprints(
                 "created_at": user.created_at.isoformat(),
                 "is_admin": user.id == 1  # 简单判断管理员
             },
-            "footprints": [_footprint_to_dict(item) for item in items]
+            "footprints": [_footprint_to_dict(item) for item in items],
+            "next_cursor": next_cursor(items, limit)
+        })
+    except Exception as e:
+        return fail(str(e))
+
+
+@router.get("/in-bbox")
+def list_footprints_in_bbox(
+    min_lng: float = Query(..., ge=-180, le=180),
+    min_lat: float = Query(..., ge=-90, le=90),
+    max_lng: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    type_id: Optional[int] = Query(None, description="按类型筛选"),
+    tag: Optional[str] = Query(None, description="按标签名称筛选"),
+    limit: int = Query(200, ge=1),
+    db: Session = Depends(get_db)
+):
+    """获取矩形范围内的公开足迹（地图视野查询）"""
+    try:
+        if min_lat > max_lat:
+            return fail("纬度范围无效")
+        limit = min(limit, load_settings().geo.bbox_max_results)
+        
+        query = db.query(Footprint).filter(
+            Footprint.is_public == 1,
+            bbox_condition(min_lng, min_lat, max_lng, max_lat)
+        )
+        if type_id is not None:
+            query = query.filter(Footprint.type_id == type_id)
+        if tag:
+            query = query.filter(Footprint.id.in_(
+                select(FootprintTag.footprint_id)
+                .join(Tag, Tag.id == FootprintTag.tag_id)
+                .where(Tag.name == tag)
+            ))
+        
+        # 多取一条用于判断是否被截断
+        items = (
+            query.order_by(Footprint.created_at.desc(), Footprint.id.desc())
+            .limit(limit + 1)
+            .all()
+        )
+        
+        return ok({
+            "footprints": [_footprint_to_marker(item) for item in items[:limit]],
+            "truncated": len(items) > limit
         })
     except Exception as e:
         return fail(str(e))
 
 
+@router.get("/clusters")
+def list_footprint_clusters(
+    min_lng: float = Query(..., ge=-180, le=180),
+    min_lat: float = Query(..., ge=-90, le=90),
+    max_lng: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    zoom: int = Query(..., ge=0, le=22, description="地图缩放级别"),
+    db: Session = Depends(get_db)
+):
+    """获取矩形范围内公开足迹的聚合结果（低缩放级别地图）"""
+    try:
+        if min_lng > max_lng or min_lat > max_lat:
+            return fail("经纬度范围无效")
+        return ok(map_clusters.get_clusters(db, min_lng, min_lat, max_lng, max_lat, zoom))
+    except Exception as e:
+        return fail(str(e))
+
+
 @router.post("/")
 def create_footprint(
     body: FootprintCreate, 
@@ -216,26 +305,15 @@ def create_footprint(
             address=body.address,
             visit_time=body.visit_time,
             description=body.description,
-            is_public=body.is_public
+            is_public=body.is_public,
+            geohash=encode_geohash(body.latitude, body.longitude)
         )
         db.add(footprint)
-        db.commit()
-        db.refresh(footprint)
+        db.flush()
         
         # 处理标签
         if body.tag_names:
-            for tag_name in body.tag_names:
-                # 获取或创建标签
-                tag = db.query(Tag).filter(Tag.name == tag_name).first()
-                if not tag:
-                    tag = Tag(name=tag_name)
-                    db.add(tag)
-                    db.commit()
-                    db.refresh(tag)
-                
-                # 创建关联
-                footprint_tag = FootprintTag(footprint_id=footprint.id, tag_id=tag.id)
-                db.add(footprint_tag)
+            tag_service.set_footprint_tags(db, footprint.id, body.tag_names)
         
         # 处理媒体文件
         if body.medias:
@@ -249,20 +327,17 @@ def create_footprint(
                 )
                 db.add(media)
         
+        on_footprint_saved(db, footprint)
         db.commit()
         
         # 重新查询以获取完整数据
         footprint = (
             db.query(Footprint)
-            .options(
-                joinedload(Footprint.footprint_type),
-                joinedload(Footprint.tags).joinedload(FootprintTag.tag),
-                joinedload(Footprint.medias),
-                joinedload(Footprint.user)
-            )
+            .options(*footprint_options())
             .filter(Footprint.id == footprint.id)
             .first()
         )
+        after_footprint_commit(None, snapshot(footprint))
         
         return ok(_footprint_to_dict(footprint), "创建成功")
     except Exception as e:
@@ -270,63 +345,59 @@ def create_footprint(
         return fail(str(e))
 
 
+def _detail_query(footprint_id: int):
+    """足迹详情查询（含类型、标签、媒体、作者）"""
+    return (
+        select(Footprint)
+        .options(*footprint_options())
+        .where(Footprint.id == footprint_id)
+    )
+
+
+async def _detail_response(db: AsyncSession, footprint: Footprint, comment_limit: int) -> dict:
+    """足迹详情：附带第一页顶级评论、评论总数与下一页游标"""
+    page = await comment_service.first_page(db, footprint.id, comment_limit)
+    result = _footprint_to_dict(footprint, comments=page["comments"])
+    result["comment_count"] = page["total"]
+    result["comments_next_cursor"] = page["next_cursor"]
+    return result
+
+
 @router.get("/{footprint_id}")
-def get_footprint(
+async def get_footprint(
     footprint_id: int, 
-    db: Session = Depends(get_db), 
-    user = Depends(get_current_user)
+    comment_limit: int = Query(10, ge=0, le=50, description="附带的顶级评论数量"),
+    db: AsyncSession = Depends(get_async_db), 
+    user = Depends(get_current_user_async)
 ):
     """获取足迹详情（需要登录）"""
     try:
-        footprint = (
-            db.query(Footprint)
-            .options(
-                joinedload(Footprint.footprint_type),
-                joinedload(Footprint.tags).joinedload(FootprintTag.tag),
-                joinedload(Footprint.medias),
-                joinedload(Footprint.user),
-                joinedload(Footprint.comments).joinedload(Comment.user),
-                joinedload(Footprint.comments).joinedload(Comment.images)
-            )
-            .filter(
-                Footprint.id == footprint_id,
-                or_(
-                    Footprint.user_id == user.id,  # 自己的足迹
-                    Footprint.is_public == 1       # 公开足迹
-                )
+        query = _detail_query(footprint_id).where(
+            or_(
+                Footprint.user_id == user.id,  # 自己的足迹
+                Footprint.is_public == 1       # 公开足迹
             )
-            .first()
         )
+        footprint = (await db.execute(query)).scalars().first()
         
         if not footprint:
             return fail("足迹不存在或无权访问")
         
-        return ok(_footprint_to_dict(footprint, include_comments=True))
+        return ok(await _detail_response(db, footprint, comment_limit))
     except Exception as e:
         return fail(str(e))
 
 
 @router.get("/{footprint_id}/detail")
-def get_footprint_detail(
+async def get_footprint_detail(
     footprint_id: int, 
-    db: Session = Depends(get_db),
-    user = Depends(get_current_user_optional)  # 可选用户，支持未登录访问
+    comment_limit: int = Query(10, ge=0, le=50, description="附带的顶级评论数量"),
+    db: AsyncSession = Depends(get_async_db),
+    user = Depends(get_current_user_optional_async)  # 可选用户，支持未登录访问
 ):
     """获取足迹详情（智能权限判断）"""
     try:
-        footprint = (
-            db.query(Footprint)
-            .options(
-                joinedload(Footprint.footprint_type),
-                joinedload(Footprint.tags).joinedload(FootprintTag.tag),
-                joinedload(Footprint.medias),
-                joinedload(Footprint.user),
-                joinedload(Footprint.comments).joinedload(Comment.user),
-                joinedload(Footprint.comments).joinedload(Comment.images)
-            )
-            .filter(Footprint.id == footprint_id)
-            .first()
-        )
+        footprint = (await db.execute(_detail_query(footprint_id))).scalars().first()
         
         if not footprint:
             return fail("足迹不存在")
@@ -334,10 +405,10 @@ def get_footprint_detail(
         # 权限检查：公开足迹或者是自己的足迹
         if footprint.is_public == 1:
             # 公开足迹，任何人都可以访问
-            return ok(_footprint_to_dict(footprint, include_comments=True))
+            return ok(await _detail_response(db, footprint, comment_limit))
         elif user and footprint.user_id == user.id:
             # 私有足迹，但是是本人访问
-            return ok(_footprint_to_dict(footprint, include_comments=True))
+            return ok(await _detail_response(db, footprint, comment_limit))
         else:
             # 私有足迹，不是本人访问
             return fail("足迹不存在或无权访问")
@@ -363,6 +434,8 @@ def update_footprint(
         if not footprint:
             return fail("足迹不存在或无权修改")
         
+        old = snapshot(footprint)
+        
         # 更新基本字段
         if body.name is not None:
             footprint.name = body.name
@@ -383,24 +456,16 @@ def update_footprint(
         
         # 更新标签
         if body.tag_names is not None:
-            # 删除原有标签关联
-            db.query(FootprintTag).filter(FootprintTag.footprint_id == footprint.id).delete()
-            
-            # 添加新标签
-            for tag_name in body.tag_names:
-                tag = db.query(Tag).filter(Tag.name == tag_name).first()
-                if not tag:
-                    tag = Tag(name=tag_name)
-                    db.add(tag)
-                    db.commit()
-                    db.refresh(tag)
-                
-                footprint_tag = FootprintTag(footprint_id=footprint.id, tag_id=tag.id)
-                db.add(footprint_tag)
+            # 替换原有标签关联
+            tag_service.set_footprint_tags(db, footprint.id, body.tag_names, replace=True)
         
         # 更新媒体文件
+        released = []
         if body.medias is not None:
             # 删除原有媒体文件
+            old_urls = [url for (url,) in db.query(FootprintMedia.media_url).filter(
+                FootprintMedia.footprint_id == footprint.id
+            )]
             db.query(FootprintMedia).filter(FootprintMedia.footprint_id == footprint.id).delete()
             
             # 添加新媒体文件
@@ -413,23 +478,27 @@ def update_footprint(
                     sort_order=media_data.sort_order
                 )
                 db.add(media)
+            # 新媒体写入后再检查旧文件是否仍被使用
+            db.flush()
+            released = media_store.release_unused(db, [(url, footprint.user_id) for url in old_urls])
         
+        text_changed = any(v is not None for v in (body.name, body.address, body.description))
+        on_footprint_saved(db, footprint, old=old, text_changed=text_changed)
         db.commit()
         
         # 重新查询以获取完整数据
         footprint = (
             db.query(Footprint)
-            .options(
-                joinedload(Footprint.footprint_type),
-                joinedload(Footprint.tags).joinedload(FootprintTag.tag),
-                joinedload(Footprint.medias),
-                joinedload(Footprint.user)
-            )
+            .options(*footprint_options())
             .filter(Footprint.id == footprint.id)
             .first()
         )
+        after_footprint_commit(old, snapshot(footprint))
+        data = _footprint_to_dict(footprint)
+        # 删除文件会提交会话，放在序列化之后
+        media_store.purge_released(db, released)
         
-        return ok(_footprint_to_dict(footprint), "更新成功")
+        return ok(data, "更新成功")
     except Exception as e:
         db.rollback()
         return fail(str(e))
@@ -451,15 +520,117 @@ def delete_footprint(
         if not footprint:
             return fail("足迹不存在或无权删除")
         
+        old = snapshot(footprint)
+        released = on_footprint_deleted(db, footprint)
         db.delete(footprint)
         db.commit()
+        after_footprint_commit(old, None)
+        media_store.purge_released(db, released)
         return ok(None, "删除成功")
     except Exception as e:
         db.rollback()
         return fail(str(e))
 
 
-def _footprint_to_dict(footprint: Footprint, include_comments: bool = False) -> dict:
+def _heatmap_response(request: Request, db: Session, z: int, x: int, y: int, user_id: Optional[int] = None):
+    """
+    返回热力图瓦片
+
+    响应体为 grid_size x grid_size 的 uint16 小端数组（行优先，自北向南），
+    通过 ETag 支持浏览器与 CDN 的协商缓存。
+    """
+    settings = load_settings().heatmap
+    if z < 0 or z > settings.max_zoom or not (0 <= x < (1 << z)) or not (0 <= y < (1 << z)):
+        return fail("瓦片坐标无效")
+    
+    try:
+        data = heatmap_tiles.get_tile(db, z, x, y, user_id)
+    except Exception as e:
+        return fail(str(e))
+    
+    etag = heatmap_tiles.tile_etag(data)
+    headers = {
+        "ETag": etag,
+        # 个人瓦片只允许浏览器缓存，全局瓦片可被 CDN 复用
+        "Cache-Control": "private, no-cache" if user_id is not None else "public, max-age=300",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    headers.update({
+        "X-Heatmap-Grid": str(settings.grid_size),
+        "X-Heatmap-Max": str(heatmap_tiles.tile_max(data)),
+    })
+    return Response(content=data, media_type="application/octet-stream", headers=headers)
+
+
+async def _list_public_footprints(
+    db: AsyncSession,
+    skip: int,
+    limit: int,
+    type_id: Optional[int],
+    search: Optional[str],
+    tag: Optional[str],
+    cursor: Optional[str],
+) -> dict:
+    """查询一页公开足迹并生成响应"""
+    try:
+        query = select(Footprint).where(Footprint.is_public == 1)
+        
+        if type_id is not None:
+            query = query.where(Footprint.type_id == type_id)
+        if tag:
+            query = query.where(Footprint.id.in_(
+                select(FootprintTag.footprint_id)
+                .join(Tag, Tag.id == FootprintTag.tag_id)
+                .where(Tag.name == tag)
+            ))
+        if search:
+            # 游标分页需要稳定的时间顺序，只在偏移分页时按相关度排序
+            query = search_index.apply_search(query, search, rank=cursor is None)
+        
+        query = query.options(*footprint_options())
+        result = await db.execute(_paginate(query, skip, limit, cursor))
+        items = result.scalars().all()
+        
+        footprints = [_footprint_to_dict(item) for item in items]
+        if cursor is None:
+            # 旧客户端：保持列表结构
+            return ok(footprints)
+        return ok({
+            "footprints": footprints,
+            "next_cursor": next_cursor(items, limit)
+        })
+    except Exception as e:
+        return fail(str(e))
+
+
+def _paginate(query, skip: int, limit: int, cursor: Optional[str]):
+    """按 (created_at, id) 倒序分页：传入游标时走键集分页，否则兼容 skip/limit（Query 或 Select 均可）"""
+    query = query.order_by(Footprint.created_at.desc(), Footprint.id.desc())
+    if cursor is None:
+        return query.offset(skip).limit(limit)
+    if cursor:
+        query = query.filter(keyset_before(Footprint.created_at, Footprint.id, cursor))
+    return query.limit(limit)
+
+
+def _footprint_to_marker(footprint: Footprint) -> dict:
+    """将足迹转换为地图标记所需的精简字典（不加载关联数据）"""
+    return {
+        "id": footprint.id,
+        "user_id": footprint.user_id,
+        "type_id": footprint.type_id,
+        "name": footprint.name,
+        "longitude": float(footprint.longitude),
+        "latitude": float(footprint.latitude),
+        "address": footprint.address,
+        "visit_time": footprint.visit_time.isoformat() if footprint.visit_time else None,
+        "created_at": footprint.created_at.isoformat(),
+    }
+
+
+def _footprint_to_dict(footprint: Footprint, comments: Optional[List[Comment]] = None) -> dict:
     """将足迹对象转换为字典"""
     result = {
         "id": footprint.id,
@@ -509,8 +680,9 @@ def _footprint_to_dict(footprint: Footprint, include_comments: bool = False) ->
     
     # 添加媒体信息
     if footprint.medias:
-        result["medias"] = [
-            {
+        result["medias"] = []
+        for media in sorted(footprint.medias, key=lambda x: x.sort_order):
+            item = {
                 "id": media.id,
                 "media_url": generate_media_url(media.media_url),  # 生成签名URL
                 "media_type": media.media_type,
@@ -518,13 +690,16 @@ def _footprint_to_dict(footprint: Footprint, include_comments: bool = False) ->
                 "sort_order": media.sort_order,
                 "created_at": media.created_at.isoformat()
             }
-            for media in sorted(footprint.medias, key=lambda x: x.sort_order)
-        ]
+            # 图片附带缩略图与响应式尺寸
+            thumbnails = generate_thumbnail_urls(media.media_url) if media.media_type == "image" else None
+            item["thumbnail_url"] = thumbnails["thumbnail_url"] if thumbnails else None
+            item["srcset"] = thumbnails["srcset"] if thumbnails else None
+            result["medias"].append(item)
     else:
         result["medias"] = []
     
-    # 添加评论信息（如果需要）
-    if include_comments and footprint.comments:
+    # 添加评论信息（详情页传入已分页的顶级评论）
+    if comments is not None:
         result["comments"] = [
             {
                 "id": comment.id,
@@ -551,7 +726,7 @@ def _footprint_to_dict(footprint: Footprint, include_comments: bool = False) ->
                     for img in sorted(comment.images, key=lambda x: x.sort_order)
                 ] if comment.images else []
             }
-            for comment in footprint.comments if comment.is_deleted == 0
+            for comment in comments
         ]
     
     return result
\ No newline at end of file
@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status, Query, Request
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 import os
+import asyncio
 import uuid
 import shutil
 from datetime import datetime
 from typing import List, Optional
 from urllib.parse import unquote
+from pydantic import BaseModel
 
 from ..db.session import get_db
 from ..api.deps import get_current_user
@@ -14,6 +16,9 @@ from ..models.user import User
 from ..utils.response import ok, fail
 from ..utils.file_signature import file_signature_manager
 from ..core.config import load_settings
+from ..utils.upload_storage import save_stream, UploadTooLargeError, StoredFile
+from ..services import resumable_upload, media_store, thumbnails
+from ..services.resumable_upload import ResumableUploadError
 
 router = APIRouter(prefix="/upload", tags=["upload"])
 settings = load_settings()
@@ -44,14 +49,48 @@ def validate_file_type(file: UploadFile) -> str:
     return file_type
 
 
-def validate_file_size(file_size: int):
-    """验证文件大小"""
-    if not file_signature_manager.is_file_size_allowed(file_size):
-        max_size_mb = settings.upload.max_file_size // (1024*1024)
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"文件过大，最大允许 {max_size_mb}MB"
+def file_too_large_message() -> str:
+    """文件过大的提示信息"""
+    max_size_mb = settings.upload.max_file_size // (1024*1024)
+    return f"文件过大，最大允许 {max_size_mb}MB"
+
+
+def store_upload(file: UploadFile, directory: str, filename: str, max_size: int, error_message: str) -> StoredFile:
+    """流式保存上传文件，超过大小限制时返回400"""
+    # 客户端声明的大小已超限时无需读取内容
+    if file.size is not None and file.size > max_size:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_message)
+    try:
+        return save_stream(file.file, directory, filename, max_size)
+    except UploadTooLargeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_message)
+
+
+def store_media_upload(db: Session, file: UploadFile, user_id: int, media_type: str) -> StoredFile:
+    """保存媒体文件：开启去重时按内容哈希存储，否则按目录策略存储"""
+    max_size = settings.upload.max_file_size
+    if file.size is not None and file.size > max_size:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=file_too_large_message())
+    
+    if not settings.upload.deduplicate:
+        directory_path = file_signature_manager.generate_directory_path(user_id, media_type)
+        return store_upload(
+            file, directory_path, generate_unique_filename(file.filename),
+            max_size, file_too_large_message()
+        )
+    
+    try:
+        stored = media_store.store(
+            db, file.file, user_id, media_type, get_file_extension(file.filename), max_size
         )
+        db.commit()
+        return stored
+    except UploadTooLargeError:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=file_too_large_message())
+    except Exception:
+        db.rollback()
+        raise
 
 
 def generate_avatar_path(user_id: int, filename: str) -> str:
@@ -72,6 +111,7 @@ def generate_avatar_path(user_id: int, filename: str) -> str:
 def upload_media(
     file: UploadFile = File(...),
     description: Optional[str] = Form(None),
+    db: Session = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
     """上传图片或视频文件"""
@@ -79,29 +119,13 @@ def upload_media(
         # 验证文件类型
         media_type = validate_file_type(file)
         
-        # 读取文件内容以获取大小
-        file_content = file.file.read()
-        file.file.seek(0)  # 重置文件指针
-        
-        # 验证文件大小
-        validate_file_size(len(file_content))
-        
-        # 生成目录路径
-        directory_path = file_signature_manager.generate_directory_path(user.id, media_type)
-        os.makedirs(directory_path, exist_ok=True)
-        
-        # 生成唯一文件名
-        unique_filename = generate_unique_filename(file.filename)
-        
-        # 完整文件路径
-        file_path = os.path.join(directory_path, unique_filename)
-        
-        # 保存文件
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_content)
+        # 分块写入文件，同时校验大小
+        stored = store_media_upload(db, file, user.id, media_type)
+        if media_type == "image":
+            thumbnails.schedule(stored.path)
         
         # 生成相对路径用于URL
-        relative_path = os.path.relpath(file_path, '.').replace('\\', '/')
+        relative_path = os.path.relpath(stored.path, '.').replace('\\', '/')
         
         # 生成签名URL
         signed_url = file_signature_manager.generate_signed_url(relative_path)
@@ -111,7 +135,8 @@ def upload_media(
             "media_type": media_type,
             "description": description,
             "original_filename": file.filename,
-            "size": len(file_content),
+            "size": stored.size,
+            "content_hash": stored.sha256,
             "file_path": relative_path,  # 保持兼容性
             "signed_url": signed_url     # 如果前端需要立即预览，可以使用这个
         }, "文件上传成功")
@@ -126,6 +151,7 @@ def upload_media(
 def upload_media_batch(
     files: List[UploadFile] = File(...),
     descriptions: Optional[List[str]] = Form(None),
+    db: Session = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
     """批量上传图片或视频文件"""
@@ -140,29 +166,13 @@ def upload_media_batch(
                 # 验证文件类型
                 media_type = validate_file_type(file)
                 
-                # 读取文件内容
-                file_content = file.file.read()
-                file.file.seek(0)
-                
-                # 验证文件大小
-                validate_file_size(len(file_content))
-                
-                # 生成目录路径
-                directory_path = file_signature_manager.generate_directory_path(user.id, media_type)
-                os.makedirs(directory_path, exist_ok=True)
-                
-                # 生成唯一文件名
-                unique_filename = generate_unique_filename(file.filename)
-                
-                # 完整文件路径
-                file_path = os.path.join(directory_path, unique_filename)
-                
-                # 保存文件
-                with open(file_path, "wb") as buffer:
-                    buffer.write(file_content)
+                # 分块写入文件，同时校验大小
+                stored = store_media_upload(db, file, user.id, media_type)
+                if media_type == "image":
+                    thumbnails.schedule(stored.path)
                 
                 # 生成相对路径
-                relative_path = os.path.relpath(file_path, '.').replace('\\', '/')
+                relative_path = os.path.relpath(stored.path, '.').replace('\\', '/')
                 
                 # 生成签名URL
                 signed_url = file_signature_manager.generate_signed_url(relative_path)
@@ -177,7 +187,8 @@ def upload_media_batch(
                     "media_type": media_type,
                     "description": description,
                     "original_filename": file.filename,
-                    "size": len(file_content),
+                    "size": stored.size,
+                    "content_hash": stored.sha256,
                     "sort_order": i,
                     "file_path": relative_path,  # 保持兼容性
                     "signed_url": signed_url     # 如果前端需要立即预览，可以使用这个
@@ -195,13 +206,165 @@ def upload_media_batch(
         return fail(f"批量上传失败: {str(e)}")
 
 
+class ResumableUploadCreate(BaseModel):
+    filename: str
+    content_type: str
+    size: int
+    description: Optional[str] = None
+
+
+@router.post("/resumable")
+def create_resumable_upload(
+    data: ResumableUploadCreate,
+    user: User = Depends(get_current_user)
+):
+    """创建断点续传会话"""
+    try:
+        allowed, media_type = file_signature_manager.is_allowed_file_type(data.content_type)
+        if not allowed:
+            allowed_types = settings.upload.allowed_image_types + settings.upload.allowed_video_types
+            return fail(f"不支持的文件类型: {data.content_type}. 支持的格式: {', '.join(allowed_types)}")
+        if data.size <= 0:
+            return fail("文件大小无效")
+        if not file_signature_manager.is_file_size_allowed(data.size):
+            return fail(file_too_large_message())
+        
+        session = resumable_upload.create_session(
+            user.id, data.filename, data.content_type, media_type, data.size, data.description
+        )
+        return ok(session, "上传会话已创建")
+    except Exception as e:
+        return fail(f"创建上传会话失败: {str(e)}")
+
+
+@router.put("/resumable/{upload_id}/parts/{part_number}")
+async def upload_resumable_part(
+    upload_id: str,
+    part_number: int,
+    request: Request,
+    user: User = Depends(get_current_user)
+):
+    """
+    上传单个分片（请求体为分片原始字节，重复上传同一分片会覆盖）
+
+    分片不超过 resumable_chunk_size，先在内存中收齐；Redis 与文件操作放到线程中执行，
+    不阻塞事件循环。
+    """
+    try:
+        meta = await asyncio.to_thread(resumable_upload.get_session, upload_id, user.id)
+        expected = resumable_upload.expected_part_size(meta, part_number)
+        
+        body = bytearray()
+        async for chunk in request.stream():
+            body += chunk
+            if len(body) > expected:
+                raise ResumableUploadError(f"分片大小应为 {expected} 字节")
+        if len(body) != expected:
+            raise ResumableUploadError(f"分片大小应为 {expected} 字节")
+        
+        await asyncio.to_thread(_store_part, upload_id, part_number, body)
+        return ok({"part_number": part_number, "size": len(body)}, "分片上传成功")
+    except ResumableUploadError as e:
+        return fail(str(e))
+    except Exception as e:
+        return fail(f"分片上传失败: {str(e)}")
+
+
+def _store_part(upload_id: str, part_number: int, body: bytes):
+    """写入分片临时文件并提交（在线程中执行）"""
+    out, tmp_path = resumable_upload.open_part(upload_id)
+    try:
+        with out:
+            out.write(body)
+        resumable_upload.commit_part(upload_id, part_number, tmp_path, len(body))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@router.get("/resumable/{upload_id}")
+def get_resumable_upload(
+    upload_id: str,
+    user: User = Depends(get_current_user)
+):
+    """查询断点续传进度（已接收的分片与字节范围）"""
+    try:
+        meta = resumable_upload.get_session(upload_id, user.id)
+        return ok(resumable_upload.status(meta, upload_id))
+    except ResumableUploadError as e:
+        return fail(str(e))
+    except Exception as e:
+        return fail(f"查询上传进度失败: {str(e)}")
+
+
+@router.post("/resumable/{upload_id}/complete")
+def complete_resumable_upload(
+    upload_id: str,
+    user: User = Depends(get_current_user)
+):
+    """全部分片上传后合并为最终文件"""
+    try:
+        meta = resumable_upload.get_session(upload_id, user.id)
+        
+        directory_path = file_signature_manager.generate_directory_path(user.id, meta["media_type"])
+        unique_filename = generate_unique_filename(meta["filename"])
+        stored = resumable_upload.assemble(meta, upload_id, directory_path, unique_filename)
+        if meta["media_type"] == "image":
+            thumbnails.schedule(stored.path)
+        
+        relative_path = os.path.relpath(stored.path, '.').replace('\\', '/')
+        signed_url = file_signature_manager.generate_signed_url(relative_path)
+        
+        return ok({
+            "media_url": relative_path,  # 返回文件路径，不包含签名
+            "media_type": meta["media_type"],
+            "description": meta["description"],
+            "original_filename": meta["filename"],
+            "size": stored.size,
+            "file_path": relative_path,  # 保持兼容性
+            "signed_url": signed_url
+        }, "文件上传成功")
+    except ResumableUploadError as e:
+        return fail(str(e))
+    except Exception as e:
+        return fail(f"合并文件失败: {str(e)}")
+
+
+@router.delete("/resumable/{upload_id}")
+def abort_resumable_upload(
+    upload_id: str,
+    user: User = Depends(get_current_user)
+):
+    """取消断点续传并删除已上传的分片"""
+    try:
+        resumable_upload.get_session(upload_id, user.id)
+        resumable_upload.abort(upload_id)
+        return ok(None, "上传已取消")
+    except ResumableUploadError as e:
+        return fail(str(e))
+    except Exception as e:
+        return fail(f"取消上传失败: {str(e)}")
+
+
 @router.delete("/media")
 def delete_media(
     file_path: str,
+    db: Session = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
     """删除媒体文件"""
     try:
+        # 内容寻址文件：只释放当前用户的引用
+        released = media_store.release(db, file_path, user.id)
+        if released is not None:
+            if not released:
+                db.rollback()
+                return fail("无权删除该文件")
+            db.commit()
+            if media_store.purge_if_unreferenced(db, file_path):
+                thumbnails.remove_variants(file_path)
+            return ok(None, "文件删除成功")
+        
         # 检查文件是否存在
         if os.path.exists(file_path):
             # 简单检查：确保文件路径在上传目录内（防止路径遍历攻击）
@@ -211,12 +374,14 @@ def delete_media(
             if not abs_file_path.startswith(abs_upload_dir):
                 return fail("无权删除该文件")
             
+            thumbnails.remove_variants(file_path)
             os.remove(file_path)
             return ok(None, "文件删除成功")
         else:
             return fail("文件不存在")
             
     except Exception as e:
+        db.rollback()
         return fail(f"删除文件失败: {str(e)}")
 
 
@@ -280,23 +445,14 @@ def upload_avatar(
                 detail="头像只支持图片格式"
             )
         
-        # 读取文件内容以获取大小
-        file_content = file.file.read()
-        file.file.seek(0)  # 重置文件指针
-        
-        # 验证文件大小（头像限制为2MB）
-        if len(file_content) > 2 * 1024 * 1024:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="头像文件过大，最大允许2MB"
-            )
-        
         # 生成头像存储路径
         avatar_path = generate_avatar_path(user.id, file.filename)
         
-        # 保存文件
-        with open(avatar_path, "wb") as buffer:
-            buffer.write(file_content)
+        # 分块写入文件（头像限制为2MB）
+        stored = store_upload(
+            file, os.path.dirname(avatar_path), os.path.basename(avatar_path),
+            2 * 1024 * 1024, "头像文件过大，最大允许2MB"
+        )
         
         # 返回简化的访问URL（通过前端代理）
         # 从 uploads/avatars/xxx.jpg 提取文件名，返回 /avatars/xxx.jpg
@@ -307,7 +463,7 @@ def upload_avatar(
             "media_url": public_url,  # 公开访问路径
             "media_type": "image",
             "original_filename": file.filename,
-            "size": len(file_content)
+            "size": stored.size
         }, "头像上传成功")
         
     except HTTPException:
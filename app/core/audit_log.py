@@ -0,0 +1,180 @@
+"""
+操作日志异步批量写入器
+
+请求路径只负责把日志放入内存队列，由后台协程按批次（满 batch_size 条
+或每隔 flush_interval_ms 毫秒）以多行 INSERT 写入 op_logs。
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+from sqlalchemy import select
+
+from .config import load_settings
+from ..db.session import engine
+from ..models.oplog import OpLog
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+
+class AuditLogWriter:
+    """操作日志批量写入器"""
+
+    def __init__(self):
+        self.config = load_settings().audit_log
+        if self.config.overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown audit log overflow policy: {self.config.overflow_policy}")
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._closing = False
+
+        # 计数器
+        self.queued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+
+    async def start(self):
+        """启动后台刷写协程"""
+        if not self.config.enabled or self._worker is not None:
+            return
+        self._closing = False
+        self._queue = asyncio.Queue(maxsize=self.config.queue_size)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止后台协程并刷出队列中剩余的日志"""
+        if self._worker is None:
+            return
+        self._closing = True
+        await self._worker
+        self._worker = None
+
+        remaining = []
+        while not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        batch_size = self.config.batch_size
+        for i in range(0, len(remaining), batch_size):
+            await self._flush(remaining[i:i + batch_size])
+
+    async def enqueue(
+        self,
+        path: str,
+        method: str,
+        action: str = "REQUEST",
+        user_id: Optional[int] = None,
+        username: Optional[str] = None,
+        detail: Optional[str] = None,
+    ):
+        """
+        日志入队
+
+        user_id 未知时可以只传 username，写入时按批次统一解析为用户ID。
+        队列满时按 overflow_policy 处理：丢弃新日志、丢弃最旧日志或短暂阻塞等待。
+        """
+        if self._queue is None or self._closing:
+            return
+
+        entry = {
+            "user_id": user_id,
+            "username": username,
+            "action": action,
+            "path": path[:255],
+            "method": method,
+            "detail": detail,
+            "created_at": datetime.utcnow(),
+        }
+
+        policy = self.config.overflow_policy
+        if policy == "block":
+            try:
+                await asyncio.wait_for(self._queue.put(entry), self.config.block_timeout_ms / 1000)
+            except asyncio.TimeoutError:
+                self.dropped += 1
+                return
+        else:
+            if self._queue.full():
+                if policy == "drop_newest":
+                    self.dropped += 1
+                    return
+                # drop_oldest：挤掉队首最旧的一条
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except asyncio.QueueEmpty:
+                    pass
+            self._queue.put_nowait(entry)
+        self.queued += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """写入器计数"""
+        return {
+            "enabled": self.config.enabled,
+            "running": self._worker is not None,
+            "overflow_policy": self.config.overflow_policy,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "queued": self.queued,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        interval = self.config.flush_interval_ms / 1000
+        batch_size = self.config.batch_size
+
+        while not self._closing:
+            batch = []
+            deadline = loop.time() + interval
+            while len(batch) < batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            if batch:
+                await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        try:
+            await asyncio.to_thread(self._write_batch, batch)
+            self.flushed += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.warning("写入操作日志失败（%d 条）: %s", len(batch), e)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        """在线程中执行：批量解析用户名并多行插入"""
+        usernames = {e["username"] for e in batch if e["user_id"] is None and e["username"]}
+        with engine.begin() as conn:
+            user_ids = {}
+            if usernames:
+                user_ids = dict(
+                    conn.execute(
+                        select(User.username, User.id).where(User.username.in_(usernames))
+                    ).all()
+                )
+            rows = [
+                {
+                    "user_id": e["user_id"] if e["user_id"] is not None else user_ids.get(e["username"]),
+                    "action": e["action"],
+                    "path": e["path"],
+                    "method": e["method"],
+                    "detail": e["detail"],
+                    "created_at": e["created_at"],
+                }
+                for e in batch
+            ]
+            conn.execute(OpLog.__table__.insert().values(rows))
+
+
+# 全局实例
+audit_log_writer = AuditLogWriter()
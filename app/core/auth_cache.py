@@ -0,0 +1,188 @@
+"""
+认证用户进程内缓存
+
+get_current_user 每次都要查询 Redis 中的 token 和 MySQL 中的用户，
+这里按 token 缓存校验通过的用户快照（列值），有效期较短且容量有上限。
+命中时跳过 JWT 解码、Redis 和 MySQL，快照以 merge(load=False) 挂到请求会话上，
+处理函数仍可修改并提交。
+
+用户重新登录、被禁用或修改资料时通过 Redis 发布订阅通知所有工作进程失效。
+"""
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Set, NamedTuple
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from .config import load_settings
+from .redis_client import get_redis
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry(NamedTuple):
+    username: str
+    values: Dict[str, Any]
+    expires_at: float
+
+
+class AuthCache:
+    """token -> 用户快照的 TTL LRU 缓存"""
+
+    def __init__(self):
+        self.config = load_settings().auth_cache
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._listener = None
+
+        # 计数器
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._miss_seconds = 0.0
+        self._timed_misses = 0
+
+    def get(self, token: str) -> Optional[_Entry]:
+        # 未订阅失效消息时无法感知其他进程的变更，不使用缓存
+        if not self.config.enabled or self._listener is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry.expires_at <= now:
+                if entry is not None:
+                    self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry
+
+    def username_for(self, token: str) -> Optional[str]:
+        """只读取用户名，不影响命中统计"""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry.expires_at <= time.monotonic():
+                return None
+            return entry.username
+
+    def put(self, token: str, user: User, token_expires_at: Optional[float], elapsed: float):
+        """
+        缓存校验通过的用户
+
+        token_expires_at 为 JWT 的过期时间戳，缓存不会晚于 token 过期；
+        elapsed 为本次未命中时查询 Redis 与数据库的耗时，用于估算节省的延迟。
+        """
+        if not self.config.enabled or self._listener is None:
+            return
+        ttl = self.config.ttl_seconds
+        if token_expires_at is not None:
+            ttl = min(ttl, token_expires_at - time.time())
+        values = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+        with self._lock:
+            self._miss_seconds += elapsed
+            self._timed_misses += 1
+            if ttl <= 0:
+                return
+            self._remove(token)
+            self._entries[token] = _Entry(user.username, values, time.monotonic() + ttl)
+            self._tokens_by_user.setdefault(user.username, set()).add(token)
+            while len(self._entries) > self.config.max_size:
+                self._remove(next(iter(self._entries)))
+
+    @staticmethod
+    def attach(db: Session, entry: _Entry) -> User:
+        """把快照挂到当前会话上，不会触发查询"""
+        user = User(**entry.values)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    @staticmethod
+    async def attach_async(db: AsyncSession, entry: _Entry) -> User:
+        """attach 的异步版本"""
+        user = User(**entry.values)
+        make_transient_to_detached(user)
+        return await db.merge(user, load=False)
+
+    def _remove(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._tokens_by_user.get(entry.username)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry.username]
+
+    def invalidate_local(self, username: Optional[str] = None):
+        """失效本进程内某个用户的缓存，username 为空时清空全部"""
+        with self._lock:
+            self.invalidations += 1
+            if username is None:
+                self._entries.clear()
+                self._tokens_by_user.clear()
+                return
+            for token in list(self._tokens_by_user.get(username, ())):
+                self._remove(token)
+
+    def invalidate(self, username: str):
+        """失效用户缓存并通知其他工作进程"""
+        self.invalidate_local(username)
+        try:
+            get_redis().publish(self.config.channel, username)
+        except Exception as e:
+            logger.warning("发布认证缓存失效消息失败: %s", e)
+
+    def start_listener(self):
+        """订阅失效消息（后台线程）"""
+        if not self.config.enabled or self._listener is not None:
+            return
+
+        def handle(message):
+            self.invalidate_local(message["data"])
+
+        def handle_error(e, pubsub, thread):
+            # 订阅中断期间可能漏掉失效消息，清空本地缓存
+            logger.warning("认证缓存订阅异常: %s", e)
+            self.invalidate_local()
+
+        try:
+            pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.config.channel: handle})
+            self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True, exception_handler=handle_error)
+        except Exception as e:
+            logger.warning("订阅认证缓存失效消息失败，缓存不启用: %s", e)
+
+    def stop_listener(self):
+        if self._listener is None:
+            return
+        self._listener.stop()
+        self._listener = None
+        self.invalidate_local()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_miss_ms = self._miss_seconds / self._timed_misses * 1000 if self._timed_misses else 0.0
+            return {
+                "enabled": self.config.enabled,
+                "size": len(self._entries),
+                "max_size": self.config.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "avg_miss_latency_ms": round(avg_miss_ms, 3),
+                # 按未命中的平均耗时估算
+                "saved_latency_ms": round(self.hits * avg_miss_ms, 1),
+            }
+
+
+# 全局实例
+auth_cache = AuthCache()
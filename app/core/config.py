@@ -31,6 +31,9 @@ class UploadAccessSignatureSettings(BaseModel):
     secret_key: str
     expires_minutes: int = 60
     algorithm: str = "HS256"
+    url_window_seconds: int = 300  # 过期时间对齐的窗口，同一窗口内签名URL保持不变
+    signature_cache_size: int = 8192  # 签名 LRU 缓存容量
+    accept_legacy_signatures: bool = True  # 迁移期间仍接受旧版（JSON）签名
 
 
 class UploadSettings(BaseModel):
@@ -41,6 +44,12 @@ class UploadSettings(BaseModel):
     access_signature: UploadAccessSignatureSettings
     directory_strategy: str = "date_user"  # date_user | user_date | simple
     create_thumbnails: bool = True
+    thumbnail_widths: list[int] = [200, 400, 800]  # 缩略图宽度（像素）
+    thumbnail_quality: int = 80  # WebP 质量
+    thumbnail_workers: int = 2  # 生成缩略图的进程数
+    resumable_chunk_size: int = 5 * 1024 * 1024  # 断点续传分片大小
+    resumable_ttl_seconds: int = 86400  # 断点续传会话有效期
+    deduplicate: bool = True  # 媒体文件按内容哈希存储，重复上传只增加引用
 
 
 class MapSettings(BaseModel):
@@ -61,6 +70,60 @@ class MapsSettings(BaseModel):
     encryption: MapEncryptionSettings = MapEncryptionSettings()
 
 
+class AuditLogSettings(BaseModel):
+    enabled: bool = True
+    queue_size: int = 10000  # 内存队列容量
+    batch_size: int = 200  # 单次批量写入的最大行数
+    flush_interval_ms: int = 1000  # 最长刷写间隔
+    overflow_policy: str = "drop_newest"  # drop_newest | drop_oldest | block
+    block_timeout_ms: int = 50  # block 策略下入队的最长等待时间
+    retention_months: int = 6  # 在线保留的月份数（含当月），更早的分区归档后删除；0 表示不归档
+    partition_months_ahead: int = 3  # 预先创建的未来月份分区数
+    archive_dir: str = "archives/op_logs"  # 归档文件目录（gzip 压缩的 JSONL）
+    maintenance_interval_seconds: int = 86400  # 分区维护与归档任务的执行间隔
+    browse_window_days: int = 7  # 浏览日志时未指定起始时间的默认时间范围
+
+
+class AuthCacheSettings(BaseModel):
+    enabled: bool = True
+    ttl_seconds: int = 30  # 认证用户缓存时间
+    max_size: int = 10000  # 每个进程缓存的 token 数量上限
+    channel: str = "auth:invalidate"  # 跨进程失效的发布订阅频道
+
+
+class SearchSettings(BaseModel):
+    enabled: bool = True  # 关闭后搜索回退为 LIKE 查询
+    rebuild_batch_size: int = 1000
+    user_count_cache_seconds: int = 60  # 管理后台用户搜索结果总数的缓存时间
+
+
+class GeoSettings(BaseModel):
+    bbox_max_results: int = 500  # 矩形查询单次返回上限
+    bbox_max_cells: int = 32  # 矩形覆盖使用的 geohash 前缀数量上限
+    cluster_max_cells: int = 1024  # 聚合查询的单元数量上限，超过时降低精度
+    cluster_point_threshold: int = 20  # 单元内足迹不超过该数量时返回原始点
+    cluster_cache_ttl: int = 86400  # 单元聚合缓存时间（秒）
+
+
+class HeatmapSettings(BaseModel):
+    grid_size: int = 64  # 每个瓦片的网格边长
+    max_zoom: int = 18
+    cache_ttl: int = 7 * 86400  # 瓦片缓存时间（秒）
+
+
+class FeedCacheSettings(BaseModel):
+    enabled: bool = True
+    ttl_seconds: int = 300  # 列表缓存时间，不超过签名URL有效期
+    lock_timeout_ms: int = 3000  # 单个键生成锁的超时时间
+    wait_interval_ms: int = 50  # 等待其他请求生成缓存的轮询间隔
+
+
+class StatsSettings(BaseModel):
+    reconcile_interval_seconds: int = 3600  # 计数对账间隔
+    reconcile_days: int = 35  # 对账时重新计算最近多少天的日分桶
+    active_user_days: int = 7  # 活跃用户统计窗口（天）
+
+
 class AppSettings(BaseModel):
     server: ServerSettings
     mysql: MySQLSettings
@@ -68,6 +131,13 @@ class AppSettings(BaseModel):
     jwt: JWTSettings
     upload: UploadSettings
     maps: MapsSettings = None
+    audit_log: AuditLogSettings = AuditLogSettings()
+    auth_cache: AuthCacheSettings = AuthCacheSettings()
+    search: SearchSettings = SearchSettings()
+    geo: GeoSettings = GeoSettings()
+    heatmap: HeatmapSettings = HeatmapSettings()
+    feed_cache: FeedCacheSettings = FeedCacheSettings()
+    stats: StatsSettings = StatsSettings()
 
 
 @lru_cache
@@ -1,5 +1,6 @@
 from functools import lru_cache
 import redis
+import redis.asyncio as aioredis
 from .config import load_settings
 
 
@@ -8,3 +9,19 @@ def get_redis() -> redis.Redis:
     settings = load_settings()
     client = redis.from_url(settings.redis.url, decode_responses=True)
     return client
+
+
+@lru_cache
+def get_redis_binary() -> redis.Redis:
+    """不解码响应的客户端，用于存取二进制数据"""
+    settings = load_settings()
+    client = redis.from_url(settings.redis.url, decode_responses=False)
+    return client
+
+
+@lru_cache
+def get_async_redis() -> aioredis.Redis:
+    """异步客户端，供 async def 路由使用"""
+    settings = load_settings()
+    client = aioredis.from_url(settings.redis.url, decode_responses=True)
+    return client
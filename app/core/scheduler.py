@@ -0,0 +1,63 @@
+"""
+周期任务调度器
+
+每个任务一个后台协程：启动后立即执行一次，之后按间隔重复。
+多个工作进程同时运行时，用 Redis 锁（SET NX EX）保证同一时刻只有一个进程执行某个任务。
+任务函数是同步的，在线程中运行，自行创建数据库会话。
+"""
+import asyncio
+import logging
+import os
+from typing import Callable, Dict, Optional
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+LOCK_PREFIX = "scheduler:lock:"
+
+
+class Scheduler:
+    """周期任务调度器"""
+
+    def __init__(self):
+        self._jobs: Dict[str, tuple] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._owner = f"{os.getpid()}"
+
+    def add_job(self, name: str, interval: int, func: Callable[[], None]):
+        """注册任务，interval 为执行间隔（秒）"""
+        self._jobs[name] = (interval, func)
+
+    def start(self):
+        for name, (interval, func) in self._jobs.items():
+            if name not in self._tasks:
+                self._tasks[name] = asyncio.create_task(self._loop(name, interval, func))
+
+    async def stop(self):
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+    def _acquire(self, name: str, ttl: int) -> Optional[bool]:
+        """取得任务锁；Redis 不可用时返回 None，仍在本进程执行"""
+        try:
+            return bool(get_redis().set(LOCK_PREFIX + name, self._owner, nx=True, ex=ttl))
+        except Exception as e:
+            logger.warning("获取任务锁失败: %s", e)
+            return None
+
+    async def _loop(self, name: str, interval: int, func: Callable[[], None]):
+        while True:
+            # 锁在间隔结束前不释放，其他进程本轮不会重复执行
+            if self._acquire(name, max(interval - 1, 1)) is not False:
+                try:
+                    await asyncio.to_thread(func)
+                except Exception as e:
+                    logger.warning("周期任务 %s 执行失败: %s", name, e)
+            await asyncio.sleep(interval)
+
+
+# 全局实例
+scheduler = Scheduler()
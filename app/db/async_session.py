@@ -0,0 +1,23 @@
+"""
+异步数据库会话
+
+与 session.py 中的同步引擎并存，供 async def 路由使用，
+等待数据库时不占用线程池。连接串沿用 mysql.url，驱动替换为 aiomysql。
+"""
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from ..core.config import load_settings
+
+
+def _async_url(url: str):
+    return make_url(url).set(drivername="mysql+aiomysql")
+
+
+settings = load_settings()
+async_engine = create_async_engine(_async_url(settings.mysql.url), pool_pre_ping=True, pool_recycle=3600)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
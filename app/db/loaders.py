@@ -0,0 +1,31 @@
+"""
+足迹/评论对象图的加载策略
+
+集合关系（标签、媒体、评论图片）使用 selectinload，按主键 IN 批量查询，
+避免多个集合 JOIN 在一起产生笛卡尔积；多对一关系（类型、作者、标签本身）保留 JOIN。
+每个查询的语句数量固定，与结果行数无关。
+"""
+from sqlalchemy.orm import joinedload, selectinload
+
+from ..models import Footprint, FootprintTag, Comment
+
+
+def footprint_options():
+    """足迹卡片：类型、作者、标签、媒体"""
+    return (
+        joinedload(Footprint.footprint_type),
+        joinedload(Footprint.user),
+        selectinload(Footprint.tags).joinedload(FootprintTag.tag),
+        selectinload(Footprint.medias),
+    )
+
+
+def comment_options(include_footprint: bool = False):
+    """评论：作者、图片，可选所属足迹（回复通过物化路径单独加载）"""
+    options = (
+        joinedload(Comment.user),
+        selectinload(Comment.images),
+    )
+    if include_footprint:
+        options += (joinedload(Comment.footprint),)
+    return options
@@ -0,0 +1,55 @@
+"""
+数据库结构变更（向后兼容）
+
+create_all 只会创建缺失的表，已有表上新增的列和索引在这里补齐。
+每条语句独立执行，已存在时的报错直接忽略。
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+
+SCHEMA_UPGRADES = [
+    "ALTER TABLE footprints ADD COLUMN is_public TINYINT(1) NOT NULL DEFAULT 0",
+    # 键集分页索引
+    "CREATE INDEX ix_footprints_public_created ON footprints (is_public, created_at, id)",
+    "CREATE INDEX ix_footprints_user_created ON footprints (user_id, created_at, id)",
+    # 地图矩形查询
+    "ALTER TABLE footprints ADD COLUMN geohash VARCHAR(12) NULL COMMENT '坐标 geohash 编码'",
+    "CREATE INDEX ix_footprints_public_geohash ON footprints (is_public, geohash)",
+    # 旅行报告
+    "CREATE INDEX ix_footprints_user_visit ON footprints (user_id, visit_time, id)",
+    # 评论分页
+    "CREATE INDEX ix_comments_footprint_parent_created ON comments (footprint_id, parent_id, is_deleted, created_at, id)",
+    # 评论物化路径
+    "ALTER TABLE comments ADD COLUMN path VARCHAR(765) CHARACTER SET ascii COLLATE ascii_bin NULL COMMENT '物化路径：从根到自身的ID序列'",
+    "ALTER TABLE comments ADD COLUMN depth SMALLINT NOT NULL DEFAULT 0 COMMENT '层级：顶级评论为0'",
+    "CREATE INDEX ix_comments_footprint_path ON comments (footprint_id, path)",
+    # 操作日志按月分区：主键需包含分区列（分区本身由 oplog_archive 维护任务建立）
+    "ALTER TABLE op_logs DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)",
+    "CREATE INDEX ix_op_logs_created ON op_logs (created_at, id)",
+    # 操作日志查询
+    "CREATE INDEX ix_op_logs_user ON op_logs (user_id, id)",
+    "CREATE INDEX ix_op_logs_action ON op_logs (action, id)",
+    "CREATE INDEX ix_op_logs_path ON op_logs (path, id)",
+    "DROP INDEX ix_op_logs_user_id ON op_logs",
+    # 管理后台用户搜索
+    "CREATE INDEX ix_users_nickname ON users (nickname)",
+    "CREATE INDEX ix_users_status_id ON users (status, id)",
+    # 足迹-标签关联唯一：先删除重复关联（保留最早的一条）
+    "DELETE ft FROM footprint_tags ft JOIN footprint_tags dup "
+    "ON dup.footprint_id = ft.footprint_id AND dup.tag_id = ft.tag_id AND dup.id < ft.id",
+    "CREATE UNIQUE INDEX uq_footprint_tags_footprint_tag ON footprint_tags (footprint_id, tag_id)",
+    # 删除内容时检查内容寻址文件是否仍被使用
+    "CREATE INDEX ix_footprint_medias_media_url ON footprint_medias (media_url)",
+    "CREATE INDEX ix_comment_images_image_url ON comment_images (image_url)",
+]
+
+
+def apply_schema_upgrades(engine: Engine):
+    """依次执行结构变更语句"""
+    for statement in SCHEMA_UPGRADES:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(statement))
+        except Exception:
+            pass
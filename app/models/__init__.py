@@ -5,6 +5,10 @@ from .footprint import Footprint
 from .tag import Tag, FootprintTag
 from .media import FootprintMedia
 from .comment import Comment, CommentImage
+from .search import FootprintSearchToken, UserSearchToken, SearchIndexState
+from .travel_report import UserTravelStats, UserTravelDay, UserTravelCity
+from .media_blob import MediaBlob, MediaBlobRef
+from .stats import StatsCounter, StatsDaily
 
 __all__ = [
     "User",
@@ -14,5 +18,15 @@ __all__ = [
     "FootprintTag",
     "FootprintMedia",
     "Comment",
-    "CommentImage"
+    "CommentImage",
+    "FootprintSearchToken",
+    "UserSearchToken",
+    "SearchIndexState",
+    "UserTravelStats",
+    "UserTravelDay",
+    "UserTravelCity",
+    "MediaBlob",
+    "MediaBlobRef",
+    "StatsCounter",
+    "StatsDaily"
 ]
@@ -1,17 +1,25 @@
 from datetime import datetime
-from sqlalchemy import String, DateTime, Integer, ForeignKey, Text, SmallInteger
+from sqlalchemy import String, DateTime, Integer, ForeignKey, Text, SmallInteger, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from ..db.session import Base
 
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        # 足迹评论分页：按 (created_at, id) 倒序读取顶级评论
+        Index("ix_comments_footprint_parent_created", "footprint_id", "parent_id", "is_deleted", "created_at", "id"),
+        # 评论树：按路径前缀读取子树
+        Index("ix_comments_footprint_path", "footprint_id", "path"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, comment='评论ID')
     footprint_id: Mapped[int] = mapped_column(ForeignKey("footprints.id", ondelete="CASCADE"), index=True, nullable=False, comment='足迹ID')
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True, nullable=False, comment='用户ID')
     parent_id: Mapped[int | None] = mapped_column(ForeignKey("comments.id", ondelete="CASCADE"), index=True, nullable=True, comment='父评论ID')
     content: Mapped[str] = mapped_column(Text, nullable=False, comment='评论内容')
+    path: Mapped[str | None] = mapped_column(String(765, collation="ascii_bin"), nullable=True, comment='物化路径：从根到自身的ID序列')
+    depth: Mapped[int] = mapped_column(SmallInteger, default=0, nullable=False, comment='层级：顶级评论为0')
     is_deleted: Mapped[int] = mapped_column(SmallInteger, default=0, nullable=False, comment='是否删除：0-未删除，1-已删除')
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, comment='创建时间')
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, comment='更新时间')
@@ -28,7 +36,7 @@ class CommentImage(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, comment='图片ID')
     comment_id: Mapped[int] = mapped_column(ForeignKey("comments.id", ondelete="CASCADE"), index=True, nullable=False, comment='评论ID')
-    image_url: Mapped[str] = mapped_column(String(255), nullable=False, comment='图片URL')
+    image_url: Mapped[str] = mapped_column(String(255), index=True, nullable=False, comment='图片URL')
     description: Mapped[str | None] = mapped_column(String(255), nullable=True, comment='图片描述')
     sort_order: Mapped[int] = mapped_column(Integer, default=0, nullable=False, comment='排序顺序')
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, comment='上传时间')
@@ -1,5 +1,5 @@
 from datetime import datetime, date
-from sqlalchemy import String, Date, DateTime, Integer, ForeignKey, Text, Boolean, SmallInteger, DECIMAL
+from sqlalchemy import String, Date, DateTime, Integer, ForeignKey, Text, Boolean, SmallInteger, DECIMAL, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from ..db.session import Base
 
@@ -16,6 +16,7 @@ class Footprint(Base):
     address: Mapped[str | None] = mapped_column(String(255), nullable=True, comment='详细地址')
     visit_time: Mapped[date | None] = mapped_column(Date, nullable=True, comment='前往时间')
     description: Mapped[str | None] = mapped_column(Text, nullable=True, comment='描述/文章')
+    geohash: Mapped[str | None] = mapped_column(String(12), nullable=True, comment='坐标 geohash 编码')
     is_public: Mapped[int] = mapped_column(SmallInteger, default=1, nullable=False, comment='是否公开：0-私有，1-公开')
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, comment='创建时间')
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, comment='更新时间')
@@ -26,3 +27,13 @@ class Footprint(Base):
     tags = relationship("FootprintTag", back_populates="footprint", cascade="all, delete-orphan")
     medias = relationship("FootprintMedia", back_populates="footprint", cascade="all, delete-orphan")
     comments = relationship("Comment", back_populates="footprint", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # 键集分页：公开广场与用户时间线按 (created_at, id) 倒序
+        Index("ix_footprints_public_created", "is_public", "created_at", "id"),
+        Index("ix_footprints_user_created", "user_id", "created_at", "id"),
+        # 地图矩形查询
+        Index("ix_footprints_public_geohash", "is_public", "geohash"),
+        # 旅行报告：按前往时间查找路线上的相邻足迹
+        Index("ix_footprints_user_visit", "user_id", "visit_time", "id"),
+    )
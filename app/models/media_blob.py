@@ -0,0 +1,30 @@
+from datetime import datetime
+from sqlalchemy import String, DateTime, Integer, BigInteger, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from ..db.session import Base
+
+
+class MediaBlob(Base):
+    __tablename__ = "media_blobs"
+
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True, comment='内容 SHA-256')
+    path: Mapped[str] = mapped_column(String(255), unique=True, nullable=False, comment='存储路径')
+    media_type: Mapped[str] = mapped_column(String(20), nullable=False, comment='媒体类型：image/video')
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False, comment='文件大小（字节）')
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, comment='创建时间')
+
+    __table_args__ = (
+        {"comment": "内容寻址存储的文件"}
+    )
+
+
+class MediaBlobRef(Base):
+    __tablename__ = "media_blob_refs"
+
+    hash: Mapped[str] = mapped_column(ForeignKey("media_blobs.hash", ondelete="CASCADE"), primary_key=True, comment='内容 SHA-256')
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, comment='上传用户ID')
+    ref_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False, comment='该用户的引用次数')
+
+    __table_args__ = (
+        {"comment": "内容寻址文件的引用计数"}
+    )
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import String, DateTime, Integer
+from sqlalchemy import String, DateTime, Integer, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from ..db.session import Base
 
@@ -7,10 +7,20 @@ from ..db.session import Base
 class OpLog(Base):
     __tablename__ = "op_logs"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    user_id: Mapped[int | None] = mapped_column(Integer, index=True, nullable=True)
+    # 按 created_at 按月分区，主键必须包含分区列
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True, index=True)
+    user_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
     action: Mapped[str] = mapped_column(String(64), nullable=False)  # e.g., LOGIN, CREATE_FOOTPRINT
     path: Mapped[str] = mapped_column(String(255), nullable=False)
     method: Mapped[str] = mapped_column(String(16), nullable=False)
     detail: Mapped[str | None] = mapped_column(String(2000), nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, primary_key=True, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # 按时间范围浏览
+        Index("ix_op_logs_created", "created_at", "id"),
+        # 日志查询按 id 倒序翻页，筛选列后接 id
+        Index("ix_op_logs_user", "user_id", "id"),
+        Index("ix_op_logs_action", "action", "id"),
+        Index("ix_op_logs_path", "path", "id"),
+    )
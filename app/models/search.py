@@ -0,0 +1,39 @@
+from datetime import datetime
+from sqlalchemy import String, Integer, SmallInteger, DateTime, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from ..db.session import Base
+
+
+class FootprintSearchToken(Base):
+    __tablename__ = "footprint_search_tokens"
+
+    token: Mapped[str] = mapped_column(String(8, collation="utf8mb4_bin"), primary_key=True, comment='bigram 词元')
+    footprint_id: Mapped[int] = mapped_column(ForeignKey("footprints.id", ondelete="CASCADE"), primary_key=True, index=True, comment='足迹ID')
+    weight: Mapped[int] = mapped_column(Integer, default=0, nullable=False, comment='加权词频')
+
+    __table_args__ = (
+        {"comment": "足迹全文检索倒排索引"}
+    )
+
+
+class UserSearchToken(Base):
+    __tablename__ = "user_search_tokens"
+
+    token: Mapped[str] = mapped_column(String(8, collation="utf8mb4_bin"), primary_key=True, comment='bigram 词元')
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, index=True, comment='用户ID')
+
+    __table_args__ = (
+        {"comment": "用户搜索倒排索引（用户名/昵称/邮箱）"}
+    )
+
+
+class SearchIndexState(Base):
+    __tablename__ = "search_index_states"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True, comment='索引名称')
+    ready: Mapped[int] = mapped_column(SmallInteger, default=0, nullable=False, comment='是否可用：0-未建立或重建中，1-可用')
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, comment='更新时间')
+
+    __table_args__ = (
+        {"comment": "检索索引状态（全量重建期间不可用）"}
+    )
@@ -0,0 +1,28 @@
+from datetime import datetime, date
+from sqlalchemy import String, Date, DateTime, BigInteger
+from sqlalchemy.orm import Mapped, mapped_column
+from ..db.session import Base
+
+
+class StatsCounter(Base):
+    __tablename__ = "stats_counters"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True, comment='计数器名称，如 footprints.public')
+    value: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False, comment='当前值')
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, comment='更新时间')
+
+    __table_args__ = (
+        {"comment": "系统统计计数器"}
+    )
+
+
+class StatsDaily(Base):
+    __tablename__ = "stats_daily"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True, comment='日期（UTC）')
+    metric: Mapped[str] = mapped_column(String(32), primary_key=True, comment='指标，如 users.new')
+    value: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False, comment='当天数值')
+
+    __table_args__ = (
+        {"comment": "系统统计按日分桶"}
+    )
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import String, DateTime, Integer, ForeignKey
+from sqlalchemy import String, DateTime, Integer, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from ..db.session import Base
 
@@ -27,5 +27,6 @@ class FootprintTag(Base):
     tag = relationship("Tag", back_populates="footprint_tags")
 
     __table_args__ = (
+        Index("uq_footprint_tags_footprint_tag", "footprint_id", "tag_id", unique=True),
         {"comment": "足迹-标签关联表"}
     )
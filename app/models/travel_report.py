@@ -0,0 +1,43 @@
+from datetime import datetime, date
+from sqlalchemy import String, Date, DateTime, Integer, Float, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from ..db.session import Base
+
+
+class UserTravelStats(Base):
+    __tablename__ = "user_travel_stats"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, comment='用户ID')
+    footprint_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False, comment='足迹数量')
+    day_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False, comment='旅行天数（不同的前往日期）')
+    city_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False, comment='覆盖城市数量')
+    total_distance_km: Mapped[float] = mapped_column(Float, default=0, nullable=False, comment='按前往时间连线的总里程（公里）')
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, comment='更新时间')
+
+    __table_args__ = (
+        {"comment": "用户旅行报告汇总"}
+    )
+
+
+class UserTravelDay(Base):
+    __tablename__ = "user_travel_days"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, comment='用户ID')
+    visit_date: Mapped[date] = mapped_column(Date, primary_key=True, comment='前往日期')
+    footprint_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False, comment='当天足迹数量')
+
+    __table_args__ = (
+        {"comment": "用户旅行日期计数"}
+    )
+
+
+class UserTravelCity(Base):
+    __tablename__ = "user_travel_cities"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, comment='用户ID')
+    city: Mapped[str] = mapped_column(String(50), primary_key=True, comment='城市名称')
+    footprint_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False, comment='该城市足迹数量')
+
+    __table_args__ = (
+        {"comment": "用户旅行城市计数"}
+    )
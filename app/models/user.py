@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import String, Boolean, DateTime, Integer, Text, SmallInteger
+from sqlalchemy import String, Boolean, DateTime, Integer, Text, SmallInteger, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from ..db.session import Base
 
@@ -23,3 +23,10 @@ class User(Base):
     # 关系
     footprints = relationship("Footprint", back_populates="user", cascade="all, delete-orphan")
     comments = relationship("Comment", back_populates="user")
+
+    __table_args__ = (
+        # 管理后台按昵称前缀搜索
+        Index("ix_users_nickname", "nickname"),
+        # 按状态筛选的用户列表按 id 倒序翻页
+        Index("ix_users_status_id", "status", "id"),
+    )
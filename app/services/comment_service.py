@@ -0,0 +1,195 @@
+"""
+评论查询
+
+顶级评论按 (created_at, id) 倒序分页，由 ix_comments_footprint_parent_created 索引支撑。
+足迹详情只返回第一页顶级评论及总数，后续页面通过 /comments/footprint/{id} 的游标读取。
+
+评论树使用物化路径：path 为从根到自身的 ID 序列，每段 8 位十六进制加 "/"，
+如 "0000000c/0000002d/"。一组评论的全部回复用 (footprint_id, path) 索引上的
+前缀范围查询一次取出，按 parent_id 分组后 O(n) 组装成树。
+历史评论的路径由 backfill_paths 逐层补齐。回复最多 MAX_DEPTH 层，超出路径列长的历史回复不补齐。
+"""
+import logging
+from collections import defaultdict, Counter
+from typing import Dict, Any, List, Optional, Sequence
+
+from sqlalchemy import select, update, func, or_, and_, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..db.loaders import comment_options
+from ..models import Comment
+from ..utils.pagination import next_cursor
+from . import stats
+
+logger = logging.getLogger(__name__)
+
+
+# 路径列长 765，每层 9 个字符，最多容纳 85 层（depth 0~84）
+PATH_LENGTH = 765
+MAX_DEPTH = PATH_LENGTH // 9 - 1
+
+
+def path_segment(comment_id: int) -> str:
+    return f"{comment_id:08x}/"
+
+
+def assign_path(comment: Comment, parent: Optional[Comment]):
+    """
+    设置新评论的路径（flush 得到 ID 之后、commit 之前调用）
+
+    父评论尚未补齐路径时保持为空，由 backfill_paths 稍后补齐。
+    """
+    if parent is None:
+        comment.path = path_segment(comment.id)
+        comment.depth = 0
+    elif parent.path:
+        comment.path = parent.path + path_segment(comment.id)
+        comment.depth = parent.depth + 1
+
+
+def descendants_query(roots: Sequence[Comment], max_depth: Optional[int] = None):
+    """
+    一组评论的全部后代（不含自身）
+
+    每个根对应索引上的一段前缀范围；max_depth 限制相对根的层数。
+    """
+    ranges = []
+    for root in roots:
+        if not root.path:
+            continue
+        condition = and_(
+            Comment.footprint_id == root.footprint_id,
+            Comment.path.like(f"{root.path}%"),
+            Comment.depth > root.depth,
+        )
+        if max_depth is not None:
+            condition = and_(condition, Comment.depth <= root.depth + max_depth)
+        ranges.append(condition)
+    if not ranges:
+        return None
+    return select(Comment).where(or_(*ranges)).options(*comment_options()).order_by(Comment.path)
+
+
+def group_children(comments: Sequence[Comment]) -> Dict[int, List[Comment]]:
+    """
+    按父评论分组（parent_id -> 子评论列表）
+
+    comments 按 path 排序，同一父评论下的回复按 ID 先后排列。
+    已删除的评论不出现在分组中，其下的回复也就无法从根访问到。
+    """
+    children: Dict[int, List[Comment]] = defaultdict(list)
+    for comment in comments:
+        if comment.is_deleted == 0 and comment.parent_id is not None:
+            children[comment.parent_id].append(comment)
+    return children
+
+
+def load_children(db: Session, roots: Sequence[Comment], max_depth: Optional[int] = None) -> Dict[int, List[Comment]]:
+    query = descendants_query(roots, max_depth)
+    if query is None:
+        return {}
+    return group_children(db.execute(query).scalars().all())
+
+
+async def load_children_async(
+    db: AsyncSession, roots: Sequence[Comment], max_depth: Optional[int] = None
+) -> Dict[int, List[Comment]]:
+    query = descendants_query(roots, max_depth)
+    if query is None:
+        return {}
+    return group_children((await db.execute(query)).scalars().all())
+
+
+def soft_delete_subtree(db: Session, comment: Comment) -> int:
+    """
+    软删除评论及其全部回复（调用方负责 commit），返回受影响的评论数
+
+    有路径时按路径前缀查找子树；路径尚未补齐时用递归 CTE。
+    子树行先加锁读出创建时间用于更新评论计数，再一条 UPDATE 完成软删除。
+    """
+    if comment.path:
+        rows = db.execute(
+            select(Comment.id, Comment.created_at)
+            .where(
+                Comment.footprint_id == comment.footprint_id,
+                Comment.path.like(f"{comment.path}%"),
+                Comment.is_deleted == 0,
+            )
+            .with_for_update()
+        ).all()
+    else:
+        rows = db.execute(text(
+            "WITH RECURSIVE subtree (id) AS ("
+            "  SELECT id FROM comments WHERE id = :comment_id"
+            "  UNION ALL"
+            "  SELECT c.id FROM comments c JOIN subtree s ON c.parent_id = s.id"
+            ") "
+            "SELECT c.id, c.created_at FROM comments c JOIN subtree s ON c.id = s.id "
+            "WHERE c.is_deleted = 0 FOR UPDATE"
+        ), {"comment_id": comment.id}).all()
+    if not rows:
+        return 0
+
+    db.execute(
+        update(Comment)
+        .where(Comment.id.in_([row.id for row in rows]))
+        .values(is_deleted=1)
+        .execution_options(synchronize_session=False)
+    )
+    per_day = Counter(row.created_at.date() for row in rows)
+    stats.on_comments_changed(db, {day: -count for day, count in per_day.items()})
+    return len(rows)
+
+
+def backfill_paths(db: Session) -> int:
+    """逐层补齐历史评论的路径，返回更新的行数"""
+    total = db.execute(text(
+        "UPDATE comments SET path = CONCAT(LOWER(LPAD(HEX(id), 8, '0')), '/'), depth = 0 "
+        "WHERE parent_id IS NULL AND path IS NULL"
+    )).rowcount
+    db.commit()
+    while True:
+        updated = db.execute(text(
+            "UPDATE comments c JOIN comments p ON c.parent_id = p.id "
+            "SET c.path = CONCAT(p.path, LOWER(LPAD(HEX(c.id), 8, '0')), '/'), c.depth = p.depth + 1 "
+            "WHERE c.path IS NULL AND p.path IS NOT NULL AND p.depth < :max_depth"
+        ), {"max_depth": MAX_DEPTH}).rowcount
+        db.commit()
+        if not updated:
+            break
+        total += updated
+    if total:
+        logger.info("已补齐 %s 条评论的路径", total)
+    return total
+
+
+def top_level_comments(footprint_id: int):
+    """足迹未删除的顶级评论，按 (created_at, id) 倒序"""
+    return (
+        select(Comment)
+        .where(
+            Comment.footprint_id == footprint_id,
+            Comment.parent_id.is_(None),
+            Comment.is_deleted == 0
+        )
+        .order_by(Comment.created_at.desc(), Comment.id.desc())
+    )
+
+
+async def first_page(db: AsyncSession, footprint_id: int, limit: int) -> Dict[str, Any]:
+    """第一页顶级评论（含作者与图片）、顶级评论总数与下一页游标"""
+    total = (await db.execute(
+        select(func.count()).select_from(Comment).where(
+            Comment.footprint_id == footprint_id,
+            Comment.parent_id.is_(None),
+            Comment.is_deleted == 0
+        )
+    )).scalar()
+    if not limit or not total:
+        return {"comments": [], "total": total, "next_cursor": None}
+
+    comments = (await db.execute(
+        top_level_comments(footprint_id).options(*comment_options()).limit(limit)
+    )).scalars().all()
+    return {"comments": comments, "total": total, "next_cursor": next_cursor(comments, limit)}
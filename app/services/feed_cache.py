@@ -0,0 +1,121 @@
+"""
+公开足迹列表响应缓存
+
+序列化后的响应按查询参数缓存在 Redis，键中带有代数（generation）：
+- feed:gen:global         任意公开足迹变化时递增，用于未按类型筛选的列表；
+- feed:gen:type:{type_id} 该类型的公开足迹变化时递增，用于按类型筛选的列表；
+- feed:gen:authors        用户修改昵称/头像时递增，所有列表都包含作者信息。
+代数递增后旧键不再被访问，由 TTL 自然过期。
+
+同一个键并发未命中时只有取得锁的请求查询数据库，其余请求等待其写入（single-flight）。
+缓存时间不超过签名URL的有效期，缓存中的媒体URL在缓存期内始终有效。
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Optional, Iterable, Callable, Awaitable
+
+from ..core.config import load_settings
+from ..core.redis_client import get_redis, get_async_redis
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_GEN_KEY = "feed:gen:global"
+AUTHORS_GEN_KEY = "feed:gen:authors"
+PAGE_PREFIX = "feed:page:"
+LOCK_PREFIX = "feed:lock:"
+
+
+def _type_gen_key(type_id: int) -> str:
+    return f"feed:gen:type:{type_id}"
+
+
+def cache_ttl() -> int:
+    """缓存时间：不超过签名URL的有效期"""
+    config = load_settings()
+    ttl = config.feed_cache.ttl_seconds
+    signature = config.upload.access_signature
+    if signature.enabled:
+        # 签名过期时间向上对齐，生成后至少有效 expires_minutes
+        ttl = min(ttl, signature.expires_minutes * 60)
+    return ttl
+
+
+async def _page_key(type_id: Optional[int], params: dict) -> str:
+    gen_key = _type_gen_key(type_id) if type_id is not None else GLOBAL_GEN_KEY
+    generation, authors = await get_async_redis().mget(gen_key, AUTHORS_GEN_KEY)
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+    scope = f"type:{type_id}" if type_id is not None else "all"
+    return f"{PAGE_PREFIX}{scope}:{generation or 0}:{authors or 0}:{digest}"
+
+
+async def get_or_compute(
+    type_id: Optional[int], params: dict, compute: Callable[[], Awaitable[dict]]
+) -> str:
+    """
+    读取缓存的响应 JSON，未命中时调用 compute 生成
+
+    compute 返回失败响应（success 为 False）时不写入缓存。Redis 不可用时直接计算。
+    """
+    config = load_settings().feed_cache
+    if not config.enabled:
+        return json.dumps(await compute(), ensure_ascii=False)
+
+    r = get_async_redis()
+    try:
+        key = await _page_key(type_id, params)
+        cached = await r.get(key)
+        if cached is not None:
+            return cached
+
+        lock_key = LOCK_PREFIX + key
+        lock_ms = config.lock_timeout_ms
+        if not await r.set(lock_key, "1", nx=True, px=lock_ms):
+            # 其他请求正在生成，等待其写入缓存
+            waited = 0
+            while waited < lock_ms:
+                await asyncio.sleep(config.wait_interval_ms / 1000)
+                waited += config.wait_interval_ms
+                cached = await r.get(key)
+                if cached is not None:
+                    return cached
+            return json.dumps(await compute(), ensure_ascii=False)
+    except Exception as e:
+        logger.warning("读取列表缓存失败: %s", e)
+        return json.dumps(await compute(), ensure_ascii=False)
+
+    try:
+        payload = await compute()
+        body = json.dumps(payload, ensure_ascii=False)
+        if payload.get("success"):
+            try:
+                await r.set(key, body, ex=cache_ttl())
+            except Exception as e:
+                logger.warning("写入列表缓存失败: %s", e)
+        return body
+    finally:
+        try:
+            await r.delete(lock_key)
+        except Exception:
+            pass
+
+
+def invalidate(type_ids: Iterable[int]):
+    """公开足迹变化后递增相关代数（同步调用，用于写入路径）"""
+    try:
+        pipe = get_redis().pipeline()
+        pipe.incr(GLOBAL_GEN_KEY)
+        for type_id in set(type_ids):
+            pipe.incr(_type_gen_key(type_id))
+        pipe.execute()
+    except Exception as e:
+        logger.warning("失效列表缓存失败: %s", e)
+
+
+def invalidate_authors():
+    """用户资料变化后递增作者代数，使所有列表失效"""
+    try:
+        get_redis().incr(AUTHORS_GEN_KEY)
+    except Exception as e:
+        logger.warning("失效列表缓存失败: %s", e)
@@ -0,0 +1,104 @@
+"""
+足迹写入钩子
+
+足迹的新增、修改、删除需要同步维护的派生数据集中在这里处理：
+- on_footprint_saved / on_footprint_deleted 在 commit 前调用，与足迹处于同一事务；
+- after_footprint_commit 在 commit 后调用，负责失效缓存，失败不影响请求。
+"""
+import logging
+from typing import NamedTuple, Optional, List
+from datetime import date
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models import Footprint, FootprintMedia, Comment, CommentImage
+from . import search_index, geo_index, map_clusters, heatmap_tiles, travel_report, feed_cache, stats, media_store
+
+logger = logging.getLogger(__name__)
+
+
+class FootprintSnapshot(NamedTuple):
+    """足迹写入前后的关键字段"""
+    id: int
+    user_id: int
+    type_id: int
+    is_public: int
+    geohash: Optional[str]
+    longitude: float
+    latitude: float
+    visit_time: Optional[date]
+    address: Optional[str]
+
+
+def snapshot(footprint: Optional[Footprint]) -> Optional[FootprintSnapshot]:
+    if footprint is None:
+        return None
+    return FootprintSnapshot(
+        id=footprint.id,
+        user_id=footprint.user_id,
+        type_id=footprint.type_id,
+        is_public=footprint.is_public,
+        geohash=footprint.geohash,
+        longitude=float(footprint.longitude),
+        latitude=float(footprint.latitude),
+        visit_time=footprint.visit_time,
+        address=footprint.address,
+    )
+
+
+def on_footprint_saved(
+    db: Session,
+    footprint: Footprint,
+    old: Optional[FootprintSnapshot] = None,
+    text_changed: bool = True,
+):
+    """足迹新增或修改后调用（commit 前），修改时 old 为修改前的快照"""
+    code = geo_index.encode_footprint(footprint)
+    if footprint.geohash != code:
+        footprint.geohash = code
+    if text_changed:
+        search_index.index_footprint(db, footprint)
+    new = snapshot(footprint)
+    travel_report.on_change(db, old, new)
+    stats.on_footprint_change(db, old, new, footprint.created_at)
+
+
+def on_footprint_deleted(db: Session, footprint: Footprint) -> List[str]:
+    """
+    足迹删除前调用（commit 前）
+
+    释放媒体与评论图片对内容寻址文件的引用，返回提交后需要交给
+    media_store.purge_released 删除的文件路径。
+    """
+    search_index.remove_footprint(db, footprint.id)
+    refs = [(url, footprint.user_id) for (url,) in db.execute(
+        select(FootprintMedia.media_url).where(FootprintMedia.footprint_id == footprint.id)
+    )]
+    refs += db.execute(
+        select(CommentImage.image_url, Comment.user_id)
+        .join(Comment, Comment.id == CommentImage.comment_id)
+        .where(Comment.footprint_id == footprint.id)
+    ).all()
+    released = media_store.release_unused(db, refs, exclude_footprint_id=footprint.id)
+    old = snapshot(footprint)
+    travel_report.on_change(db, old, None)
+    stats.on_footprint_change(db, old, None, footprint.created_at)
+    return released
+
+
+def after_footprint_commit(old: Optional[FootprintSnapshot], new: Optional[FootprintSnapshot]):
+    """足迹写入提交后调用，old/new 分别为写入前后的快照（新增时 old 为空，删除时 new 为空）"""
+    changed = [s for s in (old, new) if s is not None]
+    try:
+        # 地图聚合只包含公开足迹
+        map_clusters.invalidate(s.geohash for s in changed if s.is_public == 1)
+        heatmap_tiles.invalidate(
+            (s.longitude, s.latitude, s.user_id, s.is_public == 1) for s in changed
+        )
+        # 公开列表只受公开足迹影响（含公开/私有切换）
+        public = [s for s in changed if s.is_public == 1]
+        if public:
+            feed_cache.invalidate(s.type_id for s in public)
+    except Exception as e:
+        logger.warning("足迹缓存失效失败: %s", e)
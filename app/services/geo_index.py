@@ -0,0 +1,61 @@
+"""
+足迹空间索引
+
+footprints.geohash 保存坐标的 geohash 编码，配合 (is_public, geohash) 索引，
+矩形范围查询被转换为少量前缀范围扫描，再用精确经纬度过滤边缘。
+"""
+from sqlalchemy import select, update, or_, and_
+from sqlalchemy.orm import Session
+
+from ..core.config import load_settings
+from ..models import Footprint
+from ..utils import geohash
+
+
+def encode_footprint(footprint: Footprint) -> str:
+    """计算足迹坐标的 geohash"""
+    return geohash.encode(footprint.latitude, footprint.longitude)
+
+
+def bbox_condition(min_lng: float, min_lat: float, max_lng: float, max_lat: float):
+    """
+    生成矩形范围过滤条件
+
+    min_lng 大于 max_lng 时视为跨越180度经线，拆成两个矩形。
+    """
+    if min_lng > max_lng:
+        return or_(
+            bbox_condition(min_lng, min_lat, 180.0, max_lat),
+            bbox_condition(-180.0, min_lat, max_lng, max_lat),
+        )
+
+    max_cells = load_settings().geo.bbox_max_cells
+    prefixes = geohash.cover_bbox(min_lng, min_lat, max_lng, max_lat, max_cells)
+    return and_(
+        or_(*[Footprint.geohash.like(f"{prefix}%") for prefix in prefixes]),
+        Footprint.longitude.between(min_lng, max_lng),
+        Footprint.latitude.between(min_lat, max_lat),
+    )
+
+
+def backfill_geohash(db: Session, batch_size: int = 1000) -> int:
+    """为缺少 geohash 的历史足迹补齐编码，返回处理数量"""
+    total = 0
+    while True:
+        rows = db.execute(
+            select(Footprint.id, Footprint.longitude, Footprint.latitude)
+            .where(Footprint.geohash.is_(None))
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        for row in rows:
+            db.execute(
+                update(Footprint)
+                .where(Footprint.id == row.id)
+                .values(geohash=geohash.encode(row.latitude, row.longitude))
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
+        total += len(rows)
+    return total
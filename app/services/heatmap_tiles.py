@@ -0,0 +1,152 @@
+"""
+旅行热力图瓦片
+
+按 Web 墨卡托瓦片坐标 (z, x, y) 生成足迹密度网格：取出瓦片范围内的坐标后
+用 NumPy 一次性分箱，结果为 grid_size x grid_size 的 uint16 数组（小端字节序）。
+瓦片缓存在 Redis 中，每个瓦片有一个代数（generation），缓存值记录计算时读到的代数，
+与当前代数不一致即视为未命中。足迹写入提交后更换该坐标在各缩放级别所在瓦片的代数：
+基于提交前快照计算的瓦片即使在失效之后才写回缓存，也不会再被读到。
+"""
+import hashlib
+import logging
+import math
+import time
+from typing import Optional, Tuple, Iterable
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..core.config import load_settings
+from ..core.redis_client import get_redis_binary
+from ..models import Footprint
+from .geo_index import bbox_condition
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "heatmap:"
+GEN_PREFIX = "heatmap:gen:"
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """瓦片的经纬度范围 (min_lng, min_lat, max_lng, max_lat)"""
+    n = 1 << z
+    min_lng = x / n * 360.0 - 180.0
+    max_lng = (x + 1) / n * 360.0 - 180.0
+    max_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    min_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def tile_for_point(longitude: float, latitude: float, z: int) -> Tuple[int, int]:
+    """坐标在指定缩放级别所在的瓦片"""
+    n = 1 << z
+    lat = max(min(latitude, MAX_MERCATOR_LAT), -MAX_MERCATOR_LAT)
+    x = int((longitude + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def _tile_id(z: int, x: int, y: int, user_id: Optional[int] = None) -> str:
+    scope = f"user:{user_id}" if user_id is not None else "global"
+    return f"{scope}:{z}:{x}:{y}"
+
+
+def cache_key(z: int, x: int, y: int, user_id: Optional[int] = None) -> str:
+    return CACHE_PREFIX + _tile_id(z, x, y, user_id)
+
+
+def gen_key(z: int, x: int, y: int, user_id: Optional[int] = None) -> str:
+    return GEN_PREFIX + _tile_id(z, x, y, user_id)
+
+
+def compute_tile(db: Session, z: int, x: int, y: int, user_id: Optional[int] = None) -> bytes:
+    """从数据库计算瓦片密度网格"""
+    grid_size = load_settings().heatmap.grid_size
+    min_lng, min_lat, max_lng, max_lat = tile_bounds(z, x, y)
+
+    query = select(Footprint.longitude, Footprint.latitude).where(
+        bbox_condition(min_lng, min_lat, max_lng, max_lat)
+    )
+    if user_id is None:
+        query = query.where(Footprint.is_public == 1)
+    else:
+        query = query.where(Footprint.user_id == user_id)
+    rows = db.execute(query).all()
+
+    if not rows:
+        return np.zeros((grid_size, grid_size), dtype="<u2").tobytes()
+
+    coords = np.asarray(rows, dtype=np.float64)
+    n = float(1 << z)
+    lat = np.radians(np.clip(coords[:, 1], -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    # 转换为瓦片内的相对坐标
+    px = (coords[:, 0] + 180.0) / 360.0 * n - x
+    py = (1 - np.arcsinh(np.tan(lat)) / np.pi) / 2 * n - y
+    # 矩形查询包含边界，落在右/下边界上的点属于相邻瓦片，只保留 [0, 1)
+    inside = (px >= 0) & (px < 1) & (py >= 0) & (py < 1)
+    grid, _, _ = np.histogram2d(py[inside], px[inside], bins=grid_size, range=[[0, 1], [0, 1]])
+    return np.clip(grid, 0, np.iinfo(np.uint16).max).astype("<u2").tobytes()
+
+
+def get_tile(db: Session, z: int, x: int, y: int, user_id: Optional[int] = None) -> bytes:
+    """读取瓦片，缓存未命中或代数已变化时计算并写入缓存"""
+    key = cache_key(z, x, y, user_id)
+    generation = None
+    try:
+        cached, current = get_redis_binary().mget(key, gen_key(z, x, y, user_id))
+        generation = current or b"0"
+        if cached is not None:
+            stored, _, data = cached.partition(b":")
+            if stored == generation:
+                return data
+    except Exception as e:
+        logger.warning("读取热力图缓存失败: %s", e)
+
+    # 结束请求中已开始的事务（如认证查询），计算读取的快照晚于上面读到的代数
+    db.rollback()
+    data = compute_tile(db, z, x, y, user_id)
+    if generation is not None:
+        try:
+            get_redis_binary().setex(key, load_settings().heatmap.cache_ttl, generation + b":" + data)
+        except Exception as e:
+            logger.warning("写入热力图缓存失败: %s", e)
+    return data
+
+
+def tile_etag(data: bytes) -> str:
+    return '"' + hashlib.sha1(data).hexdigest() + '"'
+
+
+def tile_max(data: bytes) -> int:
+    return int(np.frombuffer(data, dtype="<u2").max(initial=0))
+
+
+def invalidate(points: Iterable[Tuple[float, float, int, bool]]):
+    """
+    失效坐标所在的瓦片（在足迹写入提交后调用）
+
+    points 中每项为 (经度, 纬度, 用户ID, 是否公开)，
+    用户瓦片总是失效，全局瓦片只在足迹公开时失效。
+    代数取当前时间（纳秒），过期后重新生成也不会与旧值重复；
+    保留两倍缓存时间，晚于此前写入的瓦片过期。
+    """
+    config = load_settings().heatmap
+    generation = time.time_ns()
+    keys = set()
+    for longitude, latitude, user_id, is_public in points:
+        for z in range(config.max_zoom + 1):
+            x, y = tile_for_point(longitude, latitude, z)
+            keys.add(gen_key(z, x, y, user_id))
+            if is_public:
+                keys.add(gen_key(z, x, y))
+    if not keys:
+        return
+    try:
+        pipe = get_redis_binary().pipeline()
+        for key in keys:
+            pipe.set(key, generation, ex=config.cache_ttl * 2)
+        pipe.execute()
+    except Exception as e:
+        logger.warning("失效热力图缓存失败: %s", e)
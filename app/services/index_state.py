@@ -0,0 +1,95 @@
+"""
+检索索引状态
+
+索引是否可用记录在 search_index_states 表中（每个索引一行），所有进程共享：
+- 全量重建先清除 ready 并提交，等待各进程的状态缓存过期后再删除旧索引，全部写入后才置位；
+  重建中途失败时 ready 保持为 0，查询回退为 LIKE，下次启动时重新重建；
+- 同一索引同一时刻只有一个进程重建，由 MySQL 命名锁（GET_LOCK）保证，
+  锁随连接释放，进程退出不会遗留。
+各进程缓存状态 STATE_CACHE_SECONDS 秒，查询路径不必每次读库。
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from ..db.session import engine, SessionLocal
+from ..models import SearchIndexState
+
+logger = logging.getLogger(__name__)
+
+STATE_CACHE_SECONDS = 5
+LOCK_PREFIX = "search_index_rebuild:"
+
+_cache: Dict[str, Tuple[bool, float]] = {}
+_lock = threading.Lock()
+
+
+def read_ready(db: Session, name: str) -> bool:
+    return bool(db.execute(select(SearchIndexState.ready).where(SearchIndexState.name == name)).scalar())
+
+
+def is_ready(name: str) -> bool:
+    """索引是否可用（进程内缓存），读取失败时视为不可用"""
+    now = time.monotonic()
+    with _lock:
+        cached = _cache.get(name)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
+    try:
+        with SessionLocal() as db:
+            ready = read_ready(db, name)
+    except Exception as e:
+        logger.warning("读取索引状态失败 %s: %s", name, e)
+        ready = False
+    with _lock:
+        _cache[name] = (ready, now + STATE_CACHE_SECONDS)
+    return ready
+
+
+def mark(db: Session, name: str, ready: bool):
+    """设置索引状态（调用方负责 commit；只在持有重建锁时调用）"""
+    db.merge(SearchIndexState(name=name, ready=1 if ready else 0))
+    with _lock:
+        _cache.pop(name, None)
+
+
+@contextmanager
+def rebuild_lock(name: str) -> Iterator[bool]:
+    """尝试取得重建锁（不等待），返回是否取得"""
+    with engine.connect() as conn:
+        acquired = conn.execute(text("SELECT GET_LOCK(:name, 0)"), {"name": LOCK_PREFIX + name}).scalar() == 1
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": LOCK_PREFIX + name})
+
+
+def rebuild(name: str, build: Callable[[Session], int]) -> Optional[int]:
+    """
+    全量重建索引，build 负责删除旧索引并写入新索引，返回处理数量
+
+    其他进程正在重建时不执行，返回 None。
+    """
+    with rebuild_lock(name) as acquired:
+        if not acquired:
+            return None
+        with SessionLocal() as db:
+            mark(db, name, False)
+            db.commit()
+            # 等待各进程的状态缓存过期，不再查询即将删除的旧索引
+            time.sleep(STATE_CACHE_SECONDS)
+            try:
+                count = build(db)
+                mark(db, name, True)
+                db.commit()
+            except BaseException:
+                db.rollback()
+                raise
+            return count
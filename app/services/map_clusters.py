@@ -0,0 +1,206 @@
+"""
+地图标记聚合
+
+按缩放级别选择 geohash 精度，以单元为粒度聚合公开足迹（数量、质心、
+主要类型、示例足迹）。数量不超过阈值的单元直接返回原始点。
+每个单元的聚合结果缓存在 Redis 中，并记录计算时读到的单元代数（generation），
+与当前代数不一致即视为未命中。足迹写入提交后更换其所在单元各级前缀的代数：
+基于提交前快照计算的结果即使在失效之后才写回缓存，也不会再被读到。
+"""
+import json
+import logging
+import time
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+from sqlalchemy import select, func, or_
+from sqlalchemy.orm import Session
+
+from ..core.config import load_settings
+from ..core.redis_client import get_redis
+from ..models import Footprint
+from ..utils import geohash
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "map:cluster:"
+GEN_PREFIX = "map:cluster:gen:"
+
+# 缩放级别 -> geohash 精度，使每个地图瓦片大约覆盖 4~8 个单元
+_ZOOM_PRECISION = [
+    (1, 1),
+    (3, 2),
+    (6, 3),
+    (8, 4),
+    (11, 5),
+    (13, 6),
+]
+MAX_CLUSTER_PRECISION = 7
+
+# 单条 SQL 中 LIKE 前缀的数量上限
+_QUERY_CHUNK = 200
+
+
+def precision_for_zoom(zoom: int) -> int:
+    for max_zoom, precision in _ZOOM_PRECISION:
+        if zoom <= max_zoom:
+            return precision
+    return MAX_CLUSTER_PRECISION
+
+
+def get_clusters(
+    db: Session, min_lng: float, min_lat: float, max_lng: float, max_lat: float, zoom: int
+) -> Dict[str, Any]:
+    """获取矩形范围内的聚合结果"""
+    config = load_settings().geo
+    precision = precision_for_zoom(zoom)
+    # 单元过多时降低精度
+    while precision > 1 and geohash.estimate_cells(min_lng, min_lat, max_lng, max_lat, precision) > config.cluster_max_cells:
+        precision -= 1
+    cells = geohash.cells_in_bbox(min_lng, min_lat, max_lng, max_lat, precision)
+
+    cached, generations = _load_cached(cells)
+    missing = [cell for cell in cells if cell not in cached]
+    if missing:
+        # 结束请求中已开始的事务，计算读取的快照晚于上面读到的代数
+        db.rollback()
+        computed = _compute_cells(db, missing, config.cluster_point_threshold)
+        _store_cached(computed, generations, config.cluster_cache_ttl)
+        cached.update(computed)
+
+    clusters = []
+    points = []
+    for cell in cells:
+        data = cached[cell]
+        if data["count"] == 0:
+            continue
+        if data.get("points") is not None:
+            points.extend(data["points"])
+        else:
+            clusters.append({k: v for k, v in data.items() if k != "points"})
+
+    return {"precision": precision, "clusters": clusters, "points": points}
+
+
+def invalidate(geohashes: Iterable[Optional[str]]):
+    """
+    失效包含这些坐标的各级单元缓存（在足迹写入提交后调用）
+
+    代数取当前时间（纳秒），过期后重新生成也不会与旧值重复；
+    保留两倍缓存时间，晚于此前写入的单元过期。
+    """
+    keys = set()
+    for code in geohashes:
+        if not code:
+            continue
+        for p in range(1, MAX_CLUSTER_PRECISION + 1):
+            keys.add(GEN_PREFIX + code[:p])
+    if not keys:
+        return
+    ttl = load_settings().geo.cluster_cache_ttl * 2
+    generation = time.time_ns()
+    try:
+        pipe = get_redis().pipeline()
+        for key in keys:
+            pipe.set(key, generation, ex=ttl)
+        pipe.execute()
+    except Exception as e:
+        logger.warning("失效聚合缓存失败: %s", e)
+
+
+def _load_cached(cells: List[str]) -> Tuple[Dict[str, Dict[str, Any]], Optional[Dict[str, str]]]:
+    """读取与当前代数一致的单元，同时返回各单元的当前代数（Redis 不可用时为 None）"""
+    try:
+        values = get_redis().mget(
+            [CACHE_PREFIX + cell for cell in cells] + [GEN_PREFIX + cell for cell in cells]
+        )
+    except Exception as e:
+        logger.warning("读取聚合缓存失败: %s", e)
+        return {}, None
+    generations = {cell: gen or "0" for cell, gen in zip(cells, values[len(cells):])}
+    cached = {}
+    for cell, value in zip(cells, values):
+        if value:
+            stored, _, data = value.partition(":")
+            if stored == generations[cell]:
+                cached[cell] = json.loads(data)
+    return cached, generations
+
+
+def _store_cached(data: Dict[str, Dict[str, Any]], generations: Optional[Dict[str, str]], ttl: int):
+    if generations is None:
+        return
+    try:
+        pipe = get_redis().pipeline()
+        for cell, value in data.items():
+            pipe.setex(CACHE_PREFIX + cell, ttl, f"{generations[cell]}:" + json.dumps(value, ensure_ascii=False))
+        pipe.execute()
+    except Exception as e:
+        logger.warning("写入聚合缓存失败: %s", e)
+
+
+def _cells_condition(cells: List[str]):
+    return or_(*[Footprint.geohash.like(f"{cell}%") for cell in cells])
+
+
+def _compute_cells(db: Session, cells: List[str], threshold: int) -> Dict[str, Dict[str, Any]]:
+    """从数据库计算一批单元的聚合结果"""
+    precision = len(cells[0])
+    result = {
+        cell: {"cell": cell, "count": 0, "longitude": None, "latitude": None, "type_id": None, "sample_id": None}
+        for cell in cells
+    }
+    type_counts: Dict[str, Dict[int, int]] = {}
+    sums: Dict[str, List[float]] = {}
+
+    cell_col = func.substr(Footprint.geohash, 1, precision).label("cell")
+    for i in range(0, len(cells), _QUERY_CHUNK):
+        chunk = cells[i:i + _QUERY_CHUNK]
+        rows = db.execute(
+            select(
+                cell_col,
+                Footprint.type_id,
+                func.count(Footprint.id),
+                func.sum(Footprint.longitude),
+                func.sum(Footprint.latitude),
+                func.min(Footprint.id),
+            )
+            .where(Footprint.is_public == 1, _cells_condition(chunk))
+            .group_by(cell_col, Footprint.type_id)
+        ).all()
+        for cell, type_id, count, sum_lng, sum_lat, min_id in rows:
+            data = result[cell]
+            data["count"] += count
+            type_counts.setdefault(cell, {})[type_id] = count
+            acc = sums.setdefault(cell, [0.0, 0.0])
+            acc[0] += float(sum_lng)
+            acc[1] += float(sum_lat)
+            if data["sample_id"] is None or min_id < data["sample_id"]:
+                data["sample_id"] = min_id
+
+    small_cells = []
+    for cell, data in result.items():
+        if data["count"] == 0:
+            continue
+        data["longitude"] = sums[cell][0] / data["count"]
+        data["latitude"] = sums[cell][1] / data["count"]
+        data["type_id"] = max(type_counts[cell].items(), key=lambda kv: kv[1])[0]
+        if data["count"] <= threshold:
+            data["points"] = []
+            small_cells.append(cell)
+
+    # 数量较少的单元直接返回原始点
+    for i in range(0, len(small_cells), _QUERY_CHUNK):
+        chunk = small_cells[i:i + _QUERY_CHUNK]
+        rows = db.execute(
+            select(Footprint.id, Footprint.name, Footprint.longitude, Footprint.latitude, Footprint.type_id, Footprint.geohash)
+            .where(Footprint.is_public == 1, _cells_condition(chunk))
+        ).all()
+        for row in rows:
+            result[row.geohash[:precision]]["points"].append({
+                "id": row.id,
+                "name": row.name,
+                "longitude": float(row.longitude),
+                "latitude": float(row.latitude),
+                "type_id": row.type_id,
+            })
+    return result
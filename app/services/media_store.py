@@ -0,0 +1,195 @@
+"""
+内容寻址媒体存储
+
+上传内容先流式写入暂存目录并计算 SHA-256，再按哈希分片存放：
+{base_dir}/{type}s/cas/ab/cd/{sha256}{ext}
+相同内容只保存一份，重复上传只增加引用计数；media_blob_refs 按用户记录引用，
+用户删除时只释放自己的引用，所有引用释放且没有足迹媒体或评论图片使用后才删除文件。
+足迹媒体与评论图片被删除时通过 release_unused 释放对应的引用。
+存储路径本身就是 media_url，签名URL与 /file/ 访问方式不变。
+"""
+import os
+import uuid
+import logging
+from collections import Counter
+from typing import BinaryIO, Optional, Iterable, Tuple, List
+
+from sqlalchemy import select, delete, func, exists, or_
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+
+from ..core.config import load_settings
+from ..models import MediaBlob, MediaBlobRef, FootprintMedia, CommentImage, Comment
+from ..utils.upload_storage import save_stream, StoredFile
+from . import thumbnails
+
+logger = logging.getLogger(__name__)
+
+
+def blob_path(media_type: str, sha256: str, ext: str) -> str:
+    base_dir = load_settings().upload.base_dir
+    return os.path.join(base_dir, f"{media_type}s", "cas", sha256[:2], sha256[2:4], f"{sha256}{ext}")
+
+
+def _staging_dir() -> str:
+    return os.path.join(load_settings().upload.base_dir, ".staging")
+
+
+def store(db: Session, source: BinaryIO, user_id: int, media_type: str, ext: str, max_size: int) -> StoredFile:
+    """
+    保存上传内容并登记引用（调用方负责 commit）
+
+    Raises:
+        UploadTooLargeError: 内容超过 max_size
+    """
+    staged = save_stream(source, _staging_dir(), uuid.uuid4().hex, max_size)
+    try:
+        target = blob_path(media_type, staged.sha256, ext)
+        db.execute(
+            mysql_insert(MediaBlob)
+            .values(hash=staged.sha256, path=target.replace('\\', '/'), media_type=media_type, size=staged.size)
+            .prefix_with("IGNORE")
+        )
+        blob = db.execute(
+            select(MediaBlob).where(MediaBlob.hash == staged.sha256).with_for_update()
+        ).scalar_one()
+
+        stmt = mysql_insert(MediaBlobRef).values(hash=blob.hash, user_id=user_id, ref_count=1)
+        db.execute(stmt.on_duplicate_key_update(ref_count=MediaBlobRef.ref_count + 1))
+
+        if os.path.exists(blob.path):
+            # 内容已存在，丢弃暂存文件
+            os.remove(staged.path)
+        else:
+            os.makedirs(os.path.dirname(blob.path), exist_ok=True)
+            os.replace(staged.path, blob.path)
+    except BaseException:
+        if os.path.exists(staged.path):
+            os.remove(staged.path)
+        raise
+    return StoredFile(path=blob.path, size=blob.size, sha256=blob.hash)
+
+
+def release(db: Session, path: str, user_id: int) -> Optional[bool]:
+    """
+    释放用户对文件的一次引用（调用方负责 commit）
+
+    Returns:
+        None: 路径不是内容寻址文件
+        False: 该用户没有此文件的引用
+        True: 已释放，无人引用时同时删除登记，文件由 purge_if_unreferenced 在提交后删除
+    """
+    blob = db.execute(
+        select(MediaBlob).where(MediaBlob.path == path).with_for_update()
+    ).scalar_one_or_none()
+    if blob is None:
+        return None
+
+    ref = db.get(MediaBlobRef, (blob.hash, user_id), with_for_update=True)
+    if ref is None:
+        return False
+    _release_ref(db, blob, ref, 1, _in_use(db, path, None))
+    return True
+
+
+def _release_ref(db: Session, blob: MediaBlob, ref: Optional[MediaBlobRef], count: int, in_use: bool) -> bool:
+    """
+    减少引用，无人引用且没有内容使用时删除登记，返回是否已删除登记
+
+    引用归零但仍被内容使用（同一次上传被多处引用）时保留登记，
+    最后一处内容删除时再删除。
+    """
+    if ref is not None:
+        ref.ref_count -= count
+        if ref.ref_count <= 0:
+            db.delete(ref)
+        db.flush()
+
+    if in_use or _remaining_refs(db, blob.hash):
+        return False
+    db.execute(delete(MediaBlob).where(MediaBlob.hash == blob.hash))
+    return True
+
+
+def _remaining_refs(db: Session, sha256: str) -> int:
+    return db.execute(
+        select(func.count()).select_from(MediaBlobRef).where(MediaBlobRef.hash == sha256)
+    ).scalar()
+
+
+def _in_use(db: Session, path: str, exclude_footprint_id: Optional[int]) -> bool:
+    """路径是否仍被足迹媒体或评论图片使用"""
+    medias = select(FootprintMedia.id).where(FootprintMedia.media_url == path)
+    images = (
+        select(CommentImage.id)
+        .join(Comment, Comment.id == CommentImage.comment_id)
+        .where(CommentImage.image_url == path)
+    )
+    if exclude_footprint_id is not None:
+        medias = medias.where(FootprintMedia.footprint_id != exclude_footprint_id)
+        images = images.where(Comment.footprint_id != exclude_footprint_id)
+    return db.execute(select(or_(exists(medias), exists(images)))).scalar()
+
+
+def release_unused(
+    db: Session,
+    refs: Iterable[Tuple[str, int]],
+    exclude_footprint_id: Optional[int] = None,
+) -> List[str]:
+    """
+    足迹媒体或评论图片删除时释放引用（调用方负责 commit）
+
+    refs 为被删除内容的 (路径, 所有者ID)，每条内容释放所有者的一次引用；
+    路径仍被其他内容使用时只减少引用，不删除登记与文件。
+    exclude_footprint_id 为即将删除的足迹，其媒体与评论图片尚未删除，不计入使用。
+    返回已无人引用的路径，提交后交给 purge_released 删除文件。
+    """
+    released = []
+    # 按路径顺序加锁，避免并发删除时死锁
+    for (path, user_id), count in sorted(Counter(refs).items()):
+        blob = db.execute(
+            select(MediaBlob).where(MediaBlob.path == path).with_for_update()
+        ).scalar_one_or_none()
+        if blob is None:
+            continue
+        ref = db.get(MediaBlobRef, (blob.hash, user_id), with_for_update=True)
+        if _release_ref(db, blob, ref, count, _in_use(db, path, exclude_footprint_id)):
+            released.append(path)
+    return released
+
+
+def purge_if_unreferenced(db: Session, path: str) -> bool:
+    """
+    release 提交后调用：文件已无引用时从磁盘删除，返回是否删除
+
+    在事务内按路径加锁读取登记后再删除文件：登记不存在时 InnoDB 锁住唯一索引上的间隙，
+    并发 store 同一内容的插入会等待本事务结束，之后发现文件不存在再重新放入。
+    """
+    try:
+        blob = db.execute(
+            select(MediaBlob).where(MediaBlob.path == path).with_for_update()
+        ).scalar_one_or_none()
+        if blob is not None:
+            if _remaining_refs(db, blob.hash) or _in_use(db, path, None):
+                # 提交后又被重新上传，或引用归零但仍被内容使用
+                db.rollback()
+                return False
+            db.delete(blob)
+        removed = os.path.exists(path)
+        if removed:
+            os.remove(path)
+        db.commit()
+        return removed
+    except BaseException:
+        db.rollback()
+        raise
+
+
+def purge_released(db: Session, paths: Iterable[str]):
+    """release_unused 的事务提交后调用：删除无人引用的文件及其缩略图，失败只记录日志"""
+    for path in paths:
+        try:
+            if purge_if_unreferenced(db, path):
+                thumbnails.remove_variants(path)
+        except Exception as e:
+            logger.warning("删除无引用文件失败 %s: %s", path, e)
@@ -0,0 +1,162 @@
+"""
+操作日志分区与归档
+
+op_logs 按月 RANGE 分区（TO_DAYS(created_at)），分区名为 pYYYYMM，最后一个分区 pmax
+兜底。按 created_at 范围查询时 MySQL 只扫描相关分区，删除整月数据只需 DROP PARTITION。
+
+维护任务 run_maintenance 由调度器定期执行：
+- 未分区的旧表转换为分区表（按已有数据的最早月份建分区，大表转换期间会阻塞写入）；
+- 从 pmax 拆出未来 partition_months_ahead 个月的分区；
+- 早于保留期的分区先逐行导出为 gzip 压缩的 JSONL 文件，写完后再删除分区。
+"""
+import gzip
+import json
+import logging
+import os
+from datetime import datetime, date
+from typing import List, Tuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine, Connection
+
+from ..core.config import load_settings
+from ..db.session import engine
+
+logger = logging.getLogger(__name__)
+
+TABLE = "op_logs"
+MAX_PARTITION = "pmax"
+
+
+def _month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"p{month:%Y%m}"
+
+
+def _partition_month(name: str) -> Optional[date]:
+    try:
+        return datetime.strptime(name, "p%Y%m").date()
+    except ValueError:
+        return None
+
+
+def _partition_clause(month: date) -> str:
+    upper = _add_months(month, 1)
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN (TO_DAYS('{upper.isoformat()}'))"
+
+
+def _months(first: date, last: date) -> List[date]:
+    months = []
+    while first <= last:
+        months.append(first)
+        first = _add_months(first, 1)
+    return months
+
+
+def list_partitions(conn: Connection) -> List[str]:
+    """按顺序返回分区名，未分区时返回空列表"""
+    rows = conn.execute(text(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table "
+        "ORDER BY PARTITION_ORDINAL_POSITION"
+    ), {"table": TABLE}).scalars().all()
+    return [name for name in rows if name is not None]
+
+
+def ensure_partitions(bind: Engine = engine):
+    """保证当前月份及未来若干月份的分区存在"""
+    config = load_settings().audit_log
+    current = _month_start(datetime.utcnow())
+    last = _add_months(current, config.partition_months_ahead)
+
+    with bind.begin() as conn:
+        partitions = list_partitions(conn)
+        if not partitions:
+            oldest = conn.execute(text(f"SELECT MIN(created_at) FROM {TABLE}")).scalar()
+            first = min(_month_start(oldest), current) if oldest else current
+            clauses = [_partition_clause(m) for m in _months(first, last)]
+            clauses.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+            conn.execute(text(
+                f"ALTER TABLE {TABLE} PARTITION BY RANGE (TO_DAYS(created_at)) ({', '.join(clauses)})"
+            ))
+            logger.info("op_logs 已转换为按月分区（%d 个分区）", len(clauses))
+            return
+
+        months = [m for m in map(_partition_month, partitions) if m is not None]
+        start = _add_months(max(months), 1) if months else current
+        missing = _months(start, last)
+        if missing:
+            clauses = [_partition_clause(m) for m in missing]
+            clauses.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+            conn.execute(text(
+                f"ALTER TABLE {TABLE} REORGANIZE PARTITION {MAX_PARTITION} INTO ({', '.join(clauses)})"
+            ))
+
+
+def expired_partitions(conn: Connection) -> List[Tuple[str, date]]:
+    """早于保留期的分区（名称, 月份）"""
+    retention = load_settings().audit_log.retention_months
+    if retention <= 0:
+        return []
+    cutoff = _add_months(_month_start(datetime.utcnow()), -(retention - 1))
+    result = []
+    for name in list_partitions(conn):
+        month = _partition_month(name)
+        if month is not None and month < cutoff:
+            result.append((name, month))
+    return result
+
+
+def archive_path(month: date) -> str:
+    return os.path.join(load_settings().audit_log.archive_dir, f"{TABLE}-{month:%Y%m}.jsonl.gz")
+
+
+def _export_partition(bind: Engine, name: str, month: date) -> int:
+    """把分区逐行写入归档文件（先写临时文件再改名），返回行数"""
+    path = archive_path(month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    count = 0
+    with bind.connect() as conn, gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        result = conn.execution_options(stream_results=True).execute(text(
+            f"SELECT id, user_id, action, path, method, detail, created_at "
+            f"FROM {TABLE} PARTITION ({name}) ORDER BY id"
+        ))
+        for row in result:
+            record = dict(row._mapping)
+            record["created_at"] = record["created_at"].isoformat()
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def archive_expired(bind: Engine = engine) -> int:
+    """归档并删除过期分区，返回归档的行数"""
+    with bind.connect() as conn:
+        expired = expired_partitions(conn)
+
+    total = 0
+    for name, month in expired:
+        count = _export_partition(bind, name, month)
+        # 归档文件落盘后才删除分区；删除失败时下次会重新导出覆盖
+        with bind.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {TABLE} DROP PARTITION {name}"))
+        logger.info("已归档操作日志分区 %s（%d 条）到 %s", name, count, archive_path(month))
+        total += count
+    return total
+
+
+def run_maintenance():
+    """周期任务：维护分区并归档过期数据"""
+    ensure_partitions()
+    archive_expired()
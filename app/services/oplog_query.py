@@ -0,0 +1,108 @@
+"""
+操作日志查询
+
+条件始终包含 created_at 范围（只扫描相关的月分区），按 id 倒序以 id 游标分页。
+用户/动作/路径筛选分别由 (user_id, id)、(action, id)、(path, id) 索引支撑，
+索引中 id 有序，翻页时从游标位置继续扫描。
+
+导出按同样的条件分批读取，逐行输出 NDJSON，内存占用与总行数无关。
+"""
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Iterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..core.config import load_settings
+from ..db.session import SessionLocal
+from ..models.oplog import OpLog
+from ..utils.pagination import encode_id_cursor, id_before
+
+logger = logging.getLogger(__name__)
+
+LOG_COLUMNS = (
+    OpLog.id, OpLog.user_id, OpLog.action, OpLog.path, OpLog.method, OpLog.detail, OpLog.created_at,
+)
+
+EXPORT_BATCH_SIZE = 1000
+
+
+def log_filters(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    path: Optional[str] = None,
+    method: Optional[str] = None,
+    action: Optional[str] = None,
+) -> list:
+    """构造筛选条件，未指定起始时间时默认最近 browse_window_days 天"""
+    if start is None:
+        start = datetime.utcnow() - timedelta(days=load_settings().audit_log.browse_window_days)
+    conditions = [OpLog.created_at >= start]
+    if end is not None:
+        conditions.append(OpLog.created_at < end)
+    if user_id is not None:
+        conditions.append(OpLog.user_id == user_id)
+    if path:
+        conditions.append(OpLog.path.startswith(path, autoescape=True))
+    if method:
+        conditions.append(OpLog.method == method.upper())
+    if action:
+        conditions.append(OpLog.action == action)
+    return conditions
+
+
+def _page_query(conditions: list, cursor: Optional[str], limit: int):
+    query = select(*LOG_COLUMNS).where(*conditions)
+    if cursor:
+        query = query.where(id_before(OpLog.id, cursor))
+    return query.order_by(OpLog.id.desc()).limit(limit)
+
+
+def _row_to_dict(row) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "action": row.action,
+        "path": row.path,
+        "method": row.method,
+        "detail": row.detail,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+    }
+
+
+def fetch_page(db: Session, conditions: list, cursor: Optional[str], limit: int) -> Dict[str, Any]:
+    """读取一页日志，返回 {logs, next_cursor}"""
+    rows = db.execute(_page_query(conditions, cursor, limit)).all()
+    return {
+        "logs": [_row_to_dict(row) for row in rows],
+        "next_cursor": encode_id_cursor(rows[-1].id) if len(rows) == limit else None,
+    }
+
+
+def iter_ndjson(conditions: list, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """
+    按批读取并逐行输出 NDJSON
+
+    自行创建会话：响应流式发送时请求依赖的会话已经关闭。
+    响应头发出后无法再改为错误状态码，读取失败时输出一行 {"error": ...} 后结束，
+    客户端据此判断导出不完整。
+    """
+    cursor = None
+    try:
+        with SessionLocal() as db:
+            while True:
+                rows = db.execute(_page_query(conditions, cursor, batch_size)).all()
+                if not rows:
+                    break
+                yield "".join(json.dumps(_row_to_dict(row), ensure_ascii=False) + "\n" for row in rows)
+                if len(rows) < batch_size:
+                    break
+                cursor = encode_id_cursor(rows[-1].id)
+                # 每批结束后释放快照，避免长事务
+                db.rollback()
+    except Exception as e:
+        logger.warning("导出操作日志失败: %s", e)
+        yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
@@ -0,0 +1,186 @@
+"""
+断点续传上传
+
+会话状态保存在 Redis：
+- upload:resumable:{id}        会话元数据（hash）
+- upload:resumable:{id}:parts  已接收分片 -> 分片大小（hash）
+分片文件保存在 {base_dir}/.resumable/{id}/{part}.part，全部到齐后零拷贝拼接。
+分片编号从 1 开始，第 n 片对应字节范围 [(n-1)*chunk_size, n*chunk_size)。
+"""
+import os
+import math
+import time
+import uuid
+import shutil
+import tempfile
+from typing import Optional, Dict, Any, List
+
+from ..core.config import load_settings
+from ..core.redis_client import get_redis
+from ..utils.upload_storage import concat_files, StoredFile
+
+KEY_PREFIX = "upload:resumable:"
+
+
+class ResumableUploadError(Exception):
+    """断点续传请求无效"""
+
+
+def _meta_key(upload_id: str) -> str:
+    return f"{KEY_PREFIX}{upload_id}"
+
+
+def _parts_key(upload_id: str) -> str:
+    return f"{KEY_PREFIX}{upload_id}:parts"
+
+
+def parts_root() -> str:
+    return os.path.join(load_settings().upload.base_dir, ".resumable")
+
+
+def _parts_dir(upload_id: str) -> str:
+    return os.path.join(parts_root(), upload_id)
+
+
+def _part_path(upload_id: str, part_number: int) -> str:
+    return os.path.join(_parts_dir(upload_id), f"{part_number}.part")
+
+
+def create_session(user_id: int, filename: str, content_type: str, media_type: str,
+                   size: int, description: Optional[str] = None) -> Dict[str, Any]:
+    """创建上传会话"""
+    config = load_settings().upload
+    chunk_size = config.resumable_chunk_size
+    upload_id = uuid.uuid4().hex
+    total_parts = max(1, math.ceil(size / chunk_size))
+
+    meta = {
+        "user_id": user_id,
+        "filename": filename,
+        "content_type": content_type,
+        "media_type": media_type,
+        "size": size,
+        "chunk_size": chunk_size,
+        "total_parts": total_parts,
+        "description": description or "",
+        "created_at": int(time.time()),
+    }
+    r = get_redis()
+    pipe = r.pipeline()
+    pipe.hset(_meta_key(upload_id), mapping=meta)
+    pipe.expire(_meta_key(upload_id), config.resumable_ttl_seconds)
+    pipe.execute()
+    os.makedirs(_parts_dir(upload_id), exist_ok=True)
+
+    cleanup_stale_parts()
+    return {
+        "upload_id": upload_id,
+        "chunk_size": chunk_size,
+        "total_parts": total_parts,
+        "expires_in": config.resumable_ttl_seconds,
+    }
+
+
+def get_session(upload_id: str, user_id: int) -> Dict[str, Any]:
+    """读取会话元数据，不存在或不属于该用户时抛出异常"""
+    meta = get_redis().hgetall(_meta_key(upload_id))
+    if not meta or int(meta["user_id"]) != user_id:
+        raise ResumableUploadError("上传会话不存在或已过期")
+    for field in ("user_id", "size", "chunk_size", "total_parts", "created_at"):
+        meta[field] = int(meta[field])
+    meta["description"] = meta["description"] or None
+    return meta
+
+
+def expected_part_size(meta: Dict[str, Any], part_number: int) -> int:
+    """第 part_number 片应有的字节数"""
+    if part_number < 1 or part_number > meta["total_parts"]:
+        raise ResumableUploadError("分片编号超出范围")
+    start = (part_number - 1) * meta["chunk_size"]
+    return min(meta["chunk_size"], meta["size"] - start)
+
+
+def open_part(upload_id: str):
+    """在分片目录中创建临时文件，返回 (文件对象, 临时路径)"""
+    directory = _parts_dir(upload_id)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    return os.fdopen(fd, "wb"), tmp_path
+
+
+def commit_part(upload_id: str, part_number: int, tmp_path: str, size: int):
+    """分片写入完成：重命名为正式分片并记录到 Redis"""
+    os.replace(tmp_path, _part_path(upload_id, part_number))
+    r = get_redis()
+    pipe = r.pipeline()
+    pipe.hset(_parts_key(upload_id), part_number, size)
+    pipe.expire(_parts_key(upload_id), load_settings().upload.resumable_ttl_seconds)
+    pipe.execute()
+
+
+def received_parts(upload_id: str) -> Dict[int, int]:
+    """已接收的分片编号 -> 大小"""
+    return {int(k): int(v) for k, v in get_redis().hgetall(_parts_key(upload_id)).items()}
+
+
+def status(meta: Dict[str, Any], upload_id: str) -> Dict[str, Any]:
+    """会话进度：已接收分片、已接收的字节范围与缺失分片"""
+    parts = received_parts(upload_id)
+    chunk_size = meta["chunk_size"]
+
+    ranges: List[List[int]] = []
+    for n in sorted(parts):
+        start = (n - 1) * chunk_size
+        end = start + parts[n] - 1
+        if ranges and ranges[-1][1] + 1 == start:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+
+    return {
+        "upload_id": upload_id,
+        "size": meta["size"],
+        "chunk_size": chunk_size,
+        "total_parts": meta["total_parts"],
+        "received_parts": sorted(parts),
+        "received_ranges": ranges,
+        "missing_parts": [n for n in range(1, meta["total_parts"] + 1) if n not in parts],
+        "bytes_received": sum(parts.values()),
+    }
+
+
+def assemble(meta: Dict[str, Any], upload_id: str, directory: str, filename: str) -> StoredFile:
+    """校验全部分片后拼接为最终文件，并清理会话"""
+    parts = received_parts(upload_id)
+    for n in range(1, meta["total_parts"] + 1):
+        if parts.get(n) != expected_part_size(meta, n):
+            raise ResumableUploadError(f"分片 {n} 缺失或大小不正确")
+
+    stored = concat_files(
+        [_part_path(upload_id, n) for n in range(1, meta["total_parts"] + 1)],
+        directory,
+        filename,
+    )
+    abort(upload_id)
+    return stored
+
+
+def abort(upload_id: str):
+    """删除会话状态与分片文件"""
+    get_redis().delete(_meta_key(upload_id), _parts_key(upload_id))
+    shutil.rmtree(_parts_dir(upload_id), ignore_errors=True)
+
+
+def cleanup_stale_parts():
+    """清理会话已过期但仍留在磁盘上的分片目录"""
+    root = parts_root()
+    if not os.path.isdir(root):
+        return
+    deadline = time.time() - load_settings().upload.resumable_ttl_seconds
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            if os.path.getmtime(path) < deadline:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
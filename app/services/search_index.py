@@ -0,0 +1,166 @@
+"""
+足迹全文检索
+
+在 footprint_search_tokens 表中维护名称/地址/描述的 bigram 倒排索引，
+由足迹的增删改同步更新。索引不可用（关闭、未建立、重建中或搜索词过短）时
+回退到原有的 LIKE 查询；可用状态与重建锁见 index_state。
+
+全量重建：python -m app.services.search_index
+"""
+import logging
+from typing import Optional
+
+from sqlalchemy import select, delete, insert, func, or_
+from sqlalchemy.orm import Session
+
+from ..core.config import load_settings
+from ..models import Footprint, FootprintSearchToken
+from ..utils.ngram import tokenize, query_tokens
+from . import index_state
+
+logger = logging.getLogger(__name__)
+
+# 各字段权重：名称命中比描述命中更相关
+FIELD_WEIGHTS = (
+    ("name", 3),
+    ("address", 2),
+    ("description", 1),
+)
+
+INDEX_NAME = "footprints"
+
+
+def is_available() -> bool:
+    """索引是否可用于查询"""
+    return load_settings().search.enabled and index_state.is_ready(INDEX_NAME)
+
+
+def build_tokens(name: Optional[str], address: Optional[str], description: Optional[str]) -> dict:
+    """计算一条足迹的加权词元"""
+    fields = {"name": name, "address": address, "description": description}
+    weights = {}
+    for field, field_weight in FIELD_WEIGHTS:
+        for token, count in tokenize(fields[field]).items():
+            weights[token] = weights.get(token, 0) + count * field_weight
+    return weights
+
+
+def index_footprint(db: Session, footprint: Footprint):
+    """重建单条足迹的索引（与足迹写入处于同一事务）"""
+    db.execute(delete(FootprintSearchToken).where(FootprintSearchToken.footprint_id == footprint.id))
+    weights = build_tokens(footprint.name, footprint.address, footprint.description)
+    if weights:
+        db.execute(
+            insert(FootprintSearchToken),
+            [
+                {"token": token, "footprint_id": footprint.id, "weight": weight}
+                for token, weight in weights.items()
+            ],
+        )
+
+
+def remove_footprint(db: Session, footprint_id: int):
+    """删除足迹的索引"""
+    db.execute(delete(FootprintSearchToken).where(FootprintSearchToken.footprint_id == footprint_id))
+
+
+def apply_search(query, search: str, rank: bool = True):
+    """
+    为足迹查询追加搜索条件
+
+    索引可用时按 bigram 全部命中过滤，rank 为 True 时按相关度排序；
+    否则回退到名称/地址/描述的 LIKE 查询。query 可以是 Query 或 Select。
+    """
+    tokens = query_tokens(search) if is_available() else None
+    if not tokens:
+        return query.filter(or_(
+            Footprint.name.contains(search),
+            Footprint.address.contains(search),
+            Footprint.description.contains(search)
+        ))
+
+    matches = (
+        select(
+            FootprintSearchToken.footprint_id.label("footprint_id"),
+            func.sum(FootprintSearchToken.weight).label("score"),
+        )
+        .where(FootprintSearchToken.token.in_(tokens))
+        .group_by(FootprintSearchToken.footprint_id)
+        .having(func.count() == len(tokens))
+        .subquery()
+    )
+    query = query.join(matches, matches.c.footprint_id == Footprint.id)
+    if rank:
+        query = query.order_by(matches.c.score.desc())
+    return query
+
+
+def rebuild_index(batch_size: Optional[int] = None) -> Optional[int]:
+    """全量重建索引，返回处理的足迹数量；其他进程正在重建时返回 None"""
+    return index_state.rebuild(INDEX_NAME, lambda db: _build_index(db, batch_size))
+
+
+def _build_index(db: Session, batch_size: Optional[int] = None) -> int:
+    batch_size = batch_size or load_settings().search.rebuild_batch_size
+    db.execute(delete(FootprintSearchToken))
+    db.commit()
+
+    total = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(Footprint.id, Footprint.name, Footprint.address, Footprint.description)
+            .where(Footprint.id > last_id)
+            .order_by(Footprint.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        values = [
+            {"token": token, "footprint_id": row.id, "weight": weight}
+            for row in rows
+            for token, weight in build_tokens(row.name, row.address, row.description).items()
+        ]
+        if values:
+            # 重建期间的并发写入可能已写入同样的词元，忽略重复
+            db.execute(insert(FootprintSearchToken).prefix_with("IGNORE"), values)
+        db.commit()
+        total += len(rows)
+        last_id = rows[-1].id
+    return total
+
+
+def prepare_index(db: Session) -> bool:
+    """
+    启动时检查索引状态
+
+    返回 True 表示需要全量重建（从未建立，或上次重建没有完成）。
+    """
+    if not load_settings().search.enabled:
+        return False
+    try:
+        return not index_state.read_ready(db, INDEX_NAME)
+    except Exception as e:
+        logger.warning("检索索引不可用，搜索回退为 LIKE: %s", e)
+        return False
+
+
+def rebuild_in_background():
+    """在后台线程中全量重建，完成后启用索引；多个进程同时启动时只有一个执行"""
+    try:
+        count = rebuild_index()
+    except Exception as e:
+        logger.warning("检索索引重建失败: %s", e)
+        return
+    if count is None:
+        logger.info("检索索引正在由其他进程重建")
+    else:
+        logger.info("检索索引重建完成，共 %d 条足迹", count)
+
+
+if __name__ == "__main__":
+    count = rebuild_index()
+    if count is None:
+        print("检索索引正在由其他进程重建")
+    else:
+        print(f"已重建 {count} 条足迹的检索索引")
@@ -0,0 +1,223 @@
+"""
+系统统计计数器
+
+管理后台的统计数据不再每次 COUNT(*)，而是读取增量维护的计数：
+- stats_counters：总量类计数（用户总数/正常/禁用、足迹总数/公开/私有/各类型、评论总数）；
+- stats_daily：按 UTC 日期分桶的新增数（users.new / footprints.new / comments.new），
+  任意天数窗口由分桶求和得到；
+- 近 N 天活跃用户用 Redis HyperLogLog 按天记录登录用户，合并计数。
+
+写入路径在同一事务内调用 bump 更新计数（INSERT ... ON DUPLICATE KEY UPDATE），
+定时任务 reconcile 从源表重新统计并覆盖，修正级联删除等路径造成的偏差。
+"""
+import logging
+from datetime import datetime, date, timedelta
+from typing import Dict, Optional, Iterable, Tuple
+
+from sqlalchemy import select, func, delete
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+
+from ..core.config import load_settings
+from ..core.redis_client import get_redis
+from ..models import StatsCounter, StatsDaily, User, Footprint, Comment
+
+logger = logging.getLogger(__name__)
+
+LOGIN_KEY_PREFIX = "stats:login:"
+
+USERS_NEW = "users.new"
+FOOTPRINTS_NEW = "footprints.new"
+COMMENTS_NEW = "comments.new"
+
+
+def type_counter(type_id: int) -> str:
+    return f"footprints.type.{type_id}"
+
+
+def _day(value: Optional[datetime]) -> date:
+    return (value or datetime.utcnow()).date()
+
+
+def bump(db: Session, counters: Optional[Dict[str, int]] = None,
+         daily: Optional[Iterable[Tuple[date, str, int]]] = None):
+    """
+    在当前事务内累加计数器与日分桶（调用方负责 commit）
+
+    行按主键排序后写入，并发事务以相同顺序加锁，避免死锁（如公开/私有互相切换）。
+    """
+    rows = [{"name": name, "value": delta} for name, delta in sorted((counters or {}).items()) if delta]
+    if rows:
+        stmt = mysql_insert(StatsCounter).values(rows)
+        db.execute(stmt.on_duplicate_key_update(value=StatsCounter.value + stmt.inserted.value))
+
+    rows = [{"day": day, "metric": metric, "value": delta} for day, metric, delta in sorted(daily or ()) if delta]
+    if rows:
+        stmt = mysql_insert(StatsDaily).values(rows)
+        db.execute(stmt.on_duplicate_key_update(value=StatsDaily.value + stmt.inserted.value))
+
+
+def on_user_change(db: Session, old_status: Optional[int], new_status: Optional[int],
+                   created_at: Optional[datetime] = None):
+    """用户新增（old_status 为空）或状态变化时调用"""
+    counters: Dict[str, int] = {}
+    daily = []
+    if old_status is None:
+        counters["users.total"] = 1
+        daily.append((_day(created_at), USERS_NEW, 1))
+    if old_status != new_status:
+        for status, delta in ((old_status, -1), (new_status, 1)):
+            if status is not None:
+                key = "users.active" if status == 1 else "users.disabled"
+                counters[key] = counters.get(key, 0) + delta
+    bump(db, counters, daily)
+
+
+def on_footprint_change(db: Session, old, new, created_at: Optional[datetime] = None):
+    """
+    足迹写入时调用（commit 前），old/new 为写入前后的快照
+
+    新增时 old 为空，删除时 new 为空；修改时只有公开状态或类型变化才需要更新。
+    """
+    counters: Dict[str, int] = {}
+
+    def apply(snap, delta):
+        visibility = "footprints.public" if snap.is_public == 1 else "footprints.private"
+        for key in ("footprints.total", visibility, type_counter(snap.type_id)):
+            counters[key] = counters.get(key, 0) + delta
+
+    if old is not None:
+        apply(old, -1)
+    if new is not None:
+        apply(new, 1)
+
+    daily = []
+    if old is None or new is None:
+        daily.append((_day(created_at), FOOTPRINTS_NEW, 1 if old is None else -1))
+    bump(db, counters, daily)
+
+
+def on_comments_changed(db: Session, per_day: Dict[date, int]):
+    """评论新增（正数）或软删除（负数）时调用，per_day 为各创建日期的数量变化"""
+    total = sum(per_day.values())
+    bump(
+        db,
+        {"comments.total": total},
+        [(day, COMMENTS_NEW, delta) for day, delta in per_day.items()],
+    )
+
+
+def record_login(user_id: int, when: Optional[datetime] = None):
+    """记录登录用户（HyperLogLog，按天去重）"""
+    config = load_settings().stats
+    key = LOGIN_KEY_PREFIX + _day(when).isoformat()
+    try:
+        pipe = get_redis().pipeline()
+        pipe.pfadd(key, user_id)
+        pipe.expire(key, (config.active_user_days + 1) * 86400)
+        pipe.execute()
+    except Exception as e:
+        logger.warning("记录登录统计失败: %s", e)
+
+
+def active_users(days: Optional[int] = None) -> int:
+    """近 days 天登录过的用户数（近似值）"""
+    days = days or load_settings().stats.active_user_days
+    today = datetime.utcnow().date()
+    keys = [LOGIN_KEY_PREFIX + (today - timedelta(days=i)).isoformat() for i in range(days)]
+    try:
+        return get_redis().pfcount(*keys)
+    except Exception as e:
+        logger.warning("读取活跃用户统计失败: %s", e)
+        return 0
+
+
+def read_counters(db: Session) -> Dict[str, int]:
+    return dict(db.execute(select(StatsCounter.name, StatsCounter.value)).all())
+
+
+def read_daily(db: Session, start: date, end: date) -> Dict[date, Dict[str, int]]:
+    """[start, end] 内的日分桶，按日期组织"""
+    result: Dict[date, Dict[str, int]] = {}
+    rows = db.execute(
+        select(StatsDaily.day, StatsDaily.metric, StatsDaily.value)
+        .where(StatsDaily.day >= start, StatsDaily.day <= end)
+    ).all()
+    for day, metric, value in rows:
+        result.setdefault(day, {})[metric] = value
+    return result
+
+
+def reconcile(db: Session):
+    """
+    从源表重新统计并覆盖计数器与最近的日分桶
+
+    统计期间并发写入的增量可能被覆盖，由下一次对账修正。
+    """
+    config = load_settings().stats
+    counters: Dict[str, int] = {
+        "users.total": 0, "users.active": 0, "users.disabled": 0,
+        "footprints.total": 0, "footprints.public": 0, "footprints.private": 0,
+        "comments.total": 0,
+    }
+
+    for status, count in db.execute(select(User.status, func.count()).group_by(User.status)).all():
+        counters["users.total"] += count
+        counters["users.active" if status == 1 else "users.disabled"] += count
+
+    for type_id, is_public, count in db.execute(
+        select(Footprint.type_id, Footprint.is_public, func.count())
+        .group_by(Footprint.type_id, Footprint.is_public)
+    ).all():
+        counters["footprints.total"] += count
+        counters["footprints.public" if is_public == 1 else "footprints.private"] += count
+        counters[type_counter(type_id)] = counters.get(type_counter(type_id), 0) + count
+
+    counters["comments.total"] = db.execute(
+        select(func.count()).select_from(Comment).where(Comment.is_deleted == 0)
+    ).scalar()
+
+    # 已不存在的类型计数清零
+    for name in db.execute(
+        select(StatsCounter.name).where(StatsCounter.name.like("footprints.type.%"))
+    ).scalars():
+        counters.setdefault(name, 0)
+
+    stmt = mysql_insert(StatsCounter).values([{"name": k, "value": v} for k, v in sorted(counters.items())])
+    db.execute(stmt.on_duplicate_key_update(value=stmt.inserted.value))
+
+    # 最近 reconcile_days 天的日分桶
+    start_day = datetime.utcnow().date() - timedelta(days=config.reconcile_days - 1)
+    start = datetime.combine(start_day, datetime.min.time())
+    daily = []
+    for metric, column, condition in (
+        (USERS_NEW, User.created_at, None),
+        (FOOTPRINTS_NEW, Footprint.created_at, None),
+        (COMMENTS_NEW, Comment.created_at, Comment.is_deleted == 0),
+    ):
+        day_col = func.date(column)
+        query = select(day_col, func.count()).where(column >= start).group_by(day_col)
+        if condition is not None:
+            query = query.where(condition)
+        daily.extend({"day": day, "metric": metric, "value": count} for day, count in db.execute(query).all())
+
+    db.execute(delete(StatsDaily).where(StatsDaily.day >= start_day))
+    if daily:
+        db.execute(mysql_insert(StatsDaily).values(daily))
+
+    # 活跃用户：按最后登录时间补记（HyperLogLog 重复添加不影响结果）
+    since = datetime.utcnow() - timedelta(days=config.active_user_days)
+    for user_id, last_login in db.execute(
+        select(User.id, User.last_login).where(User.last_login >= since)
+    ).all():
+        record_login(user_id, last_login)
+
+    db.commit()
+
+
+if __name__ == "__main__":
+    from ..db.session import SessionLocal
+
+    with SessionLocal() as session:
+        reconcile(session)
+        print("统计计数已重新计算")
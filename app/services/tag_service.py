@@ -0,0 +1,93 @@
+"""
+标签写入
+
+足迹写入时一次解析整组标签名：
+- 进程内缓存 名称 -> ID（标签不会被删除，缓存无需失效）；
+- 缓存未命中的名称一次 IN 查询；
+- 仍不存在的名称一条 INSERT ... ON DUPLICATE KEY UPDATE 批量创建，再加锁读取 ID；
+- 足迹-标签关联一次 executemany 写入。
+
+只有插入前已存在的标签才写入缓存：本事务新建的标签可能随事务回滚，
+下次请求查询到时再缓存。
+"""
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+from sqlalchemy import select, delete, insert
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+
+from ..models import Tag, FootprintTag
+
+# 缓存容量上限，超出时整体清空
+MAX_CACHED_TAGS = 50000
+
+_tag_ids: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def _unique_names(names: Iterable[str]) -> List[str]:
+    """去掉空名称与重复名称，保持原有顺序"""
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def _match(rows, names: List[str]) -> Dict[str, int]:
+    """
+    把查询结果对应回请求的名称
+
+    MySQL 的比较规则不区分大小写，查到的名称可能与请求的写法不同，按 casefold 再匹配一次。
+    """
+    exact = {row.name: row.id for row in rows}
+    folded = {row.name.casefold(): row.id for row in rows}
+    result = {}
+    for name in names:
+        tag_id = exact.get(name, folded.get(name.casefold()))
+        if tag_id is not None:
+            result[name] = tag_id
+    return result
+
+
+def resolve_tag_ids(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """解析标签名为 ID，不存在的标签在当前事务内创建（调用方负责 commit）"""
+    names = _unique_names(names)
+    with _lock:
+        result = {name: _tag_ids[name] for name in names if name in _tag_ids}
+
+    missing = [name for name in names if name not in result]
+    if not missing:
+        return result
+
+    found = _match(db.execute(select(Tag.id, Tag.name).where(Tag.name.in_(missing))).all(), missing)
+    if found:
+        with _lock:
+            if len(_tag_ids) + len(found) > MAX_CACHED_TAGS:
+                _tag_ids.clear()
+            _tag_ids.update(found)
+        result.update(found)
+
+    # 按名称排序后插入与加锁读取，并发事务以相同顺序锁定标签行，避免死锁
+    missing = sorted(name for name in missing if name not in found)
+    if missing:
+        now = datetime.utcnow()
+        stmt = mysql_insert(Tag).values([{"name": name, "created_at": now} for name in missing])
+        # 并发请求可能已创建同名标签，重复时保持原行不变
+        db.execute(stmt.on_duplicate_key_update(id=Tag.id))
+        # 加锁读取最新提交的行，包含其他事务刚创建的标签
+        rows = db.execute(
+            select(Tag.id, Tag.name).where(Tag.name.in_(missing)).with_for_update()
+        ).all()
+        result.update(_match(rows, missing))
+    return result
+
+
+def set_footprint_tags(db: Session, footprint_id: int, names: Iterable[str], replace: bool = False):
+    """写入足迹的标签关联，replace 为 True 时先删除原有关联（调用方负责 commit）"""
+    if replace:
+        db.execute(delete(FootprintTag).where(FootprintTag.footprint_id == footprint_id))
+    tag_ids = resolve_tag_ids(db, names)
+    if tag_ids:
+        db.execute(
+            insert(FootprintTag),
+            [{"footprint_id": footprint_id, "tag_id": tag_id} for tag_id in dict.fromkeys(tag_ids.values())],
+        )
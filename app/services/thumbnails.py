@@ -0,0 +1,167 @@
+"""
+图片缩略图与响应式尺寸
+
+图片上传后交给进程池按配置的宽度生成 WebP 缩略图：
+{base_dir}/thumbnails/ab/{source_key}_{width}.webp
+source_key 为源文件的内容哈希（内容寻址文件直接取文件名中的 SHA-256），
+因此生成是幂等的，同一内容只生成一次。
+/file/ 请求带 w 参数时返回对应尺寸，缺失时同步生成。
+"""
+import os
+import re
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Optional, List, Dict
+
+from ..core.config import load_settings
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+_SHA256_NAME = re.compile(r"^[0-9a-f]{64}$")
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # 使用 spawn，避免在多线程的服务进程中 fork
+        _executor = ProcessPoolExecutor(
+            max_workers=load_settings().upload.thumbnail_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown():
+    """关闭进程池（应用退出时调用）"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def is_supported(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in SUPPORTED_EXTENSIONS
+
+
+def source_key(path: str) -> Optional[str]:
+    """
+    源文件的内容标识
+
+    内容寻址文件直接使用文件名中的 SHA-256；
+    其他文件按路径、大小和修改时间计算，文件被替换后自动对应新的缩略图。
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if _SHA256_NAME.match(stem):
+        return stem
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    identity = f"{path}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+def variant_path(key: str, width: int) -> str:
+    base_dir = load_settings().upload.base_dir
+    return os.path.join(base_dir, "thumbnails", key[:2], f"{key}_{width}.webp")
+
+
+def _render(source: str, targets: Dict[int, str], quality: int) -> List[str]:
+    """在子进程中生成缺失的缩略图，返回新生成的文件"""
+    from PIL import Image, ImageOps
+
+    missing = {w: p for w, p in targets.items() if not os.path.exists(p)}
+    if not missing:
+        return []
+
+    created = []
+    with Image.open(source) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        for width, target in sorted(missing.items()):
+            variant = img.copy()
+            if variant.width > width:
+                height = max(1, round(variant.height * width / variant.width))
+                variant = variant.resize((width, height), Image.LANCZOS)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_path = f"{target}.{os.getpid()}.tmp"
+            variant.save(tmp_path, "WEBP", quality=quality, method=4)
+            # 并发生成同一尺寸时后写入者覆盖，内容相同
+            os.replace(tmp_path, target)
+            created.append(target)
+    return created
+
+
+def _submit(path: str, widths: List[int]) -> Optional[Future]:
+    key = source_key(path)
+    if key is None:
+        return None
+    targets = {w: variant_path(key, w) for w in widths}
+    if all(os.path.exists(p) for p in targets.values()):
+        return None
+    return _get_executor().submit(_render, path, targets, load_settings().upload.thumbnail_quality)
+
+
+def _log_failure(future: Future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning("生成缩略图失败: %s", future.exception())
+
+
+def schedule(path: str):
+    """上传完成后在后台生成全部尺寸的缩略图"""
+    config = load_settings().upload
+    if not config.create_thumbnails or not is_supported(path):
+        return
+    try:
+        future = _submit(path, config.thumbnail_widths)
+    except Exception as e:
+        logger.warning("提交缩略图任务失败: %s", e)
+        return
+    if future is not None:
+        future.add_done_callback(_log_failure)
+
+
+async def get_variant(path: str, width: int) -> Optional[str]:
+    """
+    获取指定宽度的缩略图路径，缺失时在进程池中生成
+
+    只支持配置中的宽度；不支持的文件或宽度返回 None，由调用方返回原图。
+    """
+    config = load_settings().upload
+    if not config.create_thumbnails or width not in config.thumbnail_widths or not is_supported(path):
+        return None
+    key = source_key(path)
+    if key is None:
+        return None
+    target = variant_path(key, width)
+    if os.path.exists(target):
+        return target
+
+    try:
+        future = _submit(path, [width])
+        if future is not None:
+            await asyncio.wrap_future(future)
+    except Exception as e:
+        # 图片损坏、格式无法解码或源文件已不存在时返回原图
+        logger.warning("生成缩略图失败 %s: %s", path, e)
+        return None
+    return target if os.path.exists(target) else None
+
+
+def remove_variants(path: str):
+    """删除源文件对应的全部缩略图（需在删除源文件前调用）"""
+    key = source_key(path)
+    if key is None:
+        return
+    for width in load_settings().upload.thumbnail_widths:
+        try:
+            os.remove(variant_path(key, width))
+        except FileNotFoundError:
+            pass
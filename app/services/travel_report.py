@@ -0,0 +1,239 @@
+"""
+用户旅行报告
+
+旅行天数、覆盖城市和总里程保存在汇总表中，随足迹写入增量更新：
+- 天数/城市：按日期、城市维护足迹计数，计数在 0 与 1 之间变化时调整汇总；
+- 总里程：足迹按 (visit_time, id) 排成路线，插入一个点时减去前后相邻点的距离，
+  加上与两侧的距离；删除时反向操作。修改视为删除旧位置后插入新位置。
+
+尚无汇总行的用户不做增量更新，首次查看报告时从足迹全量构建。
+全量重建：python -m app.services.travel_report [user_id]
+"""
+import math
+import re
+from collections import Counter
+from typing import Optional, Dict, Any
+
+from sqlalchemy import select, delete, insert, func, and_, or_
+from sqlalchemy.orm import Session
+
+from ..models import Footprint, User, UserTravelStats, UserTravelDay, UserTravelCity
+
+EARTH_RADIUS_KM = 6371.0088
+
+_CITY_PATTERN = re.compile(r"^(?:.+?(?:省|自治区|特别行政区))?(.+?(?:市|自治州|地区|盟))")
+
+
+def extract_city(address: Optional[str]) -> Optional[str]:
+    """
+    从详细地址中提取城市
+
+    Examples:
+        >>> extract_city("浙江省杭州市西湖区龙井路1号")
+        '杭州市'
+        >>> extract_city("北京市东城区景山前街4号")
+        '北京市'
+        >>> extract_city("Paris")
+    """
+    if not address:
+        return None
+    match = _CITY_PATTERN.match(address.strip())
+    if not match:
+        return None
+    return match.group(1)[:50]
+
+
+def haversine_km(lng1: float, lat1: float, lng2: float, lat2: float) -> float:
+    """两点间的大圆距离（公里）"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _distance(a, b) -> float:
+    if a is None or b is None:
+        return 0.0
+    return haversine_km(float(a[0]), float(a[1]), float(b[0]), float(b[1]))
+
+
+def _neighbors(db: Session, snap):
+    """路线上与快照位置相邻的前后足迹坐标（不含自身）"""
+    base = select(Footprint.longitude, Footprint.latitude).where(
+        Footprint.user_id == snap.user_id,
+        Footprint.visit_time.isnot(None),
+        Footprint.id != snap.id,
+    )
+    prev = db.execute(
+        base.where(or_(
+            Footprint.visit_time < snap.visit_time,
+            and_(Footprint.visit_time == snap.visit_time, Footprint.id < snap.id),
+        ))
+        .order_by(Footprint.visit_time.desc(), Footprint.id.desc())
+        .limit(1)
+        .with_for_update()
+    ).first()
+    nxt = db.execute(
+        base.where(or_(
+            Footprint.visit_time > snap.visit_time,
+            and_(Footprint.visit_time == snap.visit_time, Footprint.id > snap.id),
+        ))
+        .order_by(Footprint.visit_time, Footprint.id)
+        .limit(1)
+        .with_for_update()
+    ).first()
+    return prev, nxt
+
+
+def _lock_stats(db: Session, user_id: int) -> Optional[UserTravelStats]:
+    return (
+        db.query(UserTravelStats)
+        .filter(UserTravelStats.user_id == user_id)
+        .with_for_update()
+        .first()
+    )
+
+
+def _apply(db: Session, stats: UserTravelStats, snap, delta: int):
+    """按 delta（+1 插入 / -1 删除）更新一条足迹对汇总的贡献"""
+    stats.footprint_count += delta
+
+    if snap.visit_time is not None:
+        day = db.get(UserTravelDay, (snap.user_id, snap.visit_time), with_for_update=True)
+        if day is None and delta > 0:
+            db.add(UserTravelDay(user_id=snap.user_id, visit_date=snap.visit_time, footprint_count=1))
+            stats.day_count += 1
+        elif day is not None:
+            day.footprint_count += delta
+            if day.footprint_count <= 0:
+                db.delete(day)
+                stats.day_count -= 1
+
+        prev, nxt = _neighbors(db, snap)
+        point = (snap.longitude, snap.latitude)
+        change = _distance(prev, point) + _distance(point, nxt) - _distance(prev, nxt)
+        stats.total_distance_km = max(0.0, stats.total_distance_km + delta * change)
+
+    city = extract_city(snap.address)
+    if city:
+        row = db.get(UserTravelCity, (snap.user_id, city), with_for_update=True)
+        if row is None and delta > 0:
+            db.add(UserTravelCity(user_id=snap.user_id, city=city, footprint_count=1))
+            stats.city_count += 1
+        elif row is not None:
+            row.footprint_count += delta
+            if row.footprint_count <= 0:
+                db.delete(row)
+                stats.city_count -= 1
+
+
+def on_change(db: Session, old, new):
+    """
+    足迹写入时更新汇总（commit 前调用）
+
+    old/new 为写入前后的足迹快照，新增时 old 为空，删除时 new 为空。
+    """
+    user_id = (new or old).user_id
+    stats = _lock_stats(db, user_id)
+    if stats is None:
+        return
+    if old is not None and new is not None and (
+        old.visit_time == new.visit_time
+        and old.address == new.address
+        and old.longitude == new.longitude
+        and old.latitude == new.latitude
+    ):
+        return
+    if old is not None:
+        _apply(db, stats, old, -1)
+        # 先落库旧位置的变更，同一日期/城市的计数行被删除后才能重新插入
+        db.flush()
+    if new is not None:
+        _apply(db, stats, new, 1)
+
+
+def rebuild_user(db: Session, user_id: int) -> UserTravelStats:
+    """从足迹全量重建单个用户的汇总（调用方负责 commit）"""
+    db.execute(insert(UserTravelStats).prefix_with("IGNORE").values(user_id=user_id))
+    stats = _lock_stats(db, user_id)
+
+    rows = db.execute(
+        select(Footprint.longitude, Footprint.latitude, Footprint.visit_time, Footprint.address)
+        .where(Footprint.user_id == user_id)
+        .order_by(Footprint.visit_time, Footprint.id)
+    ).all()
+
+    days = Counter(row.visit_time for row in rows if row.visit_time is not None)
+    cities = Counter(city for city in (extract_city(row.address) for row in rows) if city)
+    path = [(row.longitude, row.latitude) for row in rows if row.visit_time is not None]
+    distance = sum(_distance(path[i], path[i + 1]) for i in range(len(path) - 1))
+
+    db.execute(delete(UserTravelDay).where(UserTravelDay.user_id == user_id))
+    db.execute(delete(UserTravelCity).where(UserTravelCity.user_id == user_id))
+    if days:
+        db.execute(insert(UserTravelDay), [
+            {"user_id": user_id, "visit_date": d, "footprint_count": c} for d, c in days.items()
+        ])
+    if cities:
+        db.execute(insert(UserTravelCity), [
+            {"user_id": user_id, "city": city, "footprint_count": c} for city, c in cities.items()
+        ])
+
+    stats.footprint_count = len(rows)
+    stats.day_count = len(days)
+    stats.city_count = len(cities)
+    stats.total_distance_km = distance
+    return stats
+
+
+def rebuild_all(db: Session) -> int:
+    """重建所有用户的汇总，返回处理的用户数量"""
+    user_ids = db.execute(select(User.id).order_by(User.id)).scalars().all()
+    for user_id in user_ids:
+        rebuild_user(db, user_id)
+        db.commit()
+    return len(user_ids)
+
+
+def get_report(db: Session, user_id: int) -> Dict[str, Any]:
+    """读取用户旅行报告，尚无汇总时先全量构建"""
+    stats = db.get(UserTravelStats, user_id)
+    if stats is None:
+        rebuild_user(db, user_id)
+        db.commit()
+        stats = db.get(UserTravelStats, user_id)
+
+    cities = db.execute(
+        select(UserTravelCity.city, UserTravelCity.footprint_count)
+        .where(UserTravelCity.user_id == user_id)
+        .order_by(UserTravelCity.footprint_count.desc(), UserTravelCity.city)
+    ).all()
+    first_day, last_day = db.execute(
+        select(func.min(UserTravelDay.visit_date), func.max(UserTravelDay.visit_date))
+        .where(UserTravelDay.user_id == user_id)
+    ).one()
+
+    return {
+        "footprint_count": stats.footprint_count,
+        "travel_days": stats.day_count,
+        "city_count": stats.city_count,
+        "total_distance_km": round(stats.total_distance_km, 2),
+        "cities": [{"name": city, "footprint_count": count} for city, count in cities],
+        "first_visit": first_day.isoformat() if first_day else None,
+        "last_visit": last_day.isoformat() if last_day else None,
+        "updated_at": stats.updated_at.isoformat() if stats.updated_at else None,
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    from ..db.session import SessionLocal
+
+    with SessionLocal() as session:
+        if len(sys.argv) > 1:
+            rebuild_user(session, int(sys.argv[1]))
+            session.commit()
+            print(f"已重建用户 {sys.argv[1]} 的旅行报告")
+        else:
+            print(f"已重建 {rebuild_all(session)} 个用户的旅行报告")
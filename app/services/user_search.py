@@ -0,0 +1,191 @@
+"""
+管理后台用户搜索
+
+搜索词同时按两种方式匹配，结果取并集：
+- 前缀：用户名/邮箱/昵称 LIKE 'q%'，走各自的索引；
+- 包含：user_search_tokens 中维护用户名/昵称/邮箱的 bigram 倒排索引，
+  搜索词的 bigram 全部命中即匹配（与足迹检索相同的切分方式）。
+索引不可用（关闭、未建立、重建中）或搜索词含单字片段时回退到原有的 LIKE '%q%' 查询；
+可用状态与重建锁见 index_state。
+
+总数默认取近似值：不带搜索词时读取统计计数器，带搜索词时缓存计数结果；
+调用方可要求精确计数。
+
+全量重建：python -m app.services.user_search
+"""
+import hashlib
+import logging
+from typing import Optional, Tuple
+
+from sqlalchemy import select, delete, insert, func, or_
+from sqlalchemy.orm import Session
+
+from ..core.config import load_settings
+from ..core.redis_client import get_redis
+from ..models import User, UserSearchToken, StatsCounter
+from ..utils.ngram import tokenize, query_tokens
+from . import index_state
+
+logger = logging.getLogger(__name__)
+
+COUNT_KEY_PREFIX = "admin:users:count:"
+
+INDEX_NAME = "users"
+
+
+def is_available() -> bool:
+    """索引是否可用于查询"""
+    return load_settings().search.enabled and index_state.is_ready(INDEX_NAME)
+
+
+def build_tokens(username: Optional[str], nickname: Optional[str], email: Optional[str]) -> set:
+    tokens = set()
+    for text in (username, nickname, email):
+        tokens.update(tokenize(text))
+    return tokens
+
+
+def index_user(db: Session, user: User):
+    """重建单个用户的索引（与用户写入处于同一事务）"""
+    db.execute(delete(UserSearchToken).where(UserSearchToken.user_id == user.id))
+    tokens = build_tokens(user.username, user.nickname, user.email)
+    if tokens:
+        db.execute(insert(UserSearchToken), [{"token": token, "user_id": user.id} for token in tokens])
+
+
+def search_condition(q: str):
+    """搜索条件：前缀匹配或 bigram 全部命中"""
+    if not is_available():
+        return or_(User.username.contains(q), User.nickname.contains(q), User.email.contains(q))
+
+    tokens = query_tokens(q)
+    if not tokens:
+        # 含单字片段的搜索词无法用 bigram 匹配，回退到 LIKE 查询
+        return or_(User.username.contains(q), User.nickname.contains(q), User.email.contains(q))
+
+    matches = (
+        select(UserSearchToken.user_id)
+        .where(UserSearchToken.token.in_(tokens))
+        .group_by(UserSearchToken.user_id)
+        .having(func.count() == len(tokens))
+    )
+    return or_(
+        User.username.startswith(q, autoescape=True),
+        User.email.startswith(q, autoescape=True),
+        User.nickname.startswith(q, autoescape=True),
+        User.id.in_(matches),
+    )
+
+
+def count_users(db: Session, q: Optional[str], status: Optional[int], exact: bool = False) -> Tuple[int, bool]:
+    """
+    用户总数，返回 (总数, 是否精确)
+
+    不带搜索词时读取统计计数器（由对账任务定期校正）；带搜索词时使用缓存的计数。
+    """
+    if exact:
+        return _exact_count(db, q, status), True
+
+    if not q:
+        name = {None: "users.total", 1: "users.active", 0: "users.disabled"}.get(status)
+        if name is not None:
+            value = db.execute(select(StatsCounter.value).where(StatsCounter.name == name)).scalar()
+            if value is not None:
+                return value, False
+        return _exact_count(db, q, status), True
+
+    digest = hashlib.sha1(f"{q}|{status}".encode("utf-8")).hexdigest()
+    key = COUNT_KEY_PREFIX + digest
+    try:
+        cached = get_redis().get(key)
+        if cached is not None:
+            return int(cached), False
+    except Exception as e:
+        logger.warning("读取用户计数缓存失败: %s", e)
+
+    total = _exact_count(db, q, status)
+    try:
+        get_redis().set(key, total, ex=load_settings().search.user_count_cache_seconds)
+    except Exception as e:
+        logger.warning("写入用户计数缓存失败: %s", e)
+    return total, True
+
+
+def _exact_count(db: Session, q: Optional[str], status: Optional[int]) -> int:
+    query = select(func.count()).select_from(User)
+    if q:
+        query = query.where(search_condition(q))
+    if status is not None:
+        query = query.where(User.status == status)
+    return db.execute(query).scalar()
+
+
+def rebuild_index(batch_size: Optional[int] = None) -> Optional[int]:
+    """全量重建索引，返回处理的用户数量；其他进程正在重建时返回 None"""
+    return index_state.rebuild(INDEX_NAME, lambda db: _build_index(db, batch_size))
+
+
+def _build_index(db: Session, batch_size: Optional[int] = None) -> int:
+    batch_size = batch_size or load_settings().search.rebuild_batch_size
+    db.execute(delete(UserSearchToken))
+    db.commit()
+
+    total = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(User.id, User.username, User.nickname, User.email)
+            .where(User.id > last_id)
+            .order_by(User.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        values = [
+            {"token": token, "user_id": row.id}
+            for row in rows
+            for token in build_tokens(row.username, row.nickname, row.email)
+        ]
+        if values:
+            # 重建期间的并发写入可能已写入同样的词元，忽略重复
+            db.execute(insert(UserSearchToken).prefix_with("IGNORE"), values)
+        db.commit()
+        total += len(rows)
+        last_id = rows[-1].id
+    return total
+
+
+def prepare_index(db: Session) -> bool:
+    """
+    启动时检查索引状态
+
+    返回 True 表示需要全量重建（从未建立，或上次重建没有完成）。
+    """
+    if not load_settings().search.enabled:
+        return False
+    try:
+        return not index_state.read_ready(db, INDEX_NAME)
+    except Exception as e:
+        logger.warning("用户搜索索引不可用，搜索回退为 LIKE: %s", e)
+        return False
+
+
+def rebuild_in_background():
+    """在后台线程中全量重建，完成后启用索引；多个进程同时启动时只有一个执行"""
+    try:
+        count = rebuild_index()
+    except Exception as e:
+        logger.warning("用户搜索索引重建失败: %s", e)
+        return
+    if count is None:
+        logger.info("用户搜索索引正在由其他进程重建")
+    else:
+        logger.info("用户搜索索引重建完成，共 %d 个用户", count)
+
+
+if __name__ == "__main__":
+    count = rebuild_index()
+    if count is None:
+        print("用户搜索索引正在由其他进程重建")
+    else:
+        print(f"已重建 {count} 个用户的搜索索引")
@@ -0,0 +1,187 @@
+"""
+文件下载响应：条件请求与断点续传
+
+- 强 ETag 由 inode、修改时间（纳秒）与大小构成，文件被替换后自动变化；
+- If-None-Match / If-Modified-Since 命中时返回 304；
+- Range 请求返回 206，多个区间时返回 multipart/byteranges，
+  区间无法满足时返回 416；If-Range 与当前 ETag 不一致（或为日期）时返回完整文件。
+"""
+import os
+import uuid
+import mimetypes
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, List, Tuple, Dict, Iterator
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from .upload_storage import CHUNK_SIZE
+
+MAX_RANGES = 16  # 超过该数量的区间请求直接返回完整文件
+
+
+def file_etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match 使用弱比较
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def is_not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """按 RFC 9110 的优先级判断条件请求：有 If-None-Match 时忽略 If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+    return False
+
+
+def parse_range(header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    解析 Range 请求头
+
+    Returns:
+        合并后的闭区间列表；格式无法识别时返回 None（按完整文件处理），
+        区间都无法满足时返回空列表
+
+    Examples:
+        >>> parse_range("bytes=0-99", 1000)
+        [(0, 99)]
+        >>> parse_range("bytes=-100", 1000)
+        [(900, 999)]
+        >>> parse_range("bytes=0-9,5-19,900-", 1000)
+        [(0, 19), (900, 999)]
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+
+    ranges = []
+    for part in spec.split(","):
+        start_s, sep, end_s = part.strip().partition("-")
+        if not sep:
+            return None
+        try:
+            if start_s == "":
+                # 后缀区间：最后 N 个字节
+                length = int(end_s)
+                if length <= 0:
+                    continue
+                start, end = max(0, size - length), size - 1
+            else:
+                start = int(start_s)
+                end = int(end_s) if end_s else size - 1
+        except ValueError:
+            return None
+        if start >= size:
+            continue
+        if end < start:
+            return None
+        ranges.append((start, min(end, size - 1)))
+
+    ranges.sort()
+    merged: List[Tuple[int, int]] = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _read_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _multipart(path: str, ranges: List[Tuple[int, int]], size: int, media_type: str, boundary: str):
+    """multipart/byteranges 的各部分头部与总长度"""
+    heads = [
+        (
+            f"--{boundary}\r\n"
+            f"Content-Type: {media_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        ).encode("latin-1")
+        for start, end in ranges
+    ]
+    tail = f"\r\n--{boundary}--\r\n".encode("latin-1")
+    length = sum(len(h) for h in heads) + sum(end - start + 1 for start, end in ranges)
+    length += 2 * (len(ranges) - 1) + len(tail)
+
+    def body() -> Iterator[bytes]:
+        for i, ((start, end), head) in enumerate(zip(ranges, heads)):
+            if i:
+                yield b"\r\n"
+            yield head
+            yield from _read_range(path, start, end)
+        yield tail
+
+    return body(), length
+
+
+def file_response(request: Request, path: str, stat: os.stat_result,
+                  headers: Optional[Dict[str, str]] = None) -> Response:
+    """根据请求头返回 200 / 206 / 304 / 416 响应"""
+    etag = file_etag(stat)
+    base_headers = dict(headers or {})
+    base_headers.update({
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+    })
+
+    if is_not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=base_headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        ranges = parse_range(range_header, stat.st_size)
+        if ranges == []:
+            return Response(
+                status_code=416,
+                headers={**base_headers, "Content-Range": f"bytes */{stat.st_size}"},
+            )
+        if ranges and len(ranges) <= MAX_RANGES:
+            media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            if len(ranges) == 1:
+                start, end = ranges[0]
+                return StreamingResponse(
+                    _read_range(path, start, end),
+                    status_code=206,
+                    media_type=media_type,
+                    headers={
+                        **base_headers,
+                        "Content-Range": f"bytes {start}-{end}/{stat.st_size}",
+                        "Content-Length": str(end - start + 1),
+                    },
+                )
+            boundary = uuid.uuid4().hex
+            body, length = _multipart(path, ranges, stat.st_size, media_type, boundary)
+            return StreamingResponse(
+                body,
+                status_code=206,
+                media_type=f"multipart/byteranges; boundary={boundary}",
+                headers={**base_headers, "Content-Length": str(length)},
+            )
+
+    return FileResponse(path, stat_result=stat, headers=base_headers)
@@ -1,14 +1,20 @@
 import os
 import hmac
+import math
+import struct
 import hashlib
 import base64
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from urllib.parse import quote, unquote
 from typing import Optional, Dict, Any
 import json
 
 from ..core.config import load_settings
 
+# 签名中过期时间按 8 字节无符号整数编码
+MAX_EXPIRES = 2 ** 64 - 1
+
 
 class FileSignatureManager:
     """文件访问签名管理器"""
@@ -17,6 +23,9 @@ class FileSignatureManager:
         self.settings = load_settings()
         self.upload_config = self.settings.upload
         self.signature_config = self.upload_config.access_signature
+        self._secret = self.signature_config.secret_key.encode('utf-8')
+        # 签名只依赖 (路径, 过期时间)，按窗口对齐后大量重复，用 LRU 缓存
+        self._sign = lru_cache(maxsize=self.signature_config.signature_cache_size)(self._compute_signature)
     
     def generate_directory_path(self, user_id: int, file_type: str = "image") -> str:
         """根据配置策略生成文件存储目录路径"""
@@ -57,17 +66,10 @@ class FileSignatureManager:
         if expires_minutes is None:
             expires_minutes = self.signature_config.expires_minutes
         
-        expires_at = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes)
-        expires_timestamp = int(expires_at.timestamp())
-        
-        # 准备签名数据
-        signature_data = {
-            "path": file_path,
-            "expires": expires_timestamp
-        }
+        expires_timestamp = self._aligned_expires(expires_minutes)
         
         # 生成签名
-        signature = self._generate_signature(signature_data)
+        signature = self._sign(file_path, expires_timestamp)
         
         # 构建签名URL
         encoded_path = quote(file_path, safe='/')
@@ -85,28 +87,49 @@ class FileSignatureManager:
             result["valid"] = True
             return result
         
-        # 检查是否过期
+        # 检查是否过期（超出 8 字节无符号范围的值无法参与签名，直接拒绝）
         current_timestamp = int(datetime.now(timezone.utc).timestamp())
+        if not 0 <= expires_timestamp <= MAX_EXPIRES:
+            result["error"] = "签名验证失败"
+            return result
         if current_timestamp > expires_timestamp:
             result["error"] = "URL已过期"
             return result
         
-        # 验证签名
-        signature_data = {
-            "path": file_path,
-            "expires": expires_timestamp
-        }
-        
-        expected_signature = self._generate_signature(signature_data)
+        # 验证签名：参数来自请求，不经过 LRU 缓存，避免随机请求挤掉生成签名的缓存
+        expected_signature = self._compute_signature(file_path, expires_timestamp)
         if not hmac.compare_digest(signature, expected_signature):
-            result["error"] = "签名验证失败"
-            return result
+            # 迁移期间兼容旧版签名
+            legacy_valid = self.signature_config.accept_legacy_signatures and hmac.compare_digest(
+                signature,
+                self._generate_legacy_signature({"path": file_path, "expires": expires_timestamp})
+            )
+            if not legacy_valid:
+                result["error"] = "签名验证失败"
+                return result
         
         result["valid"] = True
         return result
     
-    def _generate_signature(self, data: Dict[str, Any]) -> str:
-        """生成数据签名"""
+    def _aligned_expires(self, expires_minutes: int) -> int:
+        """
+        计算对齐到窗口边界的过期时间戳
+
+        向上取整保证实际有效期不短于 expires_minutes，
+        同一窗口内生成的 URL 完全相同，浏览器缓存可以复用。
+        """
+        window = max(1, self.signature_config.url_window_seconds)
+        now = datetime.now(timezone.utc).timestamp()
+        return int(math.ceil((now + expires_minutes * 60) / window) * window)
+    
+    def _compute_signature(self, file_path: str, expires_timestamp: int) -> str:
+        """按固定字节布局生成签名：b"v2" 0x00 路径 0x00 8字节大端过期时间"""
+        message = b"v2\x00" + file_path.encode('utf-8') + b"\x00" + struct.pack(">Q", expires_timestamp)
+        digest = hmac.new(self._secret, message, hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).decode('utf-8').rstrip('=')
+    
+    def _generate_legacy_signature(self, data: Dict[str, Any]) -> str:
+        """旧版签名（JSON 序列化），仅用于迁移期间的校验"""
         # 将数据转换为JSON字符串并排序键
         json_str = json.dumps(data, sort_keys=True, separators=(',', ':'))
         
@@ -0,0 +1,135 @@
+"""
+Geohash 编码工具函数
+
+经纬度编码为 base32 字符串，前缀相同的点在空间上相邻，
+因此“矩形范围查询”可以转换为若干个前缀的索引范围扫描。
+"""
+import math
+from typing import List, Tuple
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE_MAP = {c: i for i, c in enumerate(_BASE32)}
+
+MAX_PRECISION = 12
+
+
+def encode(latitude: float, longitude: float, precision: int = MAX_PRECISION) -> str:
+    """
+    将经纬度编码为 geohash
+
+    Examples:
+        >>> encode(39.9042, 116.4074, 6)
+        'wx4g0b'
+    """
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    latitude = float(latitude)
+    longitude = float(longitude)
+
+    chars = []
+    bit = 0
+    value = 0
+    even = True  # 偶数位编码经度
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if longitude >= mid:
+                value = (value << 1) | 1
+                lng_lo = mid
+            else:
+                value <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if latitude >= mid:
+                value = (value << 1) | 1
+                lat_lo = mid
+            else:
+                value <<= 1
+                lat_hi = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(_BASE32[value])
+            bit = 0
+            value = 0
+    return "".join(chars)
+
+
+def decode_bbox(geohash: str) -> Tuple[float, float, float, float]:
+    """返回 geohash 单元的范围 (min_lng, min_lat, max_lng, max_lat)"""
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    even = True
+    for c in geohash:
+        value = _DECODE_MAP[c]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lng_lo + lng_hi) / 2
+                if bit:
+                    lng_lo = mid
+                else:
+                    lng_hi = mid
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                if bit:
+                    lat_lo = mid
+                else:
+                    lat_hi = mid
+            even = not even
+    return lng_lo, lat_lo, lng_hi, lat_hi
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """返回指定精度下单元的 (经度跨度, 纬度跨度)"""
+    bits = precision * 5
+    lng_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 360.0 / (1 << lng_bits), 180.0 / (1 << lat_bits)
+
+
+def cells_in_bbox(
+    min_lng: float, min_lat: float, max_lng: float, max_lat: float, precision: int
+) -> List[str]:
+    """列出与矩形相交的全部指定精度的单元"""
+    lng_step, lat_step = cell_size(precision)
+    # 对齐到单元网格，避免浮点步进漏掉边缘单元
+    lng_start = math.floor((min_lng + 180.0) / lng_step)
+    lng_end = math.floor((min(max_lng, 180.0 - 1e-9) + 180.0) / lng_step)
+    lat_start = math.floor((min_lat + 90.0) / lat_step)
+    lat_end = math.floor((min(max_lat, 90.0 - 1e-9) + 90.0) / lat_step)
+
+    cells = []
+    for i in range(lat_start, lat_end + 1):
+        lat = -90.0 + (i + 0.5) * lat_step
+        for j in range(lng_start, lng_end + 1):
+            lng = -180.0 + (j + 0.5) * lng_step
+            cells.append(encode(lat, lng, precision))
+    return cells
+
+
+def estimate_cells(
+    min_lng: float, min_lat: float, max_lng: float, max_lat: float, precision: int
+) -> int:
+    """估算矩形覆盖的单元数量"""
+    lng_step, lat_step = cell_size(precision)
+    cols = math.floor((max_lng + 180.0) / lng_step) - math.floor((min_lng + 180.0) / lng_step) + 1
+    rows = math.floor((max_lat + 90.0) / lat_step) - math.floor((min_lat + 90.0) / lat_step) + 1
+    return cols * rows
+
+
+def cover_bbox(
+    min_lng: float, min_lat: float, max_lng: float, max_lat: float, max_cells: int = 32
+) -> List[str]:
+    """
+    用不超过 max_cells 个 geohash 前缀覆盖矩形
+
+    选择满足数量限制的最高精度，精度越高覆盖越贴合、扫描的多余数据越少。
+    """
+    precision = 1
+    for p in range(1, MAX_PRECISION + 1):
+        if estimate_cells(min_lng, min_lat, max_lng, max_lat, p) > max_cells:
+            break
+        precision = p
+    return cells_in_bbox(min_lng, min_lat, max_lng, max_lat, precision)
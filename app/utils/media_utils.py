@@ -1,8 +1,11 @@
 """
 媒体文件相关工具函数
 """
+from typing import Optional, Dict
 from urllib.parse import unquote
 from .file_signature import file_signature_manager
+from ..core.config import load_settings
+from ..services.thumbnails import is_supported
 
 
 def generate_media_url(file_path: str) -> str:
@@ -54,3 +57,31 @@ def generate_media_url(file_path: str) -> str:
         if not file_path.startswith('/') and not file_path.startswith('http'):
             return f"/{file_path}"
         return file_path
+
+
+def generate_thumbnail_urls(file_path: str) -> Optional[Dict[str, str]]:
+    """
+    生成图片缩略图的签名URL
+
+    Returns:
+        {"thumbnail_url": 最小尺寸URL, "srcset": "url 200w, url 400w, ..."}，
+        外部链接、未启用签名或不支持的格式返回 None
+
+    Examples:
+        >>> generate_thumbnail_urls("uploads/images/cas/ab/cd/abcd....jpg")
+        {"thumbnail_url": "/file/...?signature=xxx&expires=xxx&w=200",
+         "srcset": "/file/...&w=200 200w, /file/...&w=400 400w, /file/...&w=800 800w"}
+    """
+    config = load_settings().upload
+    if not config.create_thumbnails or not config.thumbnail_widths:
+        return None
+    signed_url = generate_media_url(file_path)
+    if not signed_url.startswith('/file/') or not is_supported(signed_url.split('?')[0]):
+        return None
+
+    widths = sorted(config.thumbnail_widths)
+    urls = [(w, f"{signed_url}&w={w}") for w in widths]
+    return {
+        "thumbnail_url": urls[0][1],
+        "srcset": ", ".join(f"{url} {w}w" for w, url in urls),
+    }
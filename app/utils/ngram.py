@@ -0,0 +1,52 @@
+"""
+N-gram 分词工具函数
+
+中文没有天然的词边界，这里统一按字符二元组（bigram）切分：
+文本先转小写，再按非文字字符切成片段，每个片段生成相邻两字的组合；
+只有一个字的片段保留单字。
+"""
+import re
+from collections import Counter
+from typing import Optional, Set
+
+_SPLIT_PATTERN = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def _segments(text: str) -> list[str]:
+    return [seg for seg in _SPLIT_PATTERN.split(text.lower()) if seg]
+
+
+def tokenize(text: Optional[str]) -> Counter:
+    """
+    将文本切分为 bigram 并统计词频
+
+    Examples:
+        >>> tokenize("西湖断桥")
+        Counter({'西湖': 1, '湖断': 1, '断桥': 1})
+        >>> tokenize("A 馆")
+        Counter({'a': 1, '馆': 1})
+    """
+    counter = Counter()
+    if not text:
+        return counter
+    for seg in _segments(text):
+        if len(seg) == 1:
+            counter[seg] += 1
+            continue
+        for i in range(len(seg) - 1):
+            counter[seg[i:i + 2]] += 1
+    return counter
+
+
+def query_tokens(query: Optional[str]) -> Optional[Set[str]]:
+    """
+    将搜索词切分为 bigram 集合
+
+    单字片段无法与索引中的 bigram 对应，此时返回 None，由调用方回退到 LIKE 查询。
+    """
+    if not query:
+        return None
+    segments = _segments(query)
+    if not segments or any(len(seg) < 2 for seg in segments):
+        return None
+    return {seg[i:i + 2] for seg in segments for i in range(len(seg) - 1)}
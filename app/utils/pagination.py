@@ -0,0 +1,60 @@
+"""
+游标（键集）分页工具函数
+
+游标对外是不透明字符串，内部编码为 (created_at, id)，
+列表按 created_at 倒序、id 倒序排列。
+只按自增 id 倒序的列表（如操作日志）使用单列的 id 游标。
+"""
+import base64
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    """将 (created_at, id) 编码为不透明游标"""
+    raw = f"{created_at.isoformat()}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("utf-8").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """解析游标，格式错误时抛出 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("utf-8")).decode("utf-8")
+        created_at, item_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), int(item_id)
+    except Exception:
+        raise ValueError("无效的游标")
+
+
+def keyset_before(created_col, id_col, cursor: str):
+    """生成 (created_at, id) < 游标位置 的过滤条件"""
+    created_at, item_id = decode_cursor(cursor)
+    return or_(
+        created_col < created_at,
+        and_(created_col == created_at, id_col < item_id),
+    )
+
+
+def next_cursor(items: Sequence, limit: int) -> Optional[str]:
+    """本页取满时返回下一页游标，否则返回 None"""
+    if len(items) < limit or not items:
+        return None
+    last = items[-1]
+    return encode_cursor(last.created_at, last.id)
+
+
+def encode_id_cursor(item_id: int) -> str:
+    """将 id 编码为不透明游标"""
+    return base64.urlsafe_b64encode(str(item_id).encode("utf-8")).decode("utf-8").rstrip("=")
+
+
+def id_before(id_col, cursor: str):
+    """生成 id < 游标位置 的过滤条件，格式错误时抛出 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        item_id = int(base64.urlsafe_b64decode(padded.encode("utf-8")).decode("utf-8"))
+    except Exception:
+        raise ValueError("无效的游标")
+    return id_col < item_id
@@ -0,0 +1,130 @@
+"""
+上传文件存储工具
+
+上传内容按固定大小分块写入目标目录下的临时文件，边写边累计大小和 SHA-256，
+超过大小限制立即中止；写入完成后原子重命名为最终文件名。
+"""
+import os
+import shutil
+import hashlib
+import tempfile
+from typing import BinaryIO, NamedTuple, List
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# 进程的 umask（导入时读取一次）；mkstemp 创建的文件权限为 0600，
+# 重命名前改为与普通 open 创建一致的权限，静态文件服务器等其他用户仍可读取
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
+
+
+class UploadTooLargeError(Exception):
+    """上传内容超过大小限制"""
+
+    def __init__(self, max_size: int):
+        super().__init__(f"file exceeds {max_size} bytes")
+        self.max_size = max_size
+
+
+class StoredFile(NamedTuple):
+    path: str
+    size: int
+    sha256: str
+
+
+def save_stream(source: BinaryIO, directory: str, filename: str, max_size: int) -> StoredFile:
+    """
+    将文件流保存到 directory/filename
+
+    Args:
+        source: 可读的二进制文件对象（如 UploadFile.file）
+        directory: 目标目录，不存在时自动创建
+        filename: 最终文件名
+        max_size: 最大允许字节数
+
+    Raises:
+        UploadTooLargeError: 内容超过 max_size，临时文件已删除
+    """
+    os.makedirs(directory, exist_ok=True)
+    # 临时文件与目标位于同一目录，保证重命名是原子操作
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload_", suffix=".part")
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLargeError(max_size)
+                hasher.update(chunk)
+                out.write(chunk)
+        os.chmod(tmp_path, FILE_MODE)
+        final_path = os.path.join(directory, filename)
+        os.replace(tmp_path, final_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return StoredFile(path=final_path, size=size, sha256=hasher.hexdigest())
+
+
+def _copy_file_zero_copy(src_fd: int, dst_fd: int, count: int):
+    """在内核中完成文件拷贝，不经过用户态缓冲区"""
+    copied = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while copied < count:
+                n = os.copy_file_range(src_fd, dst_fd, count - copied)
+                if n == 0:
+                    break
+                copied += n
+            return
+        except OSError:
+            pass
+    if hasattr(os, "sendfile"):
+        try:
+            while copied < count:
+                n = os.sendfile(dst_fd, src_fd, copied, count - copied)
+                if n == 0:
+                    break
+                copied += n
+            return
+        except OSError:
+            pass
+    # 平台不支持时退回普通拷贝
+    os.lseek(src_fd, copied, os.SEEK_SET)
+    with os.fdopen(os.dup(src_fd), "rb") as src, os.fdopen(os.dup(dst_fd), "ab") as dst:
+        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+
+def concat_files(part_paths: List[str], directory: str, filename: str) -> StoredFile:
+    """
+    按顺序拼接分片文件为 directory/filename
+
+    使用 copy_file_range/sendfile 零拷贝拼接，完成后原子重命名。
+    返回值的 sha256 为空字符串（零拷贝不经过用户态，无法顺带计算哈希）。
+    """
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload_", suffix=".part")
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for part_path in part_paths:
+                part_size = os.path.getsize(part_path)
+                with open(part_path, "rb") as part:
+                    _copy_file_zero_copy(part.fileno(), out.fileno(), part_size)
+                size += part_size
+                # 同步写入位置，保证下一个分片追加在末尾
+                os.lseek(out.fileno(), size, os.SEEK_SET)
+        os.chmod(tmp_path, FILE_MODE)
+        final_path = os.path.join(directory, filename)
+        os.replace(tmp_path, final_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return StoredFile(path=final_path, size=size, sha256="")
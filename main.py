@@ -3,10 +3,14 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from starlette.responses import JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 from app.core.config import load_settings
 from app.db.session import Base, engine, get_db
-from app.models.oplog import OpLog
+from app.db.async_session import async_engine
+from app.db.schema_upgrades import apply_schema_upgrades
+from app.core.audit_log import audit_log_writer
+from app.core.auth_cache import auth_cache
+from app.core.scheduler import scheduler
+from app.services import search_index, user_search, geo_index, thumbnails, comment_service, stats, oplog_archive
 from app.api.routes_auth import router as auth_router
 from app.api.routes_footprints import router as footprints_router
 from app.api.routes_footprint_types import router as footprint_types_router
@@ -17,9 +21,11 @@ from app.api.routes_map import router as map_router
 from app.core.security import decode_token, hash_password
 from app.models.user import User
 from app.utils.file_signature import file_signature_manager
-from fastapi.responses import FileResponse
+from app.utils.file_response import file_response
 from urllib.parse import unquote
+from typing import Optional
 import os
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi.exceptions import RequestValidationError
 from starlette.requests import Request as StarletteRequest
@@ -29,6 +35,31 @@ from app.utils.response import ok, fail
 settings = load_settings()
 
 
+def _backfill_geohash():
+    with Session(bind=engine) as s:
+        try:
+            geo_index.backfill_geohash(s)
+        except Exception:
+            s.rollback()
+
+
+def _backfill_comment_paths():
+    with Session(bind=engine) as s:
+        try:
+            comment_service.backfill_paths(s)
+        except Exception:
+            s.rollback()
+
+
+def _reconcile_stats():
+    with Session(bind=engine) as s:
+        try:
+            stats.reconcile(s)
+        except Exception:
+            s.rollback()
+            raise
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     Base.metadata.create_all(bind=engine)
@@ -64,12 +95,41 @@ async def lifespan(app: FastAPI):
         s.commit()
     
     # 处理数据库结构变更（向后兼容）
-    try:
-        with engine.begin() as conn:
-            conn.execute(text("ALTER TABLE footprints ADD COLUMN is_public TINYINT(1) NOT NULL DEFAULT 0"))
-    except Exception:
-        pass
+    apply_schema_upgrades(engine)
+
+    # 检查全文检索索引，已有数据但索引为空时在后台重建
+    with Session(bind=engine) as s:
+        needs_rebuild = search_index.prepare_index(s)
+    if needs_rebuild:
+        app.state.search_rebuild = asyncio.create_task(asyncio.to_thread(search_index.rebuild_in_background))
+
+    # 管理后台用户搜索索引
+    with Session(bind=engine) as s:
+        needs_rebuild = user_search.prepare_index(s)
+    if needs_rebuild:
+        app.state.user_search_rebuild = asyncio.create_task(asyncio.to_thread(user_search.rebuild_in_background))
+
+    # 补齐历史足迹的 geohash
+    app.state.geohash_backfill = asyncio.create_task(asyncio.to_thread(_backfill_geohash))
+
+    # 补齐历史评论的物化路径
+    app.state.comment_path_backfill = asyncio.create_task(asyncio.to_thread(_backfill_comment_paths))
+
+    await audit_log_writer.start()
+    auth_cache.start_listener()
+
+    # 统计计数对账（启动时执行一次）
+    scheduler.add_job("stats_reconcile", settings.stats.reconcile_interval_seconds, _reconcile_stats)
+    # 操作日志分区维护与过期归档
+    scheduler.add_job("oplog_maintenance", settings.audit_log.maintenance_interval_seconds, oplog_archive.run_maintenance)
+    scheduler.start()
     yield
+    await scheduler.stop()
+    auth_cache.stop_listener()
+    # 关闭前刷出队列中的操作日志
+    await audit_log_writer.stop()
+    thumbnails.shutdown()
+    await async_engine.dispose()
 
 
 app = FastAPI(title="JTrace API", version="0.1.0", lifespan=lifespan)
@@ -111,32 +171,22 @@ async def audit_log_middleware(request: Request, call_next):
     finally:
         try:
             if request.url.path.startswith("/api/"):
-                user_id = None
                 token = request.headers.get("Authorization", "").replace("Bearer ", "").strip()
-                username = None
-                if token:
+                # 优先从认证缓存读取用户名，避免重复解码
+                username = auth_cache.username_for(token) if token else None
+                if token and username is None:
                     try:
                         payload = decode_token(token)
                         username = payload.get("sub")
                     except Exception:
                         username = None
-                with engine.begin() as conn:
-                    if username:
-                        try:
-                            uid = conn.execute(text("SELECT id FROM users WHERE username=:u"), {"u": username}).scalar()
-                            if uid:
-                                user_id = int(uid)
-                        except Exception:
-                            user_id = None
-                    conn.execute(
-                        OpLog.__table__.insert().values(
-                            user_id=user_id,
-                            action="REQUEST",
-                            path=request.url.path,
-                            method=request.method,
-                            detail=None,
-                        )
-                    )
+                # 仅入队，由后台写入器批量落库
+                await audit_log_writer.enqueue(
+                    path=request.url.path,
+                    method=request.method,
+                    action="REQUEST",
+                    username=username,
+                )
         except Exception:
             pass
 
@@ -158,10 +208,12 @@ app.include_router(map_router, prefix="/api")
 @app.get("/file/{file_path:path}")
 async def get_file(
     file_path: str,
+    request: Request,
     signature: str,
     expires: int,
+    w: Optional[int] = None,
 ):
-    """获取签名保护的文件"""
+    """获取签名保护的文件，w 为缩略图宽度"""
     try:
         # 解码文件路径
         decoded_path = unquote(file_path)
@@ -178,15 +230,30 @@ async def get_file(
             )
         
         # 检查文件是否存在
-        if not os.path.exists(decoded_path):
+        try:
+            stat = os.stat(decoded_path)
+        except FileNotFoundError:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="文件不存在"
             )
         
-        # 返回文件
-        return FileResponse(
-            path=decoded_path,
+        # 请求缩略图时返回对应尺寸，不支持时返回原图
+        if w is not None:
+            variant = await thumbnails.get_variant(decoded_path, w)
+            if variant is not None:
+                try:
+                    stat = os.stat(variant)
+                    decoded_path = variant
+                except FileNotFoundError:
+                    # 缩略图刚被删除，返回原图
+                    pass
+        
+        # 返回文件（支持 Range 与 ETag/Last-Modified 条件请求）
+        return file_response(
+            request,
+            decoded_path,
+            stat,
             headers={
                 "Cache-Control": "public, max-age=3600",  # 缓存1小时
                 "Access-Control-Allow-Origin": "*"
@@ -0,0 +1,61 @@
+"""
+管理后台用户列表：旧客户端（不传 cursor）不截断，传 cursor 时分页
+"""
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app.api.deps import get_current_admin
+from app.api.routes_admin import router as admin_router
+from app.db.session import get_db
+from app.models import User
+
+USER_COUNT = 150
+
+
+@pytest.fixture
+def client(db):
+    now = datetime.utcnow()
+    db.add_all([
+        User(id=i, username=f"user{i}", email=f"user{i}@example.com", password_hash="x",
+             created_at=now, updated_at=now)
+        for i in range(1, USER_COUNT + 1)
+    ])
+    db.commit()
+    admin = db.get(User, 1)
+    SessionLocal = sessionmaker(bind=db.get_bind(), autoflush=False)
+
+    def override_get_db():
+        with SessionLocal() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(admin_router, prefix="/api")
+    app.dependency_overrides.update({get_db: override_get_db, get_current_admin: lambda: admin})
+    return TestClient(app)
+
+
+def _get(client, params=None):
+    body = client.get("/api/admin/users", params=params).json()
+    assert body["success"], body["message"]
+    return body["data"]
+
+
+def test_legacy_list_returns_all_users(client):
+    users = _get(client)
+    assert len(users) == USER_COUNT
+    assert [u["id"] for u in users] == list(range(USER_COUNT, 0, -1))
+
+
+def test_cursor_pages_through_all_users(client):
+    ids = []
+    cursor = ""
+    while cursor is not None:
+        page = _get(client, {"cursor": cursor, "limit": 40})
+        assert len(page["users"]) <= 40
+        ids.extend(u["id"] for u in page["users"])
+        cursor = page["next_cursor"]
+    assert ids == list(range(USER_COUNT, 0, -1))
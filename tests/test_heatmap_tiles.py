@@ -0,0 +1,76 @@
+"""
+热力图瓦片：边界点归属与缓存失效
+"""
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.models import User, FootprintType, Footprint
+from app.services import heatmap_tiles
+from app.utils import geohash
+from conftest import FakeRedis
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(heatmap_tiles, "get_redis_binary", lambda: fake)
+    return fake
+
+
+@pytest.fixture
+def seeded(db):
+    now = datetime.utcnow()
+    db.add_all([
+        User(id=1, username="alice", email="alice@example.com", password_hash="x", created_at=now, updated_at=now),
+        FootprintType(id=1, name="城市"),
+    ])
+    db.commit()
+    return db
+
+
+def _add_footprint(db, footprint_id, longitude, latitude):
+    now = datetime.utcnow()
+    footprint = Footprint(
+        id=footprint_id, user_id=1, type_id=1, name=f"足迹{footprint_id}", is_public=1,
+        longitude=longitude, latitude=latitude, geohash=geohash.encode(latitude, longitude),
+        created_at=now, updated_at=now,
+    )
+    db.add(footprint)
+    db.commit()
+    return footprint
+
+
+def _total(data: bytes) -> int:
+    return int(np.frombuffer(data, dtype="<u2").sum())
+
+
+def test_point_on_tile_edge_counted_once(seeded):
+    # 经度 0 是 z=1 时瓦片 (0, 0) 的右边界、瓦片 (1, 0) 的左边界
+    _add_footprint(seeded, 1, 0.0, 10.0)
+    left = heatmap_tiles.compute_tile(seeded, 1, 0, 0)
+    right = heatmap_tiles.compute_tile(seeded, 1, 1, 0)
+    assert _total(left) == 0
+    assert _total(right) == 1
+
+
+def test_stale_tile_written_after_invalidate_is_not_served(seeded, redis, monkeypatch):
+    compute = heatmap_tiles.compute_tile
+    added = []
+
+    def compute_then_concurrent_write(db, *args):
+        data = compute(db, *args)
+        if not added:
+            # 计算完成、写回缓存之前，另一个请求新增足迹并在提交后失效缓存
+            _add_footprint(seeded, 1, 10.0, 10.0)
+            heatmap_tiles.invalidate([(10.0, 10.0, 1, True)])
+            added.append(True)
+        return data
+
+    monkeypatch.setattr(heatmap_tiles, "compute_tile", compute_then_concurrent_write)
+    x, y = heatmap_tiles.tile_for_point(10.0, 10.0, 3)
+    assert _total(heatmap_tiles.get_tile(seeded, 3, x, y)) == 0
+    assert _total(heatmap_tiles.get_tile(seeded, 3, x, y)) == 1
+    # 再次读取命中缓存
+    assert _total(heatmap_tiles.get_tile(seeded, 3, x, y)) == 1
@@ -0,0 +1,70 @@
+"""
+检索索引状态：重建期间与重建失败后不可用，同一时刻只有一个进程重建
+"""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.services import index_state, search_index, user_search
+
+
+@pytest.fixture
+def state(db, monkeypatch):
+    acquired = {"value": True}
+
+    @contextmanager
+    def rebuild_lock(name):
+        yield acquired["value"]
+
+    # SQLite 没有 GET_LOCK，由 acquired 控制是否取得锁
+    monkeypatch.setattr(index_state, "SessionLocal", sessionmaker(bind=db.get_bind(), autoflush=False))
+    monkeypatch.setattr(index_state, "rebuild_lock", rebuild_lock)
+    monkeypatch.setattr(index_state, "STATE_CACHE_SECONDS", 0)
+    monkeypatch.setattr(index_state, "_cache", {})
+    return acquired
+
+
+indexes = pytest.mark.parametrize("index", [search_index, user_search], ids=["footprints", "users"])
+
+
+@indexes
+def test_never_built_index_is_not_available(db, state, index):
+    assert not index.is_available()
+    assert index.prepare_index(db)
+
+
+@indexes
+def test_rebuild_marks_ready_only_after_build(db, state, index):
+    seen = []
+
+    def build(session):
+        seen.append(index.is_available())
+        return 3
+
+    assert index_state.rebuild(index.INDEX_NAME, build) == 3
+    assert seen == [False]
+    assert index.is_available()
+    assert not index.prepare_index(db)
+
+
+@indexes
+def test_failed_rebuild_leaves_index_unavailable(db, state, index):
+    index_state.rebuild(index.INDEX_NAME, lambda session: 0)
+    assert index.is_available()
+
+    def build(session):
+        raise RuntimeError("中途失败")
+
+    with pytest.raises(RuntimeError):
+        index_state.rebuild(index.INDEX_NAME, build)
+    assert not index.is_available()
+    assert index.prepare_index(db)
+
+
+@indexes
+def test_rebuild_skipped_while_another_process_holds_lock(db, state, index):
+    state["value"] = False
+    calls = []
+    assert index_state.rebuild(index.INDEX_NAME, calls.append) is None
+    assert calls == []
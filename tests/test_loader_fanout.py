@@ -0,0 +1,195 @@
+"""
+加载策略回归测试
+
+在 SQLite 上建表并写入一条带多张媒体、多个标签、多条带图评论的足迹，
+统计各读接口执行的语句数与读取的行数。集合关系改回 JOIN 加载会产生笛卡尔积（行数膨胀），
+遗漏预加载会按对象逐个查询（语句数随数据量增长），两者都会超出这里的上限。
+"""
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.db.session import get_db
+from app.db.async_session import get_async_db
+from app.api.deps import (
+    get_current_user, get_current_user_optional,
+    get_current_user_async, get_current_user_optional_async,
+)
+from app.api.routes_footprints import router as footprints_router
+from app.api.routes_comments import router as comments_router
+from app.services import comment_service
+from app.models import (
+    User, FootprintType, Footprint, FootprintMedia, Tag, FootprintTag, Comment, CommentImage,
+)
+from conftest import create_tables
+
+MEDIA_COUNT = 4
+TAG_COUNT = 3
+COMMENT_COUNT = 3
+IMAGES_PER_COMMENT = 2
+
+
+class QueryCounter:
+    """统计语句数与 SELECT 读取的行数"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.statements = 0
+        self.rows = 0
+
+    def reset(self):
+        self.statements = 0
+        self.rows = 0
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if executemany or not statement.lstrip().upper().startswith("SELECT"):
+            return
+        # 游标此时尚未读取，用独立连接统计同一语句的结果行数（测试期间数据不变）
+        with sqlite3.connect(self.db_path) as raw:
+            self.rows += raw.execute(f"SELECT COUNT(*) FROM ({statement})", parameters).fetchone()[0]
+
+    def listen(self, engine):
+        event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
+
+
+def _seed(db):
+    now = datetime.utcnow()
+    user = User(id=1, username="alice", nickname="Alice", email="alice@example.com", password_hash="x",
+                created_at=now, updated_at=now)
+    footprint_type = FootprintType(id=1, name="城市", icon="city", sort_order=0)
+    footprint = Footprint(
+        id=1, user_id=1, type_id=1, name="外滩", longitude=121.49, latitude=31.24,
+        is_public=1, created_at=now, updated_at=now,
+    )
+    db.add_all([user, footprint_type, footprint])
+    db.flush()
+
+    for i in range(MEDIA_COUNT):
+        db.add(FootprintMedia(
+            footprint_id=1, media_url=f"uploads/images/{i}.jpg", media_type="image", sort_order=i,
+        ))
+    for i in range(TAG_COUNT):
+        tag = Tag(id=i + 1, name=f"tag{i}", created_at=now)
+        db.add(tag)
+        db.add(FootprintTag(footprint_id=1, tag_id=tag.id))
+
+    roots = []
+    for i in range(COMMENT_COUNT):
+        comment = Comment(id=i + 1, footprint_id=1, user_id=1, content=f"评论{i}",
+                          created_at=now - timedelta(minutes=i), updated_at=now)
+        comment_service.assign_path(comment, None)
+        roots.append(comment)
+        db.add(comment)
+        for j in range(IMAGES_PER_COMMENT):
+            db.add(CommentImage(comment_id=comment.id, image_url=f"uploads/images/c{i}-{j}.jpg", sort_order=j))
+    reply = Comment(id=COMMENT_COUNT + 1, footprint_id=1, user_id=1, parent_id=1, content="回复",
+                    created_at=now, updated_at=now)
+    comment_service.assign_path(reply, roots[0])
+    db.add(reply)
+    db.add(CommentImage(comment_id=reply.id, image_url="uploads/images/reply.jpg", sort_order=0))
+    db.commit()
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    db_path = str(tmp_path_factory.mktemp("db") / "fanout.db")
+    engine = create_engine(f"sqlite:///{db_path}")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    create_tables(engine)
+
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False,
+                                           expire_on_commit=False)
+    with SessionLocal() as db:
+        _seed(db)
+        user = db.get(User, 1)
+        db.expunge(user)
+
+    def override_get_db():
+        with SessionLocal() as db:
+            yield db
+
+    async def override_get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(footprints_router, prefix="/api")
+    app.include_router(comments_router, prefix="/api")
+    app.dependency_overrides.update({
+        get_db: override_get_db,
+        get_async_db: override_get_async_db,
+        get_current_user: lambda: user,
+        get_current_user_optional: lambda: user,
+        get_current_user_async: lambda: user,
+        get_current_user_optional_async: lambda: user,
+    })
+
+    counter = QueryCounter(db_path)
+    counter.listen(engine)
+    counter.listen(async_engine.sync_engine)
+    with TestClient(app) as test_client:
+        test_client.counter = counter
+        yield test_client
+    engine.dispose()
+
+
+def _get(client, url):
+    client.counter.reset()
+    response = client.get(url)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["success"], body["message"]
+    return body["data"]
+
+
+def _assert_footprint(data):
+    assert len(data["medias"]) == MEDIA_COUNT
+    assert len(data["tags"]) == TAG_COUNT
+    assert data["user"]["username"] == "alice"
+    assert data["footprint_type"]["name"] == "城市"
+
+
+@pytest.mark.parametrize("url, max_statements, max_rows", [
+    # 足迹（含类型、作者） + 标签 + 媒体
+    ("/api/footprints/public", 3, 1 + TAG_COUNT + MEDIA_COUNT),
+    ("/api/footprints/mine", 3, 1 + TAG_COUNT + MEDIA_COUNT),
+])
+def test_footprint_list(client, url, max_statements, max_rows):
+    data = _get(client, url)
+    footprints = data if isinstance(data, list) else data["footprints"]
+    assert len(footprints) == 1
+    _assert_footprint(footprints[0])
+    assert client.counter.statements <= max_statements
+    assert client.counter.rows <= max_rows
+
+
+@pytest.mark.parametrize("url", ["/api/footprints/1", "/api/footprints/1/detail"])
+def test_footprint_detail(client, url):
+    data = _get(client, url)
+    _assert_footprint(data)
+    assert data["comment_count"] == COMMENT_COUNT
+    assert len(data["comments"]) == COMMENT_COUNT
+    assert all(len(c["images"]) == IMAGES_PER_COMMENT for c in data["comments"])
+    # 足迹 3 条 + 评论总数 + 顶级评论（含作者） + 评论图片
+    assert client.counter.statements <= 6
+    assert client.counter.rows <= (1 + TAG_COUNT + MEDIA_COUNT) + 1 + COMMENT_COUNT + COMMENT_COUNT * IMAGES_PER_COMMENT
+
+
+def test_comment_list(client):
+    comments = _get(client, "/api/comments/footprint/1")
+    assert len(comments) == COMMENT_COUNT
+    assert all(len(c["images"]) == IMAGES_PER_COMMENT for c in comments)
+    # 权限检查 + 顶级评论（含作者） + 评论图片 + 回复 + 回复图片
+    assert client.counter.statements <= 5
+    assert client.counter.rows <= 1 + COMMENT_COUNT + COMMENT_COUNT * IMAGES_PER_COMMENT + 1 + 1
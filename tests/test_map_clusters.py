@@ -0,0 +1,45 @@
+"""
+地图聚合缓存失效
+"""
+from datetime import datetime
+
+from app.models import User, FootprintType, Footprint
+from app.services import map_clusters
+from app.utils import geohash
+from conftest import FakeRedis
+
+
+def test_stale_cells_written_after_invalidate_are_not_served(db, monkeypatch):
+    now = datetime.utcnow()
+    footprint = Footprint(
+        id=1, user_id=1, type_id=1, name="外滩", is_public=1, longitude=121.49, latitude=31.24,
+        geohash=geohash.encode(31.24, 121.49), created_at=now, updated_at=now,
+    )
+    db.add_all([
+        User(id=1, username="alice", email="alice@example.com", password_hash="x", created_at=now, updated_at=now),
+        FootprintType(id=1, name="城市"),
+        footprint,
+    ])
+    db.commit()
+
+    redis = FakeRedis(decode_responses=True)
+    monkeypatch.setattr(map_clusters, "get_redis", lambda: redis)
+    compute = map_clusters._compute_cells
+    changed = []
+
+    def compute_then_concurrent_write(session, cells, threshold):
+        data = compute(session, cells, threshold)
+        if not changed:
+            # 计算完成、写回缓存之前，足迹被设为私有并在提交后失效缓存
+            footprint.is_public = 0
+            db.commit()
+            map_clusters.invalidate([footprint.geohash])
+            changed.append(True)
+        return data
+
+    monkeypatch.setattr(map_clusters, "_compute_cells", compute_then_concurrent_write)
+    bbox = (121.0, 31.0, 122.0, 32.0, 10)
+    assert len(map_clusters.get_clusters(db, *bbox)["points"]) == 1
+    assert map_clusters.get_clusters(db, *bbox)["points"] == []
+    # 再次读取命中缓存
+    assert map_clusters.get_clusters(db, *bbox)["points"] == []
@@ -0,0 +1,84 @@
+"""
+内容寻址文件的引用释放
+
+引用按上传计数，按被删除的内容逐条释放；文件只在无人引用且没有内容使用时删除。
+"""
+from datetime import datetime
+
+from app.models import User, FootprintType, Footprint, FootprintMedia, MediaBlob, MediaBlobRef
+from app.services import media_store
+
+
+def _footprint(db, footprint_id, path):
+    now = datetime.utcnow()
+    footprint = Footprint(
+        id=footprint_id, user_id=1, type_id=1, name=f"足迹{footprint_id}", longitude=0, latitude=0,
+        created_at=now, updated_at=now,
+    )
+    footprint.medias.append(FootprintMedia(media_url=path, media_type="image"))
+    db.add(footprint)
+    return footprint
+
+
+def _delete_footprint(db, footprint):
+    """与删除足迹接口相同的顺序：释放引用、删除、提交、清理文件"""
+    released = media_store.release_unused(
+        db, [(m.media_url, footprint.user_id) for m in footprint.medias], exclude_footprint_id=footprint.id
+    )
+    db.delete(footprint)
+    db.commit()
+    media_store.purge_released(db, released)
+
+
+def test_upload_twice_attach_twice_delete_both(db, tmp_path):
+    path = str(tmp_path / "blob.jpg")
+    with open(path, "wb") as f:
+        f.write(b"jpeg")
+
+    now = datetime.utcnow()
+    db.add_all([
+        User(id=1, username="alice", email="alice@example.com", password_hash="x", created_at=now, updated_at=now),
+        FootprintType(id=1, name="城市"),
+        # 同一张图片上传两次
+        MediaBlob(hash="a" * 64, path=path, media_type="image", size=4),
+        MediaBlobRef(hash="a" * 64, user_id=1, ref_count=2),
+    ])
+    a = _footprint(db, 1, path)
+    b = _footprint(db, 2, path)
+    db.commit()
+
+    _delete_footprint(db, a)
+    assert db.get(MediaBlobRef, ("a" * 64, 1)).ref_count == 1
+    assert db.get(MediaBlob, "a" * 64) is not None
+    assert (tmp_path / "blob.jpg").exists()
+
+    _delete_footprint(db, b)
+    assert db.get(MediaBlobRef, ("a" * 64, 1)) is None
+    assert db.get(MediaBlob, "a" * 64) is None
+    assert not (tmp_path / "blob.jpg").exists()
+
+
+def test_single_upload_attached_twice_kept_until_last_use(db, tmp_path):
+    path = str(tmp_path / "blob.jpg")
+    with open(path, "wb") as f:
+        f.write(b"jpeg")
+
+    now = datetime.utcnow()
+    db.add_all([
+        User(id=1, username="alice", email="alice@example.com", password_hash="x", created_at=now, updated_at=now),
+        FootprintType(id=1, name="城市"),
+        MediaBlob(hash="a" * 64, path=path, media_type="image", size=4),
+        MediaBlobRef(hash="a" * 64, user_id=1, ref_count=1),
+    ])
+    a = _footprint(db, 1, path)
+    b = _footprint(db, 2, path)
+    db.commit()
+
+    # 引用已归零，但足迹 B 仍在使用
+    _delete_footprint(db, a)
+    assert db.get(MediaBlob, "a" * 64) is not None
+    assert (tmp_path / "blob.jpg").exists()
+
+    _delete_footprint(db, b)
+    assert db.get(MediaBlob, "a" * 64) is None
+    assert not (tmp_path / "blob.jpg").exists()